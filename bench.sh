@@ -0,0 +1 @@
+cd src && python3 -m benchmarks "$@"
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""Throughput benchmarks of the markdown pipeline.
+
+Run from src: python3 -m benchmarks [--pages N] [--save-baseline PATH] [--compare PATH]
+"""
+import argparse
+import json
+import logging
+from pathlib import Path
+import sys
+import tempfile
+
+from benchmarks.corpus import CorpusConfig, generate_document, write_corpus
+from benchmarks.harness import BENCHMARKS, compare_results, run_benchmark
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    defaults = CorpusConfig()
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks", description="Benchmark the markdown pipeline.")
+    parser.add_argument("--pages", type=int, default=defaults.pages)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--blocks-per-page", type=int, default=defaults.blocks_per_page)
+    parser.add_argument("--paragraph-words", type=int, default=defaults.paragraph_words)
+    parser.add_argument("--list-density", type=float, default=defaults.list_density)
+    parser.add_argument("--quote-density", type=float, default=defaults.quote_density)
+    parser.add_argument("--code-density", type=float, default=defaults.code_density)
+    parser.add_argument("--inline-density", type=float, default=defaults.inline_density)
+    parser.add_argument("--pathological", action="store_true", help="Add long inline runs, lists and quotes, nest pages deeply.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark, the best one counts.")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append", help="Run only these benchmarks.")
+    parser.add_argument("--json", help="Write the results to this json file.")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline json file.")
+    parser.add_argument("--compare", help="Compare against a baseline json file, failing on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed throughput drop against the baseline.")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.disable(logging.INFO)
+
+    config = CorpusConfig(
+        pages=args.pages,
+        seed=args.seed,
+        blocks_per_page=args.blocks_per_page,
+        paragraph_words=args.paragraph_words,
+        list_density=args.list_density,
+        quote_density=args.quote_density,
+        code_density=args.code_density,
+        inline_density=args.inline_density,
+        pathological=args.pathological,
+    )
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        write_corpus(root / 'content', config)
+        (root / 'template.html').write_text(
+            '<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>'
+        )
+        documents = [generate_document(config, i) for i in range(config.pages)]
+
+        for name in args.only or BENCHMARKS:
+            result = run_benchmark(name, documents, root, args.repeat)
+            results[name] = result
+            print(
+                f'{name:<24}{result["pages_per_s"]:>12.1f} pages/s'
+                f'{result["mb_per_s"]:>10.2f} MB/s'
+                f'{result["peak_mb"]:>10.2f} MB peak'
+            )
+
+    report = {'config': config._asdict(), 'results': results}
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if baseline['config'] != report['config']:
+            print('Baseline was recorded with a different corpus, results are not comparable.')
+            return 2
+
+        regressions = compare_results(baseline['results'], results, args.threshold)
+        for name, (before, after) in regressions.items():
+            print(f'REGRESSION {name}: {before:.1f} -> {after:.1f} pages/s')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
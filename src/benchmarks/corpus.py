@@ -0,0 +1,128 @@
+"""Seeded synthetic markdown corpus for the benchmarks."""
+from pathlib import Path
+import random
+from typing import NamedTuple
+
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "while elves dwarves and men gathered at rivendell to decide its fate "
+    "frodo carried it across the misty mountains through moria and lothlorien"
+).split()
+
+
+class CorpusConfig(NamedTuple):
+    """Shape of a synthetic corpus."""
+    pages: int = 200
+    seed: int = 0
+    blocks_per_page: int = 20
+    paragraph_words: int = 80
+    list_density: float = 0.15
+    quote_density: float = 0.05
+    code_density: float = 0.05
+    inline_density: float = 0.1
+    pathological: bool = False
+
+
+def inline_span(rng: random.Random, words: list[str]) -> str:
+    """Return one random inline construct wrapping words."""
+
+    text = ' '.join(words)
+    kind = rng.randrange(5)
+    if kind == 0:
+        return f'**{text}**'
+    if kind == 1:
+        return f'_{text}_'
+    if kind == 2:
+        return f'`{text}`'
+    if kind == 3:
+        return f'[{text}](/blog/{words[0]})'
+    return f'![{text}](/images/{words[0]}.png)'
+
+
+def paragraph(rng: random.Random, config: CorpusConfig, words: int) -> str:
+    """Return a paragraph of about words words with inline markup."""
+
+    parts = []
+    count = 0
+    while count < words:
+        if rng.random() < config.inline_density:
+            span_words = rng.choices(WORDS, k=rng.randint(1, 3))
+            parts.append(inline_span(rng, span_words))
+            count += len(span_words)
+        else:
+            parts.append(rng.choice(WORDS))
+            count += 1
+
+    lines = []
+    for i in range(0, len(parts), 12):
+        lines.append(' '.join(parts[i:i + 12]))
+    return '\n'.join(lines)
+
+
+def block(rng: random.Random, config: CorpusConfig) -> str:
+    """Return one random markdown block."""
+
+    roll = rng.random()
+    if roll < config.list_density:
+        items = rng.randint(2, 8)
+        if rng.random() < 0.5:
+            return '\n'.join(f'- {paragraph(rng, config, 8)}'.replace('\n', ' ') for _ in range(items))
+        return '\n'.join(f'{i}. {paragraph(rng, config, 8)}'.replace('\n', ' ') for i in range(1, items + 1))
+    roll -= config.list_density
+
+    if roll < config.quote_density:
+        lines = paragraph(rng, config, config.paragraph_words // 2).split('\n')
+        return '\n'.join(f'> {line}' for line in lines)
+    roll -= config.quote_density
+
+    if roll < config.code_density:
+        lines = [' '.join(rng.choices(WORDS, k=6)) for _ in range(rng.randint(2, 10))]
+        return '```\n' + '\n'.join(lines) + '\n```'
+    roll -= config.code_density
+
+    if rng.random() < 0.1:
+        return f'{"#" * rng.randint(2, 6)} {" ".join(rng.choices(WORDS, k=4))}'
+    return paragraph(rng, config, config.paragraph_words)
+
+
+def pathological_blocks(rng: random.Random, config: CorpusConfig) -> list[str]:
+    """Return blocks that stress the parser: long inline runs, long lists and quotes."""
+
+    spans = ''.join(inline_span(rng, [rng.choice(WORDS)]) for _ in range(config.paragraph_words * 10))
+    adjacent = '**a**_b_`c`' * config.paragraph_words
+    long_list = '\n'.join(f'- {inline_span(rng, [rng.choice(WORDS)])}' for _ in range(config.paragraph_words * 5))
+    long_quote = '\n'.join(f'> {rng.choice(WORDS)} **{rng.choice(WORDS)}**' for _ in range(config.paragraph_words * 5))
+    return [spans, adjacent, long_list, long_quote]
+
+
+def generate_document(config: CorpusConfig, index: int) -> str:
+    """Return the markdown of page index, the same for the same seed."""
+
+    rng = random.Random(f'{config.seed}:{index}')
+    blocks = [f'# Page {index} {" ".join(rng.choices(WORDS, k=3))}']
+    blocks.extend(block(rng, config) for _ in range(config.blocks_per_page))
+    if config.pathological:
+        blocks.extend(pathological_blocks(rng, config))
+    return '\n\n'.join(blocks) + '\n'
+
+
+def page_path(config: CorpusConfig, index: int) -> Path:
+    """Return the relative path of page index; pathological corpora nest deeply."""
+
+    depth = 16 if config.pathological else 2
+    parts = [f'section{(index >> (2 * level)) % 4}' for level in range(depth)]
+    return Path(*parts) / f'page{index}.md'
+
+
+def write_corpus(root, config: CorpusConfig) -> list[Path]:
+    """Write the corpus under root and return the page paths."""
+
+    root = Path(root)
+    paths = []
+    for index in range(config.pages):
+        path = root / page_path(config, index)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(generate_document(config, index))
+        paths.append(path)
+    return paths
@@ -0,0 +1,202 @@
+"""Timing and memory measurement of the pipeline stages."""
+from pathlib import Path
+import shutil
+import time
+import tracemalloc
+from typing import Callable
+
+from nodes.textnode import LeafPool, text_nodes_to_html_nodes
+from utilities.block_utilities import (
+    BlockType,
+    block_to_block_type,
+    iter_markdown_blocks,
+    markdown_to_blocks,
+    markdown_to_html,
+    markdown_to_html_node
+)
+from utilities.inline_utilities import text_to_textnodes
+from utilities.page_utilities import extract_title_markdown, generate_pages_recursive, list_pages
+from utilities.pipeline_utilities import build_pages_pipelined
+from utilities.reader_utilities import iter_mapped_lines, open_mapped
+
+
+def bench_text_to_textnodes(documents: list[str], root: Path) -> Callable[[], None]:
+    paragraphs = [
+        block.replace('\n', ' ')
+        for document in documents
+        for block in markdown_to_blocks(document)
+        if block_to_block_type(block) == BlockType.PARAGRAPH
+    ]
+
+    def run():
+        for paragraph in paragraphs:
+            text_to_textnodes(paragraph)
+    return run
+
+
+def bench_text_to_spans(documents: list[str], root: Path) -> Callable[[], None]:
+    paragraphs = [
+        block.replace('\n', ' ')
+        for document in documents
+        for block in markdown_to_blocks(document)
+        if block_to_block_type(block) == BlockType.PARAGRAPH
+    ]
+
+    def run():
+        for paragraph in paragraphs:
+            text_to_textnodes(paragraph, spans=True)
+    return run
+
+
+def paragraph_text_nodes(documents: list[str]) -> list[list]:
+    """Return the text nodes of every paragraph of documents."""
+
+    return [
+        text_to_textnodes(block.replace('\n', ' '))
+        for document in documents
+        for block in markdown_to_blocks(document)
+        if block_to_block_type(block) == BlockType.PARAGRAPH
+    ]
+
+
+def bench_text_to_leaves(documents: list[str], root: Path) -> Callable[[], None]:
+    text_nodes = paragraph_text_nodes(documents)
+
+    def run():
+        for nodes in text_nodes:
+            text_nodes_to_html_nodes(nodes)
+    return run
+
+
+def bench_text_to_leaves_pooled(documents: list[str], root: Path) -> Callable[[], None]:
+    text_nodes = paragraph_text_nodes(documents)
+
+    def run():
+        # A fresh pool per run, as a build starts with one.
+        pool = LeafPool()
+        for nodes in text_nodes:
+            text_nodes_to_html_nodes(nodes, pool)
+    return run
+
+
+def bench_markdown_to_html_node(documents: list[str], root: Path) -> Callable[[], None]:
+    def run():
+        for document in documents:
+            markdown_to_html_node(document)
+    return run
+
+
+def bench_to_html(documents: list[str], root: Path) -> Callable[[], None]:
+    def run():
+        for document in documents:
+            markdown_to_html_node(document).to_html()
+    return run
+
+
+def bench_to_html_direct(documents: list[str], root: Path) -> Callable[[], None]:
+    def run():
+        for document in documents:
+            markdown_to_html(document)
+    return run
+
+
+def bench_build(documents: list[str], root: Path) -> Callable[[], None]:
+    public_dir = root / 'public'
+
+    def run():
+        if public_dir.exists():
+            shutil.rmtree(public_dir)
+        generate_pages_recursive(root / 'content', root / 'template.html', public_dir)
+    return run
+
+
+def bench_build_pipeline(documents: list[str], root: Path) -> Callable[[], None]:
+    public_dir = root / 'public'
+    jobs = list_pages(root / 'content')
+
+    def run():
+        if public_dir.exists():
+            shutil.rmtree(public_dir)
+        build_pages_pipelined(jobs, root / 'template.html', public_dir=public_dir)
+    return run
+
+
+def bench_read(documents: list[str], root: Path) -> Callable[[], None]:
+    paths = sorted((root / 'content').rglob('*.md'))
+
+    def run():
+        for path in paths:
+            with path.open() as f:
+                markdown = f.read()
+            extract_title_markdown(markdown)
+            for _ in markdown_to_blocks(markdown):
+                pass
+    return run
+
+
+def bench_read_mmap(documents: list[str], root: Path) -> Callable[[], None]:
+    paths = sorted((root / 'content').rglob('*.md'))
+
+    def run():
+        for path in paths:
+            with open_mapped(path) as mapped:
+                extract_title_markdown(mapped)
+                for _ in iter_markdown_blocks(iter_mapped_lines(mapped)):
+                    pass
+    return run
+
+
+# Each benchmark prepares its input untimed and returns the function to time.
+BENCHMARKS: dict[str, Callable[[list[str], Path], Callable[[], None]]] = {
+    'text_to_textnodes': bench_text_to_textnodes,
+    'text_to_spans': bench_text_to_spans,
+    'text_to_leaves': bench_text_to_leaves,
+    'text_to_leaves_pooled': bench_text_to_leaves_pooled,
+    'markdown_to_html_node': bench_markdown_to_html_node,
+    'to_html': bench_to_html,
+    'to_html_direct': bench_to_html_direct,
+    'build': bench_build,
+    'build_pipeline': bench_build_pipeline,
+    'read': bench_read,
+    'read_mmap': bench_read_mmap,
+}
+
+
+def run_benchmark(name: str, documents: list[str], root: Path, repeat: int = 5) -> dict[str, float]:
+    """Run a benchmark, returning its best throughput and traced peak memory."""
+
+    bench = BENCHMARKS[name](documents, root)
+    size_mb = sum(len(document.encode()) for document in documents) / 1e6
+
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        bench()
+        best = min(best, time.perf_counter() - start)
+
+    # Memory is traced in its own run, tracemalloc slows everything down.
+    tracemalloc.start()
+    bench()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'seconds': best,
+        'pages_per_s': len(documents) / best,
+        'mb_per_s': size_mb / best,
+        'peak_mb': peak / 1e6,
+    }
+
+
+def compare_results(baseline: dict, results: dict, threshold: float) -> dict[str, tuple[float, float]]:
+    """Return the benchmarks whose pages/s dropped more than threshold below the baseline."""
+
+    regressions = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['pages_per_s']
+        after = result['pages_per_s']
+        if after < before * (1 - threshold):
+            regressions[name] = (before, after)
+    return regressions
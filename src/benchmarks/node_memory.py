@@ -0,0 +1,80 @@
+"""Memory benchmark for the node classes.
+
+Parses a large generated document and keeps its node tree alive, then
+reports the peak RSS of the process and the tracemalloc peak and block
+count. With --no-pool inline leaves are built one per text node instead
+of shared through the leaf pool, with --spans text nodes are SpanTextNodes
+of their paragraph. Run from src: python3 -m benchmarks.node_memory
+"""
+import argparse
+import resource
+import tracemalloc
+
+from nodes.textnode import LeafPool, text_nodes_to_html_nodes
+from utilities.block_utilities import markdown_to_html_node
+from utilities.inline_utilities import text_to_textnodes
+
+
+PARAGRAPH = (
+    "Some **bold** words, an _italic_ one, `inline code`, a [link](/blog/post) "
+    "and an ![image](/images/tolkien.png) in a sentence that goes on a little."
+)
+
+
+def build_document(paragraphs: int) -> str:
+    """Build a markdown document of paragraphs, lists and quotes."""
+
+    blocks = ['# Memory benchmark']
+    for i in range(paragraphs):
+        blocks.append(PARAGRAPH)
+        if i % 10 == 0:
+            blocks.append('\n'.join(f'- item {j} with **bold**' for j in range(5)))
+        if i % 25 == 0:
+            blocks.append('> A quote with a [link](/) inside')
+    return '\n\n'.join(blocks)
+
+
+def measure(paragraphs: int, pooled: bool = True, spans: bool = False) -> dict[str, int]:
+    """Measure allocations while the text nodes, leaf nodes and html tree are alive."""
+
+    markdown = build_document(paragraphs)
+    pool = LeafPool() if pooled else None
+
+    tracemalloc.start()
+    text_nodes = [text_to_textnodes(PARAGRAPH, spans=spans) for _ in range(paragraphs)]
+    leaf_nodes = [text_nodes_to_html_nodes(nodes, pool) for nodes in text_nodes]
+    tree = markdown_to_html_node(markdown, pool)
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    leaves = sum(len(nodes) for nodes in leaf_nodes)
+    leaf_objects = len({id(leaf) for nodes in leaf_nodes for leaf in nodes})
+    del text_nodes, leaf_nodes, tree
+
+    return {
+        'paragraphs': paragraphs,
+        'leaf_nodes': leaves,
+        'leaf_objects': leaf_objects,
+        'pooled_leaves': len(pool) if pool is not None else 0,
+        'traced_current_bytes': current,
+        'traced_peak_bytes': peak,
+        'allocated_blocks': blocks,
+        'peak_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Node memory benchmark.")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--no-pool", action="store_true", help="Build a leaf per text node instead of sharing them.")
+    parser.add_argument("--spans", action="store_true", help="Keep text nodes as spans of their paragraph.")
+    args = parser.parse_args()
+
+    for key, value in measure(args.paragraphs, not args.no_pool, args.spans).items():
+        print(f'{key:>22}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,21 @@
+import argparse
+import logging
 import os
 import sys
+import threading
 from pathlib import Path
-import shutil
 
-from utilities.page_utilities import generate_page, generate_pages_recursive
+from utilities.cache_utilities import DEFAULT_MAX_BYTES, RenderCache
+from utilities.graph_utilities import DependencyGraph
+from utilities.index_utilities import ContentIndex
+from utilities.manifest_utilities import OUTPUT_MANIFEST, BuildManifest
+from utilities.output_utilities import OutputWriter
+from utilities.page_utilities import BuildSummary, generate_page, generate_pages_incremental, stage_pages
+from utilities.pipeline_utilities import build_pages_pipelined
+from utilities.profile_utilities import BuildProfiler, profiling, stage
+from utilities.shard_utilities import content_digest, merge_shards, parse_shard, shard_jobs, shard_manifest_fields
+from utilities.static_utilities import DEFAULT_COPY_WORKERS, list_files, update_public_dir
+from utilities.watch_utilities import SiteWatcher, start_server
 
 
 DIR_PATH_STATIC = "./static"
@@ -12,38 +24,387 @@ DIR_PATH_PUBLIC = "./docs"
 FROM_PATH = "./content/index.md"
 TEMPLATE_HTML_PATH = "./template.html"
 DEST_PATH = f'./{DIR_PATH_PUBLIC}/index.html'
+MANIFEST_PATH = "./.build_manifest.json"
+RENDER_CACHE_PATH = "./.render_cache"
+PROFILE_PATH = "./build_profile.json"
+GRAPH_PATH = "./.dependency_graph.json"
+INDEX_PATH = "./.content_index.json"
+SHARD_DIR_PATH = "./shards"
 
-def main():
-   base_path = sys.argv[0]
 
-   if os.path.exists(Path(DIR_PATH_PUBLIC)):
-      shutil.rmtree(Path(DIR_PATH_PUBLIC))
+def parse_args(argv: list[str]) -> argparse.Namespace:
+   """Parse command line arguments."""
 
-   make_public_dir(DIR_PATH_STATIC, DIR_PATH_PUBLIC)
+   if argv[:1] == ["deps"]:
+      parser = argparse.ArgumentParser(
+         prog="main.py deps",
+         description=f"List the pages depending on targets, or the broken references, recorded in {GRAPH_PATH}.",
+      )
+      parser.add_argument(
+         "targets",
+         nargs="*",
+         help="Output paths such as images/tom.png or blog/tom/index.html, or the template path.",
+      )
+      return parser.parse_args(argv[1:])
 
-   generate_pages_recursive("./content", TEMPLATE_HTML_PATH, DIR_PATH_PUBLIC, base_path)
-   
+   if argv[:1] == ["merge"]:
+      parser = argparse.ArgumentParser(
+         prog="main.py merge",
+         description=f"Merge the outputs of --shard builds into {DIR_PATH_PUBLIC}, failing on collisions.",
+      )
+      parser.add_argument(
+         "shard_dirs",
+         nargs="*",
+         help=f"Shard output dirs, every dir under {SHARD_DIR_PATH} by default.",
+      )
+      parser.add_argument("--no-link", action="store_true", help="Copy shard files instead of hardlinking them.")
+      return parser.parse_args(argv[1:])
 
+   if argv[:1] == ["serve"]:
+      parser = argparse.ArgumentParser(prog="main.py serve", description="Build, serve and optionally watch the site.")
+      parser.add_argument("--watch", action="store_true", help="Rebuild changed pages while serving.")
+      parser.add_argument("--host", default="localhost")
+      parser.add_argument("--port", type=int, default=8888)
+      parser.add_argument("--interval", type=float, default=0.5, help="Seconds between polls for changes.")
+      argv = argv[1:]
+   else:
+      parser = argparse.ArgumentParser(description="Build the static site, 'serve' it, 'merge' shards or query its 'deps'.")
+      parser.add_argument("base_path", nargs="?", default=None, help="Base path the site is served from.")
+      parser.add_argument(
+         "--profile",
+         action="store_true",
+         help="Time every build stage per page and report percentiles and the slowest pages.",
+      )
+      parser.add_argument(
+         "--profile-json",
+         default=PROFILE_PATH,
+         help="Where --profile writes its json report.",
+      )
+      parser.add_argument(
+         "--pipeline",
+         action="store_true",
+         help="Overlap reading, rendering and writing pages in an asyncio pipeline and report its stage waits.",
+      )
+      parser.add_argument(
+         "--deploy-manifest",
+         action="store_true",
+         help=f"Write {DIR_PATH_PUBLIC}/{OUTPUT_MANIFEST} with the digest of every file, skipping writes it shows unchanged.",
+      )
+      parser.add_argument(
+         "--shard",
+         default=None,
+         metavar="i/N",
+         help=f"Only build the i-th of N size balanced parts of the pages, into {SHARD_DIR_PATH}/i-of-N, for 'merge'.",
+      )
+   parser.add_argument(
+      "--incremental",
+      action="store_true",
+      help=f"Only rebuild what changed since the last build, tracked in {MANIFEST_PATH}.",
+   )
+   parser.add_argument(
+      "--workers",
+      type=int,
+      default=1,
+      help="Number of processes rendering pages in parallel.",
+   )
+   parser.add_argument(
+      "--no-cache",
+      action="store_true",
+      help=f"Parse every page instead of reusing rendered html from {RENDER_CACHE_PATH}.",
+   )
+   parser.add_argument(
+      "--cache-size",
+      type=int,
+      default=DEFAULT_MAX_BYTES // (1024 * 1024),
+      help="Size bound of the render cache in MiB.",
+   )
+   parser.add_argument(
+      "--mmap-threshold",
+      type=float,
+      default=None,
+      help="Read markdown sources of at least this many MiB through mmap, off by default.",
+   )
+   parser.add_argument(
+      "--stream-threshold",
+      type=float,
+      default=None,
+      help="Convert and write markdown sources of at least this many MiB block by block, off by default.",
+   )
+   parser.add_argument(
+      "--static-compare",
+      choices=("mtime", "hash"),
+      default="mtime",
+      help="How static files already in the public dir are recognised as current.",
+   )
+   parser.add_argument(
+      "--link",
+      action="store_true",
+      help="Hardlink static files into the public dir instead of reflinking or copying them, an edit to either then changes both.",
+   )
+   parser.add_argument(
+      "--copy-workers",
+      type=int,
+      default=DEFAULT_COPY_WORKERS,
+      help="Number of threads copying static files and writing pages.",
+   )
+   args = parser.parse_args(argv)
+   if getattr(args, "deploy_manifest", False) and args.incremental:
+      parser.error("--deploy-manifest needs a full build, it cannot be combined with --incremental.")
+   if getattr(args, "shard", None) is not None:
+      if args.incremental:
+         parser.error("--shard needs a full build, it cannot be combined with --incremental.")
+      try:
+         args.shard = parse_shard(args.shard)
+      except ValueError as e:
+         parser.error(str(e))
+   return args
 
-def make_public_dir(source_path: Path, dest_path: Path) -> None:
-   """Recursively create public folder from static."""
 
-   source_path = Path(source_path)
-   if not source_path.exists():
-      raise FileNotFoundError(f"Source path does not exist: {source_path}")
-    
-   dest_path = Path(dest_path)
-   dest_path.mkdir(parents=True, exist_ok=True)
-   
-   for item in source_path.iterdir():
-      from_path = source_path / item.name
-      to_path = dest_path / item.name
+def main(argv: list[str] | None = None):
+   argv = sys.argv[1:] if argv is None else argv
+   args = parse_args(argv)
+   if argv[:1] == ["deps"]:
+      query_dependencies(args.targets)
+      return
+   if argv[:1] == ["merge"]:
+      merge(args.shard_dirs, not args.no_link)
+      return
 
-      if item.is_file():
-         shutil.copy2(from_path, to_path)
+   base_path = getattr(args, "base_path", None)
+   cache = None if args.no_cache else RenderCache(RENDER_CACHE_PATH, args.cache_size * 1024 * 1024)
+   sync_options = {
+      'compare': args.static_compare,
+      'link': args.link,
+      'workers': args.copy_workers,
+   }
 
-      elif item.is_dir():
-         make_public_dir(from_path, to_path)
+   if argv[:1] == ["serve"]:
+      serve(args, cache, sync_options)
+      return
+
+   if not args.profile:
+      build(args, base_path, cache, sync_options)
+      return
+
+   profiler = BuildProfiler()
+   with profiling(profiler):
+      build(args, base_path, cache, sync_options)
+
+   print(profiler.format_table())
+   Path(args.profile_json).write_text(profiler.to_json())
+
+
+def mmap_threshold(args: argparse.Namespace) -> int | None:
+   """Return the --mmap-threshold in bytes."""
+
+   if args.mmap_threshold is None:
+      return None
+   return int(args.mmap_threshold * 1024 * 1024)
+
+
+def stream_threshold(args: argparse.Namespace) -> int | None:
+   """Return the --stream-threshold in bytes."""
+
+   if args.stream_threshold is None:
+      return None
+   return int(args.stream_threshold * 1024 * 1024)
+
+
+def build(args: argparse.Namespace, base_path: str | None, cache: RenderCache | None, sync_options: dict) -> None:
+   """Build the public dir, incrementally or from scratch."""
+
+   index = refresh_index()
+
+   if args.shard is not None:
+      build_shard(args, base_path, cache, sync_options, index)
+      return
+
+   if args.incremental:
+      manifest = BuildManifest.load(MANIFEST_PATH)
+      with stage('static_copy'):
+         update_public_dir(DIR_PATH_STATIC, DIR_PATH_PUBLIC, manifest, **sync_options)
+      summary = generate_pages_incremental(
+         "./content", TEMPLATE_HTML_PATH, DIR_PATH_PUBLIC, manifest, args.workers, cache, mmap_threshold(args), index,
+         stream_threshold(args), base_path
+      )
+      manifest.save(MANIFEST_PATH)
+      record_dependencies(summary.references, summary)
+      return
+
+   references = {}
+   # Everything is written to a staging dir first, a failing build leaves the public dir as it was.
+   with OutputWriter(DIR_PATH_PUBLIC, sync_options['workers'], args.deploy_manifest) as writer:
+      with stage('static_copy'):
+         writer.copy_tree(DIR_PATH_STATIC, sync_options['compare'], sync_options['link'])
+      if args.pipeline:
+         report = build_pages_pipelined(
+            index.jobs(),
+            TEMPLATE_HTML_PATH,
+            writer=writer,
+            workers=args.workers,
+            cache=cache,
+            mmap_threshold=mmap_threshold(args),
+            titles=index.titles(),
+            references=references,
+            stream_threshold=stream_threshold(args),
+            base_path=base_path,
+         )
+         print(report.format_table())
+      else:
+         stage_pages(
+            "./content", TEMPLATE_HTML_PATH, writer, args.workers, cache, mmap_threshold(args), index,
+            references=references, stream_threshold=stream_threshold(args), base_path=base_path
+         )
+
+   if os.path.exists(MANIFEST_PATH):
+      os.remove(MANIFEST_PATH)
+   record_dependencies(references)
+
+
+def build_shard(
+   args: argparse.Namespace,
+   base_path: str | None,
+   cache: RenderCache | None,
+   sync_options: dict,
+   index: ContentIndex
+   ) -> None:
+   """Build the pages of args.shard into its own dir, with a manifest for merge, shard 1 also copying the static files."""
+
+   shard = args.shard
+   shard_dir = Path(SHARD_DIR_PATH) / f"{shard.index}-of-{shard.count}"
+   # Filled while the pages render, the shard manifest hands them to merge.
+   references = {}
+   fields = shard_manifest_fields(shard, content_digest(index.jobs(), TEMPLATE_HTML_PATH, base_path), references)
+   with OutputWriter(shard_dir, sync_options['workers'], True, fields) as writer:
+      if shard.index == 1:
+         with stage('static_copy'):
+            writer.copy_tree(DIR_PATH_STATIC, sync_options['compare'], sync_options['link'])
+      if args.pipeline:
+         report = build_pages_pipelined(
+            shard_jobs(index.jobs(), shard),
+            TEMPLATE_HTML_PATH,
+            writer=writer,
+            workers=args.workers,
+            cache=cache,
+            mmap_threshold=mmap_threshold(args),
+            titles=index.titles(),
+            references=references,
+            stream_threshold=stream_threshold(args),
+            base_path=base_path,
+         )
+         print(report.format_table())
+      else:
+         stage_pages(
+            "./content", TEMPLATE_HTML_PATH, writer, args.workers, cache, mmap_threshold(args), index, shard, references,
+            stream_threshold(args), base_path
+         )
+
+
+def merge(shard_dirs: list[str], link: bool) -> None:
+   """Merge shard outputs into the public dir, every shard under SHARD_DIR_PATH when none are given."""
+
+   if not shard_dirs:
+      # Leftover staging dirs of failed shard builds are named i-of-N.staging.
+      shard_dirs = sorted(str(path) for path in Path(SHARD_DIR_PATH).glob("*-of-*") if path.is_dir() and not path.suffix)
+   summary = merge_shards(shard_dirs, DIR_PATH_PUBLIC, link=link)
+   print(f"Merged {summary.shards} shard(s): {summary.files} file(s), {len(summary.written)} written.")
+
+   if os.path.exists(MANIFEST_PATH):
+      os.remove(MANIFEST_PATH)
+   record_dependencies(summary.references)
+
+
+def refresh_index() -> ContentIndex:
+   """Bring the content index up to date, listing only the directories that changed."""
+
+   index = ContentIndex.load(INDEX_PATH, "./content")
+   index.refresh()
+   index.save(INDEX_PATH)
+   return index
+
+
+def record_dependencies(references: dict, summary: BuildSummary | None = None) -> DependencyGraph:
+   """Record the dependencies of a build and report broken references.
+
+   references are what the build collected while rendering. They replace
+   the graph after a full build. After an incremental build, given its
+   summary, they update it, the removed pages are dropped and only the
+   unchanged pages missing from the graph are scanned.
+   """
+
+   graph = DependencyGraph.load(GRAPH_PATH)
+   if summary is None:
+      graph.record(references, TEMPLATE_HTML_PATH, replace=True)
+   else:
+      graph.record(references, TEMPLATE_HTML_PATH)
+      for key in summary.removed:
+         graph.remove(key)
+      unknown = [key for key in summary.unchanged if key not in graph.pages]
+      if unknown:
+         graph.scan("./content", TEMPLATE_HTML_PATH, unknown)
+   graph.save(GRAPH_PATH)
+   graph.report(DIR_PATH_PUBLIC)
+   return graph
+
+
+def query_dependencies(targets: list[str]) -> None:
+   """Print the pages depending on each target, or every broken reference without targets."""
+
+   graph = DependencyGraph.load(GRAPH_PATH)
+   if not graph.pages:
+      print(f"No dependency graph at {GRAPH_PATH}, build the site first.")
+      return
+
+   for target in targets:
+      print(f"{target}:")
+      for key in graph.dependents(target):
+         print(f"  {key}")
+
+   if not targets:
+      broken = graph.broken_references(list_files(DIR_PATH_PUBLIC))
+      for key, target in broken:
+         print(f"{key}: {target}")
+      print(f"{len(broken)} broken reference(s).")
+
+
+def serve(args: argparse.Namespace, cache: RenderCache | None, sync_options: dict) -> None:
+   """Build incrementally, serve the public dir and rebuild changes until interrupted."""
+
+   logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+   manifest = BuildManifest.load(MANIFEST_PATH)
+   update_public_dir(DIR_PATH_STATIC, DIR_PATH_PUBLIC, manifest, **sync_options)
+   summary = generate_pages_incremental(
+      "./content", TEMPLATE_HTML_PATH, DIR_PATH_PUBLIC, manifest, args.workers, cache, mmap_threshold(args),
+      stream_threshold=stream_threshold(args)
+   )
+   manifest.save(MANIFEST_PATH)
+   graph = record_dependencies(summary.references, summary)
+
+   server = start_server(DIR_PATH_PUBLIC, args.host, args.port)
+   watcher = SiteWatcher(
+      "./content",
+      DIR_PATH_STATIC,
+      TEMPLATE_HTML_PATH,
+      DIR_PATH_PUBLIC,
+      cache=cache,
+      sync_options=sync_options,
+      graph=graph,
+      manifest=manifest,
+      manifest_path=MANIFEST_PATH,
+      render_options={'mmap_threshold': mmap_threshold(args), 'stream_threshold': stream_threshold(args)},
+   )
+
+   try:
+      if args.watch:
+         watcher.watch(args.interval)
+      else:
+         threading.Event().wait()
+   except KeyboardInterrupt:
+      pass
+   finally:
+      server.shutdown()
+      graph.save(GRAPH_PATH)
 
 
 if '__main__' == __name__:
@@ -1,2 +1,2 @@
-from .htmlnode import HTMLNode, ParentNode, LeafNode
-from .textnode import TextNode, TextType
\ No newline at end of file
+from .htmlnode import HTMLNode, ParentNode, LeafNode, FrozenLeafNode
+from .textnode import BaseTextNode, SpanTextNode, TextNode, TextType
\ No newline at end of file
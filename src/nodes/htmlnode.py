@@ -1,6 +1,12 @@
+import io
+from types import MappingProxyType
+
 
 class HTMLNode():
     """HTMLNode class."""
+
+    __slots__ = ('tag', 'value', 'children', 'props')
+
     def __init__(
         self, 
         tag: str | None = None, 
@@ -17,6 +23,10 @@ class HTMLNode():
     def to_html(self):
         """To html method."""
         raise NotImplementedError()
+
+    def write_html(self, sink) -> None:
+        """Write the html to a sink with a write(str) method."""
+        sink.write(self.to_html())
     
     def props_to_html(self) -> str:
         """Props to html method."""
@@ -29,7 +39,14 @@ class HTMLNode():
 
     def __eq__(self, other: 'HTMLNode') -> bool:
         """Equal method."""
-        return self.__dict__ == other.__dict__
+        if not isinstance(other, HTMLNode):
+            return NotImplemented
+        return (
+            self.tag == other.tag and
+            self.value == other.value and
+            self.children == other.children and
+            self.props == other.props
+        )
 
     def __repr__(self) -> str:
         """Repr method."""
@@ -39,6 +56,8 @@ class HTMLNode():
 class LeafNode(HTMLNode):
     """LeafNode of HTMLNode."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str, 
@@ -61,9 +80,47 @@ class LeafNode(HTMLNode):
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
+_SET_TAG = HTMLNode.tag.__set__
+_SET_VALUE = HTMLNode.value.__set__
+_SET_CHILDREN = HTMLNode.children.__set__
+_SET_PROPS = HTMLNode.props.__set__
+
+
+class FrozenLeafNode(LeafNode):
+    """LeafNode that cannot be changed, so one instance can be shared by many trees."""
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        tag: str,
+        value: str,
+        props: dict[str: str] | None = None
+        ):
+        # Set through the slot descriptors, __setattr__ refuses every assignment.
+        _SET_TAG(self, tag)
+        _SET_VALUE(self, value)
+        _SET_CHILDREN(self, None)
+        _SET_PROPS(self, MappingProxyType(dict(props)) if props is not None else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (FrozenLeafNode, (self.tag, self.value, dict(self.props) if self.props is not None else None))
+
+    def __repr__(self):
+        props = dict(self.props) if self.props is not None else None
+        return f"FrozenLeafNode({self.tag}, {self.value}, {props})"
+
 class ParentNode(HTMLNode):
     """ParentNode class."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -75,16 +132,22 @@ class ParentNode(HTMLNode):
 
     def to_html(self) -> str:
         """ParentNode to html method."""
-        
+        buffer = io.StringIO()
+        self.write_html(buffer)
+        return buffer.getvalue()
+
+    def write_html(self, sink) -> None:
+        """Write html method, streaming the children instead of nesting strings."""
+
         if not self.tag:
             raise ValueError("Tag cannot be None")
         if not self.children:
             raise ValueError("Children cannot be None")
-        
-        children_html = ""
+
+        sink.write(f"<{self.tag}{self.props_to_html()}>")
         for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+            child.write_html(sink)
+        sink.write(f"</{self.tag}>")
     
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
\ No newline at end of file
@@ -1,6 +1,12 @@
 from enum import Enum, auto
+from typing import NamedTuple
 
-from nodes import LeafNode
+from nodes import FrozenLeafNode, LeafNode
+
+
+DEFAULT_POOL_SIZE = 4096
+# Longer texts are rarely repeated, pooling them would only pin memory.
+DEFAULT_MAX_POOLED_TEXT = 128
 
 
 class TextType(Enum):
@@ -11,18 +17,20 @@ class TextType(Enum):
     LINK = auto()
     IMAGE = auto()
     TEXT = auto()
+    STRIKETHROUGH = auto()
 
 
-class TextNode():
-    """TextNode class."""
-    def __init__(self, text: str, text_type: TextType, url: str | None = None):
-        """TextNode constructor."""
-        self.text = text
-        self.text_type =  text_type
-        self.url =  url
-    
-    def __eq__(self, other: 'TextNode') -> bool:
+class BaseTextNode():
+    """Base of the text nodes, subclasses provide the text."""
+
+    __slots__ = ('text_type', 'url')
+
+    text: str
+
+    def __eq__(self, other: 'BaseTextNode') -> bool:
         """Equal method."""
+        if not isinstance(other, BaseTextNode):
+            return NotImplemented
         return (
             self.text == other.text and
             self.text_type == other.text_type and
@@ -34,22 +42,209 @@ class TextNode():
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
 
 
-def text_node_to_html_node(text_node: TextNode) -> LeafNode:
-    """Transform TextNode to LeafNode"""
+class TextNode(BaseTextNode):
+    """TextNode class."""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text: str, text_type: TextType, url: str | None = None):
+        """TextNode constructor."""
+        self.text = text
+        self.text_type =  text_type
+        self.url =  url
+
+
+class SpanTextNode(BaseTextNode):
+    """TextNode of source[start:end], the text is only sliced out when read.
+
+    Equal to, and with the repr of, the TextNode of the same text. Setting
+    text makes the node the span of the whole new text.
+    """
+
+    __slots__ = ('source', 'start', 'end')
+
+    def __init__(self, source: str, start: int, end: int, text_type: TextType, url: str | None = None):
+        """SpanTextNode constructor."""
+        self.source = source
+        self.start = start
+        self.end = end
+        self.text_type = text_type
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        """Text of the span."""
+        return self.source[self.start:self.end]
+
+    @text.setter
+    def text(self, text: str) -> None:
+        self.source = text
+        self.start = 0
+        self.end = len(text)
+
+    def __reduce__(self):
+        """Reduce method, spans pickle as the TextNode of their text."""
+        return TextNode, (self.text, self.text_type, self.url)
+
+
+# Html tag of each text type, None for plain text.
+TEXT_TYPE_TAGS = {
+    TextType.TEXT: None,
+    TextType.BOLD: 'b',
+    TextType.ITALIC: 'i',
+    TextType.CODE: 'code',
+    TextType.LINK: 'a',
+    TextType.IMAGE: 'img',
+    TextType.STRIKETHROUGH: 's',
+}
+
 
-    if not text_node.text_type in TextType:
+def leaf_fields(text_type: TextType, text: str, url: str | None = None) -> tuple[str | None, str, dict | None]:
+    """Return the (tag, value, props) of the leaf of a text node."""
+
+    try:
+        tag = TEXT_TYPE_TAGS[text_type]
+    except (KeyError, TypeError):
         raise ValueError('Invalid text type')
-    
-    match text_node.text_type:
-        case TextType.TEXT:
-            return LeafNode(tag=None, value=text_node.text)
-        case TextType.BOLD:
-            return LeafNode(tag='b', value=text_node.text)
-        case TextType.ITALIC:
-            return LeafNode(tag='i', value=text_node.text)
-        case TextType.CODE:
-            return LeafNode(tag='code', value=text_node.text)
-        case TextType.LINK:
-            return LeafNode(tag='a', value=text_node.text, props={'href':text_node.url})
-        case TextType.IMAGE:
-            return LeafNode(tag='img', value="", props={'src':text_node.url,'alt':text_node.text})
\ No newline at end of file
+
+    if text_type is TextType.LINK:
+        return tag, text, {'href': url}
+    if text_type is TextType.IMAGE:
+        return tag, "", {'src': url, 'alt': text}
+    return tag, text, None
+
+
+# Html of each text type as LeafNode.to_html renders the leaf of leaf_fields,
+# {0} being the text and {1} the url.
+INLINE_HTML_FORMATS = {
+    TextType.BOLD: '<b>{0}</b>',
+    TextType.ITALIC: '<i>{0}</i>',
+    TextType.CODE: '<code>{0}</code>',
+    TextType.LINK: '<a href="{1}">{0}</a>',
+    TextType.IMAGE: '<img src="{1}" alt="{0}"></img>',
+    TextType.STRIKETHROUGH: '<s>{0}</s>',
+}
+
+
+def text_node_to_html_node(text_node: BaseTextNode) -> LeafNode:
+    """Transform TextNode to LeafNode"""
+    return LeafNode(*leaf_fields(text_node.text_type, text_node.text, text_node.url))
+
+
+class PoolStats(NamedTuple):
+    """Counters of a LeafPool, misses counting the leaves built because their text was not pooled."""
+    size: int
+    hits: int
+    misses: int
+
+
+class LeafPool():
+    """Bounded pool of FrozenLeafNode, shared by the text nodes of the same (type, text, url).
+
+    Texts longer than max_text get a plain leaf of their own. Once max_size
+    leaves are pooled new texts are no longer added, the pool keeps the
+    fragments seen first, which for a site's navigation is on every page.
+    Evicting instead would churn the pool on content of mostly unique texts.
+    """
+
+    def __init__(self, max_size = DEFAULT_POOL_SIZE, max_text = DEFAULT_MAX_POOLED_TEXT):
+        """LeafPool constructor."""
+        self.max_size = max_size
+        self.max_text = max_text
+        self.hits = 0
+        self.misses = 0
+        self._leaves: dict[tuple, FrozenLeafNode] = {}
+
+    def leaf(self, text_type: TextType, text: str, url: str | None = None) -> FrozenLeafNode:
+        """Return the shared leaf of a text node."""
+
+        leaf = self._leaves.get((text_type, text, url))
+        if leaf is None:
+            return self._add((text_type, text, url))
+        self.hits += 1
+        return leaf
+
+    def convert(self, text_nodes) -> list[LeafNode]:
+        """Return the leaves of text nodes in order, shared ones for the pooled texts."""
+
+        leaves = self._leaves
+        max_text = self.max_text
+        html_nodes = []
+        append = html_nodes.append
+        hits = 0
+        for node in text_nodes:
+            text = node.text
+            if len(text) > max_text:
+                # Not worth a pool lookup, plain leaves are cheaper to build.
+                self.misses += 1
+                append(LeafNode(*leaf_fields(node.text_type, text, node.url)))
+                continue
+            key = (node.text_type, text, node.url)
+            leaf = leaves.get(key)
+            if leaf is None:
+                leaf = self._add(key)
+            else:
+                hits += 1
+            append(leaf)
+        self.hits += hits
+        return html_nodes
+
+    def _add(self, key: tuple) -> FrozenLeafNode:
+        self.misses += 1
+        leaf = FrozenLeafNode(*leaf_fields(*key))
+        if len(key[1]) <= self.max_text and len(self._leaves) < self.max_size:
+            self._leaves[key] = leaf
+        return leaf
+
+    def stats(self) -> PoolStats:
+        """Return the pool size and its hit and miss counts."""
+        return PoolStats(len(self._leaves), self.hits, self.misses)
+
+    def clear(self) -> None:
+        """Drop every pooled leaf and reset the counters."""
+        self._leaves.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        """Len method."""
+        return len(self._leaves)
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"LeafPool({len(self._leaves)}/{self.max_size} leaves, {self.hits} hits, {self.misses} misses)"
+
+
+def text_nodes_to_html_nodes(text_nodes, pool: LeafPool | None = None) -> list[LeafNode]:
+    """Transform TextNodes to LeafNodes in one pass, shared through pool when given."""
+
+    if pool is not None:
+        return pool.convert(text_nodes)
+    return [LeafNode(*leaf_fields(node.text_type, node.text, node.url)) for node in text_nodes]
+
+
+def text_nodes_to_html(text_nodes) -> str:
+    """Return the html of TextNodes as their leaves would render it, without building any.
+
+    Raises what building and rendering the leaves would.
+    """
+
+    parts = []
+    append = parts.append
+    formats = INLINE_HTML_FORMATS
+    for node in text_nodes:
+        text_type = node.text_type
+        text = node.text
+        if text_type is TextType.TEXT:
+            if text is None:
+                raise ValueError('A leaf node must have a value.')
+            append(text)
+            continue
+        try:
+            html_format = formats[text_type]
+        except (KeyError, TypeError):
+            raise ValueError('Invalid text type')
+        if text is None and text_type is not TextType.IMAGE:
+            # An image leaf holds its text as the alt, with an empty value.
+            raise ValueError('A leaf node must have a value.')
+        append(html_format.format(text, node.url))
+    return ''.join(parts)
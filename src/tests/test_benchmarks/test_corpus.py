@@ -0,0 +1,56 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from benchmarks.corpus import CorpusConfig, generate_document, write_corpus
+from benchmarks.harness import compare_results
+from utilities.block_utilities import markdown_to_html_node
+from utilities.page_utilities import extract_title_markdown
+
+
+class TestCorpus(unittest.TestCase):
+    """Suite of tests for the synthetic corpus."""
+
+    def test_seeded(self):
+        """Test the same seed gives the same documents."""
+
+        config = CorpusConfig(pages=3, seed=7)
+        self.assertEqual(generate_document(config, 1), generate_document(config, 1))
+        self.assertNotEqual(generate_document(config, 1), generate_document(config._replace(seed=8), 1))
+
+    def test_documents_parse(self):
+        """Test every generated document, pathological ones included, renders."""
+
+        for pathological in (False, True):
+            config = CorpusConfig(pages=5, paragraph_words=20, pathological=pathological)
+            for i in range(config.pages):
+                with self.subTest(pathological=pathological, page=i):
+                    document = generate_document(config, i)
+                    self.assertTrue(extract_title_markdown(document).startswith(f'Page {i}'))
+                    self.assertTrue(markdown_to_html_node(document).to_html().startswith('<div>'))
+
+    def test_write_corpus(self):
+        """Test pages are written under nested sections."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = write_corpus(tmp_dir, CorpusConfig(pages=4, pathological=True))
+
+            self.assertEqual(len(set(paths)), 4)
+            self.assertEqual(len(paths[0].relative_to(tmp_dir).parts), 17)
+            self.assertTrue(all(path.exists() for path in paths))
+
+
+class TestCompareResults(unittest.TestCase):
+    """Suite of tests for compare_results."""
+
+    def test_regressions(self):
+        """Test only drops beyond the threshold are regressions."""
+
+        baseline = {'build': {'pages_per_s': 100.0}, 'to_html': {'pages_per_s': 100.0}}
+        results = {'build': {'pages_per_s': 95.0}, 'to_html': {'pages_per_s': 80.0}, 'new': {'pages_per_s': 1.0}}
+
+        self.assertEqual(compare_results(baseline, results, 0.1), {'to_html': (100.0, 80.0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
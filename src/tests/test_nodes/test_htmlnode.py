@@ -1,6 +1,6 @@
 import unittest
 
-from nodes.htmlnode import HTMLNode
+from nodes.htmlnode import HTMLNode, LeafNode, ParentNode
 
 class TestHTMLNode(unittest.TestCase):
     """Test suite for HTMLNode."""
@@ -25,6 +25,22 @@ class TestHTMLNode(unittest.TestCase):
             node2 = HTMLNode('This is a banana')
             self.assertNotEqual(node, node2)
 
+        with self.subTest("Assert not equal to other types."):
+            self.assertNotEqual(node, 'This is an html node')
+
+    def test_slots(self):
+        """Test nodes are slotted and keep no instance dict."""
+
+        nodes = [
+            HTMLNode('p'),
+            LeafNode('b', 'bold'),
+            ParentNode('p', [LeafNode('b', 'bold')]),
+        ]
+        for node in nodes:
+            with self.subTest(node=node):
+                self.assertFalse(hasattr(node, '__dict__'))
+                with self.assertRaises(AttributeError):
+                    node.unknown = True
 
     def test_props_to_html(self):
         """Test props method."""
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from nodes import ParentNode, LeafNode
@@ -60,6 +61,21 @@ class TestParentNode(unittest.TestCase):
         error_msg=str(context.exception)
         self.assertEqual(error_msg, 'Children cannot be None')
 
+    def test_write_html_matches_to_html(self):
+        """Test write_html streams the same html as to_html."""
+
+        node = ParentNode(tag='div', children=[self.parent, LeafNode(tag=None, value=' tail')])
+        sink = io.StringIO()
+        node.write_html(sink)
+
+        self.assertEqual(sink.getvalue(), node.to_html())
+
+    def test_write_html_missing_children(self):
+        """Test write_html validates like to_html."""
+
+        with self.assertRaises(ValueError):
+            ParentNode(tag='p', children=None).write_html(io.StringIO())
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,17 @@
+import pickle
 import unittest
 
-from nodes.textnode import TextNode, TextType, text_node_to_html_node
+from nodes import BaseTextNode, FrozenLeafNode, LeafNode
+from nodes.textnode import (
+    LeafPool,
+    PoolStats,
+    SpanTextNode,
+    TextNode,
+    TextType,
+    text_node_to_html_node,
+    text_nodes_to_html,
+    text_nodes_to_html_nodes
+)
 
 class TestTextNode(unittest.TestCase):
     """Test suite for TextNode."""
@@ -26,6 +37,15 @@ class TestTextNode(unittest.TestCase):
             node2 = TextNode('This is a text node', TextType.BOLD, 'http://test.test')
             self.assertNotEqual(node, node2)
 
+        with self.subTest("Assert not equal to other types."):
+            self.assertNotEqual(node, 'This is a text node')
+
+    def test_slots(self):
+        """Test TextNode is slotted and keeps no instance dict."""
+
+        node = TextNode('This is a text node', TextType.BOLD)
+        self.assertFalse(hasattr(node, '__dict__'))
+
     def test_transform_text_node_to_leaf_node(self):
         """Test transform TextNode to LeafNode."""
         text = 'This is a '
@@ -79,5 +99,166 @@ class TestTextNode(unittest.TestCase):
             self.assertEqual(html_node.tag, 'img')
             self.assertEqual(html_node.props, {'alt':text, 'src':url})
 
+    def test_invalid_text_type(self):
+        """Test an unknown text type is rejected."""
+
+        with self.assertRaises(ValueError):
+            text_node_to_html_node(TextNode('text', 'bold'))
+
+
+class TestSpanTextNode(unittest.TestCase):
+    """Test suite for SpanTextNode."""
+
+    source = 'Some **bold** words'
+
+    def test_text_is_the_span(self):
+        """Test text is sliced from the source."""
+
+        node = SpanTextNode(self.source, 7, 11, TextType.BOLD)
+        self.assertEqual('bold', node.text)
+        self.assertIs(self.source, node.source)
+        self.assertFalse(hasattr(node, '__dict__'))
+
+    def test_only_span_slots(self):
+        """Test a span holds no text slot, sharing only the base with TextNode."""
+
+        node = SpanTextNode(self.source, 7, 11, TextType.BOLD)
+        slots = [slot for cls in type(node).__mro__ for slot in getattr(cls, '__slots__', ())]
+
+        self.assertEqual(['source', 'start', 'end', 'text_type', 'url'], slots)
+        self.assertIsInstance(node, BaseTextNode)
+        self.assertNotIsInstance(node, TextNode)
+
+    def test_eq_and_repr_as_text_node(self):
+        """Test a span equals, and reprs as, the TextNode of its text."""
+
+        node = SpanTextNode(self.source, 7, 11, TextType.LINK, '/bold')
+        text_node = TextNode('bold', TextType.LINK, '/bold')
+
+        self.assertEqual(text_node, node)
+        self.assertEqual(node, text_node)
+        self.assertEqual(repr(text_node), repr(node))
+        self.assertNotEqual(TextNode('bold', TextType.BOLD), node)
+
+    def test_set_text(self):
+        """Test setting text replaces the span."""
+
+        node = SpanTextNode(self.source, 7, 11, TextType.BOLD)
+        node.text = 'new'
+
+        self.assertEqual(('new', 0, 3), (node.source, node.start, node.end))
+        self.assertEqual(TextNode('new', TextType.BOLD), node)
+
+    def test_pickle_as_text_node(self):
+        """Test a span pickles as a TextNode, without its source."""
+
+        node = pickle.loads(pickle.dumps(SpanTextNode(self.source, 7, 11, TextType.BOLD)))
+        self.assertIs(TextNode, type(node))
+        self.assertEqual(TextNode('bold', TextType.BOLD), node)
+
+    def test_html(self):
+        """Test spans render as the nodes of their text."""
+
+        nodes = [SpanTextNode(self.source, 0, 5, TextType.TEXT), SpanTextNode(self.source, 7, 11, TextType.BOLD)]
+        self.assertEqual('Some <b>bold</b>', text_nodes_to_html(nodes))
+        self.assertEqual('<b>bold</b>', text_node_to_html_node(nodes[1]).to_html())
+
+
+class TestLeafPool(unittest.TestCase):
+    """Test suite for LeafPool and batch conversion."""
+
+    def setUp(self):
+        """SetUp test class."""
+
+        self.nodes = [
+            TextNode('Home', TextType.LINK, '/'),
+            TextNode(' and ', TextType.TEXT),
+            TextNode('config', TextType.CODE),
+            TextNode('Home', TextType.LINK, '/'),
+            TextNode('Home', TextType.LINK, '/home'),
+            TextNode('logo', TextType.IMAGE, '/logo.png'),
+            TextNode('config', TextType.CODE),
+        ]
+
+    def test_batch_matches_single_conversion(self):
+        """Test batch conversion, pooled or not, gives the leaves of text_node_to_html_node."""
+
+        expected = [text_node_to_html_node(node).to_html() for node in self.nodes]
+        self.assertEqual([leaf.to_html() for leaf in text_nodes_to_html_nodes(self.nodes)], expected)
+        self.assertEqual([leaf.to_html() for leaf in text_nodes_to_html_nodes(self.nodes, LeafPool())], expected)
+        self.assertEqual(text_nodes_to_html_nodes(self.nodes, LeafPool()), list(map(text_node_to_html_node, self.nodes)))
+
+    def test_html_without_leaves(self):
+        """Test text_nodes_to_html renders what the leaves would."""
+
+        expected = ''.join(text_node_to_html_node(node).to_html() for node in self.nodes)
+        self.assertEqual(text_nodes_to_html(self.nodes), expected)
+        self.assertEqual(text_nodes_to_html([]), '')
+        with self.assertRaises(ValueError):
+            text_nodes_to_html([TextNode('text', 'bold')])
+
+    def test_html_without_leaves_errors(self):
+        """Test text_nodes_to_html raises what building the leaves would."""
+
+        nodes = [
+            TextNode(None, TextType.TEXT),
+            TextNode(None, TextType.BOLD),
+            TextNode(None, TextType.LINK, '/'),
+            TextNode(None, 'bold'),
+        ]
+        for node in nodes:
+            with self.subTest(node=node):
+                with self.assertRaises(ValueError) as expected:
+                    text_node_to_html_node(node).to_html()
+                with self.assertRaises(ValueError) as raised:
+                    text_nodes_to_html([node])
+                self.assertEqual(str(raised.exception), str(expected.exception))
+        self.assertEqual(
+            text_nodes_to_html([TextNode(None, TextType.IMAGE, '/i.png')]),
+            text_node_to_html_node(TextNode(None, TextType.IMAGE, '/i.png')).to_html(),
+        )
+
+    def test_identical_nodes_share_a_leaf(self):
+        """Test the same (type, text, url) gives one shared leaf."""
+
+        pool = LeafPool()
+        leaves = text_nodes_to_html_nodes(self.nodes, pool)
+
+        self.assertIs(leaves[0], leaves[3])
+        self.assertIs(leaves[2], leaves[6])
+        self.assertIsNot(leaves[0], leaves[4])
+        self.assertIs(pool.leaf(TextType.CODE, 'config'), leaves[2])
+        self.assertEqual(pool.stats(), PoolStats(5, 3, 5))
+
+    def test_pool_is_bounded(self):
+        """Test a full pool and long texts still convert, without growing the pool."""
+
+        pool = LeafPool(max_size=2, max_text=8)
+        nodes = self.nodes + [TextNode('a rather long text', TextType.BOLD)] * 2
+        leaves = text_nodes_to_html_nodes(nodes, pool)
+
+        self.assertEqual(len(pool), 2)
+        self.assertEqual([leaf.to_html() for leaf in leaves], [text_node_to_html_node(node).to_html() for node in nodes])
+        self.assertIsNot(leaves[-1], leaves[-2])
+        self.assertEqual(pool.stats().hits, 1)
+
+        pool.clear()
+        self.assertEqual(pool.stats(), PoolStats(0, 0, 0))
+
+    def test_shared_leaves_are_immutable(self):
+        """Test pooled leaves and their props cannot be changed."""
+
+        leaf = LeafPool().leaf(TextType.LINK, 'Home', '/')
+        self.assertIsInstance(leaf, FrozenLeafNode)
+        self.assertIsInstance(leaf, LeafNode)
+
+        with self.assertRaises(AttributeError):
+            leaf.value = 'Away'
+        with self.assertRaises(TypeError):
+            leaf.props['href'] = '/away'
+        self.assertEqual(leaf.to_html(), '<a href="/">Home</a>')
+        self.assertEqual(pickle.loads(pickle.dumps(leaf)), leaf)
+        self.assertEqual(repr(leaf), "FrozenLeafNode(a, Home, {'href': '/'})")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,7 +1,20 @@
+import io
+from pathlib import Path
+import tempfile
 import unittest
 
+from benchmarks.corpus import CorpusConfig, generate_document
+from nodes import FrozenLeafNode
+from nodes.textnode import LeafPool
 from utilities import markdown_to_blocks, block_to_block_type, markdown_to_html_node
-from utilities.block_utilities import BlockType
+from utilities.block_utilities import (
+    BlockType,
+    ClassifiedBlock,
+    MarkdownStream,
+    classify_block,
+    iter_markdown_blocks,
+    markdown_to_html
+)
 
 class TestMarkdownToBlocks(unittest.TestCase):
     """Suite of tests for markdown_to_blocks."""
@@ -51,6 +64,40 @@ This is the same paragraph on a new line
             ],
         )
 
+class TestIterMarkdownBlocks(unittest.TestCase):
+    """Suite of tests for iter_markdown_blocks."""
+
+    def test_matches_markdown_to_blocks(self):
+        """Test lines of a file split like the whole text."""
+
+        md = "\n# Title\n\n\n\npara one\n  \nstill para\n\n- a\n- b  \n\n"
+        self.assertEqual(list(iter_markdown_blocks(io.StringIO(md))), markdown_to_blocks(md))
+
+    def test_fence_keeps_blank_lines(self):
+        """Test blank lines inside a code fence do not split it."""
+
+        md = "para\n\n```python\nx = 1\n\n\ny = 2\n```\n\n```one line```\n\nend"
+        expected = ['para', '```python\nx = 1\n\n\ny = 2\n```', '```one line```', 'end']
+        self.assertEqual(list(iter_markdown_blocks(io.StringIO(md))), expected)
+        self.assertEqual(markdown_to_blocks(md), expected)
+
+    def test_backticks_that_open_no_fence(self):
+        """Test lines that are not a bare fence, and fences never closed, split on blank lines."""
+
+        documents = [
+            '```npm install``` sets things up\n\nSecond paragraph\n\n# Heading',
+            'para\n\n```\ncode\n``` and more\n\nSecond paragraph\n\n# Heading',
+            'para\n\n```python\nnever closed\n\nSecond paragraph\n\n# Heading',
+        ]
+        for md in documents:
+            with self.subTest(md):
+                # How blocks were split before fences were tracked.
+                expected = list(filter(str.strip, map(str.strip, md.strip().split('\n\n'))))
+                self.assertEqual(markdown_to_blocks(md), expected)
+                self.assertEqual(list(iter_markdown_blocks(io.StringIO(md))), expected)
+                self.assertEqual(expected[-1], '# Heading')
+
+
 
 class TestBlockToBlock(unittest.TestCase):
     """Suite of tests for markdown_to_blocks."""
@@ -129,6 +176,65 @@ This is code paragraph
             self.assertEqual(block_type, BlockType.ORDERED_LIST)
 
 
+class TestClassifyBlock(unittest.TestCase):
+    """Suite of tests for classify_block."""
+
+    def test_classify_block(self):
+        """Test the parsed data returned with each block type."""
+
+        cases = [
+            ('plain text', ClassifiedBlock(BlockType.PARAGRAPH)),
+            ('### Title', ClassifiedBlock(BlockType.HEADING, level=3)),
+            ('```\ncode\n```', ClassifiedBlock(BlockType.CODE)),
+            ('> one\n>two', ClassifiedBlock(BlockType.QUOTE, lines=['one', 'two'])),
+            ('- a\n- b', ClassifiedBlock(BlockType.UNORDERED_LIST, lines=['a', 'b'])),
+            ('1. a\n2. b', ClassifiedBlock(BlockType.ORDERED_LIST, lines=['a', 'b'])),
+            ('1. a\n3. b', ClassifiedBlock(BlockType.PARAGRAPH)),
+            ('- a\nb', ClassifiedBlock(BlockType.PARAGRAPH)),
+            ('####### too deep', ClassifiedBlock(BlockType.PARAGRAPH)),
+        ]
+        for block, expected in cases:
+            with self.subTest(block):
+                self.assertEqual(classify_block(block), expected)
+
+    def test_expected_types_levels_and_lines(self):
+        """Test each block against its expected type, level and lines, through both functions."""
+
+        items = [f'item {i}' for i in range(1, 13)]
+        cases = [
+            ('text', BlockType.PARAGRAPH, 0, None),
+            ('# h', BlockType.HEADING, 1, None),
+            ('###### h', BlockType.HEADING, 6, None),
+            ('#h', BlockType.PARAGRAPH, 0, None),
+            ('```\nx\n```', BlockType.CODE, 0, None),
+            ('```\nx', BlockType.PARAGRAPH, 0, None),
+            ('>q', BlockType.QUOTE, 0, ['q']),
+            ('> q\n>> r', BlockType.QUOTE, 0, ['q', 'r']),
+            ('- u', BlockType.UNORDERED_LIST, 0, ['u']),
+            ('-u', BlockType.PARAGRAPH, 0, None),
+            ('1. o', BlockType.ORDERED_LIST, 0, ['o']),
+            ('2. o', BlockType.PARAGRAPH, 0, None),
+            ('1.o', BlockType.PARAGRAPH, 0, None),
+            ('>q\n- u', BlockType.PARAGRAPH, 0, None),
+            ('\n'.join(f'{i}. {item}' for i, item in enumerate(items[:10], 1)), BlockType.ORDERED_LIST, 0, items[:10]),
+            ('\n'.join(f'{i}. {item}' for i, item in enumerate(items, 1)), BlockType.ORDERED_LIST, 0, items),
+            ('\n'.join(f'{i}. {item}' for i, item in enumerate(items, 1) if i != 11), BlockType.PARAGRAPH, 0, None),
+            ('\n'.join(f'{i}. {item}' for i, item in enumerate(items, 10)), BlockType.PARAGRAPH, 0, None),
+            ('\n'.join(f'{i:02}. {item}' for i, item in enumerate(items, 1)), BlockType.ORDERED_LIST, 0, items),
+        ]
+        for block, block_type, level, lines in cases:
+            with self.subTest(block):
+                self.assertEqual(classify_block(block), ClassifiedBlock(block_type, level, lines))
+                self.assertEqual(block_to_block_type(block), block_type)
+
+    def test_ordered_list_past_nine(self):
+        """Test items numbered 10 and up keep no leading space."""
+
+        md = '\n'.join(f'{i}. item {i}' for i in range(1, 12))
+        html = markdown_to_html_node(md).to_html()
+        self.assertIn('<li>item 10</li><li>item 11</li>', html)
+
+
 
 class TestMarkdownToHTML(unittest.TestCase):
     def test_markdown_to_blocks(self):
@@ -285,3 +391,97 @@ the **same** even with inline stuff
             html,
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
+
+    def test_tree_can_be_changed(self):
+        """Test the default tree has leaves of its own, and only a given pool shares them."""
+
+        md = "A [link](/) and `code`\n\n- A [link](/)"
+        node = markdown_to_html_node(md)
+        link = node.children[0].children[1]
+        self.assertNotIsInstance(link, FrozenLeafNode)
+        link.props['href'] = '/home'
+        link.value = 'home'
+        self.assertEqual(node.children[0].to_html(), '<p>A <a href="/home">home</a> and <code>code</code></p>')
+        self.assertEqual(markdown_to_html_node(md).to_html(), '<div><p>A <a href="/">link</a> and <code>code</code></p><ul><li>A <a href="/">link</a></li></ul></div>')
+
+        pool = LeafPool()
+        node = markdown_to_html_node(md, pool)
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+        self.assertIsInstance(node.children[0].children[1], FrozenLeafNode)
+        self.assertIs(node.children[0].children[1], node.children[1].children[0].children[1])
+        self.assertEqual(len(pool), 4)
+
+
+class TestMarkdownToHtmlDirect(unittest.TestCase):
+    """Suite of tests for the node free markdown_to_html."""
+
+    def render_both(self, markdown: str) -> tuple[str, str]:
+        """Return the html of both paths, or the error each raised."""
+
+        results = []
+        for render in (lambda: markdown_to_html_node(markdown).to_html(), lambda: markdown_to_html(markdown)):
+            try:
+                results.append(render())
+            except ValueError as e:
+                results.append(f'ValueError: {e}')
+        return tuple(results)
+
+    def test_matches_node_tree_on_corpus(self):
+        """Test both paths render the benchmark corpus identically."""
+
+        for config in (CorpusConfig(pages=40), CorpusConfig(pages=10, seed=3, pathological=True)):
+            for index in range(config.pages):
+                with self.subTest(pathological=config.pathological, page=index):
+                    tree_html, direct_html = self.render_both(generate_document(config, index))
+                    self.assertEqual(direct_html, tree_html)
+
+    def test_matches_node_tree_on_edge_cases(self):
+        """Test both paths agree on odd blocks, errors included."""
+
+        documents = [
+            '# Title\n\n###### Deep **heading**',
+            '```\nfenced\n\nwith a blank line\n```',
+            '> quoted\n>with [a link](/x) and ![img](/i.png)',
+            '1. one\n2. two\n3. `three`',
+            '- a\n- \n- b',
+            'an **unclosed bold',
+            '',
+        ]
+        for markdown in documents:
+            with self.subTest(markdown=markdown):
+                tree_html, direct_html = self.render_both(markdown)
+                self.assertEqual(direct_html, tree_html)
+
+    def test_raises_the_node_tree_errors(self):
+        """Test both paths, and the stream, raise the same error for the same bad markdown."""
+
+        documents = [
+            '- \n- a\n\nan **unclosed',
+            '- \n- `a',
+            '- a\n- \n- `b',
+            '> \n\n`x',
+            '- \n- a',
+            'an **unclosed bold',
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'page.md'
+            for markdown in documents:
+                with self.subTest(markdown=markdown):
+                    tree_error, direct_error = self.render_both(markdown)
+                    self.assertTrue(tree_error.startswith('ValueError: '))
+                    self.assertEqual(direct_error, tree_error)
+
+                    path.write_text(markdown)
+                    with self.assertRaises(ValueError) as raised:
+                        MarkdownStream(path).to_html()
+                    self.assertEqual(f'ValueError: {raised.exception}', tree_error)
+
+    def test_stream_renders_directly(self):
+        """Test MarkdownStream writes the same blocks as the node tree."""
+
+        markdown = generate_document(CorpusConfig(), 0)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'page.md'
+            path.write_text(markdown)
+            self.assertEqual(MarkdownStream(path).to_html(), markdown_to_html_node(markdown).to_html())
+
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from utilities.cache_utilities import RenderCache, parser_version
+
+
+class TestRenderCache(unittest.TestCase):
+    """Suite of tests for RenderCache."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmp_dir.name) / 'cache'
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_get_and_put(self):
+        """Test a stored document is returned until its content changes."""
+
+        cache = RenderCache(self.cache_dir)
+        self.assertIsNone(cache.get('# Title'))
+
+        cache.put('# Title', '<div><h1>Title</h1></div>')
+
+        self.assertEqual(cache.get('# Title'), '<div><h1>Title</h1></div>')
+        self.assertIsNone(cache.get('# Other title'))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_persisted_between_instances(self):
+        """Test entries survive into the next build."""
+
+        RenderCache(self.cache_dir).put('# Title', '<h1>Title</h1>')
+        self.assertEqual(RenderCache(self.cache_dir).get('# Title'), '<h1>Title</h1>')
+
+    def test_parser_version_invalidates(self):
+        """Test entries of another parser version are dropped."""
+
+        RenderCache(self.cache_dir, version='old').put('# Title', '<h1>Title</h1>')
+        cache = RenderCache(self.cache_dir, version='new')
+
+        self.assertIsNone(cache.get('# Title'))
+        self.assertFalse((self.cache_dir / 'old').exists())
+
+    def test_shared_with_other_processes(self):
+        """Test entries and directories removed by another process never fail a build."""
+
+        # A stale version another process is still writing to cannot be removed.
+        (self.cache_dir / 'old' / 'busy').mkdir(parents=True)
+        cache = RenderCache(self.cache_dir, max_bytes=1, version='new')
+        self.assertTrue((self.cache_dir / 'old').exists())
+
+        cache.put('# Title', '<h1>Title</h1>')
+        # Pruned by the put, as another process would have evicted it.
+        self.assertIsNone(cache.get('# Title'))
+
+        # Removed by a process of another parser version.
+        cache.entries_dir.rmdir()
+        cache.put('# Title', '<h1>Title</h1>')
+        cache.prune()
+        self.assertIsNone(cache.get('# Title'))
+
+    def test_parser_version_is_stable(self):
+        """Test the parser version only depends on the parser sources."""
+        self.assertEqual(parser_version(), parser_version())
+
+    def test_prune_evicts_least_recently_used(self):
+        """Test pruning keeps the most recently used entries within the bound."""
+
+        cache = RenderCache(self.cache_dir, max_bytes=10 ** 6)
+        for i in range(3):
+            cache.put(f'# Page {i}', 'x' * 100)
+            path = cache._entry_path(f'# Page {i}')
+            os.utime(path, ns=(i * 10 ** 9, i * 10 ** 9))
+        cache.get('# Page 0')
+
+        cache.max_bytes = 250
+        cache.prune()
+
+        self.assertIsNotNone(cache.get('# Page 0'))
+        self.assertIsNone(cache.get('# Page 1'))
+        self.assertIsNotNone(cache.get('# Page 2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
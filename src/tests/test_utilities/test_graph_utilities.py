@@ -0,0 +1,153 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from utilities.graph_utilities import DependencyGraph, page_references, resolve_url
+from utilities.output_utilities import OutputWriter
+from utilities.page_utilities import stage_pages
+from utilities.pipeline_utilities import build_pages_pipelined
+
+
+class TestResolveUrl(unittest.TestCase):
+    """Suite of tests for resolve_url."""
+
+    def test_resolve_url(self):
+        """Test urls resolve to output paths relative to the public dir."""
+
+        cases = [
+            ('/images/tom.png', 'blog/tom/index.html', 'images/tom.png'),
+            ('/blog/tom', 'index.html', 'blog/tom/index.html'),
+            ('/', 'blog/tom/index.html', 'index.html'),
+            ('../majesty#top', 'blog/tom/index.html', 'blog/majesty/index.html'),
+            ('tom.png?v=2', 'blog/tom/index.html', 'blog/tom/tom.png'),
+            ('https://www.boot.dev', 'index.html', None),
+            ('mailto:me@example.com', 'index.html', None),
+            ('#section', 'index.html', None),
+        ]
+        for url, page_output, expected in cases:
+            with self.subTest(url):
+                self.assertEqual(resolve_url(url, page_output), expected)
+
+    def test_page_references(self):
+        """Test images and internal links are collected outside code blocks."""
+
+        blocks = [
+            '![tom](/images/tom.png) and [home](/)',
+            '- [post](/blog/post) and [out](https://example.com)',
+            '```\n[not a link](/nowhere)\n```',
+        ]
+        self.assertEqual(
+            page_references(blocks, 'index.html'),
+            (['images/tom.png'], ['blog/post/index.html', 'index.html']),
+        )
+
+
+class TestDependencyGraph(unittest.TestCase):
+    """Suite of tests for DependencyGraph."""
+
+    def setUp(self):
+        """SetUp test class."""
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.content_dir = self.root / 'content'
+        (self.content_dir / 'blog' / 'post').mkdir(parents=True)
+        (self.content_dir / 'index.md').write_text(
+            '# Home\n\n![me](/images/me.png)\n\n[Post](/blog/post) and [Gone](/blog/gone)'
+        )
+        (self.content_dir / 'blog' / 'post' / 'index.md').write_text('# Post\n\n[Home](/)')
+
+        self.graph = DependencyGraph()
+        self.graph.scan(self.content_dir, 'template.html')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_dependents(self):
+        """Test the pages using a template, an image or a link are found."""
+
+        self.assertEqual(self.graph.dependents('template.html'), ['blog/post/index.md', 'index.md'])
+        self.assertEqual(self.graph.dependents('images/me.png'), ['index.md'])
+        self.assertEqual(self.graph.dependents('index.html'), ['blog/post/index.md'])
+        self.assertEqual(self.graph.affected_by(['images/me.png', 'index.html']), ['blog/post/index.md', 'index.md'])
+
+    def test_template_path_is_normalized(self):
+        """Test the template is found however its path is spelled, stored or queried."""
+
+        self.graph.scan(self.content_dir, './template.html')
+
+        for target in ('template.html', './template.html', 'blog/../template.html'):
+            with self.subTest(target):
+                self.assertEqual(self.graph.dependents(target), ['blog/post/index.md', 'index.md'])
+                self.assertEqual(self.graph.affected_by([target]), ['blog/post/index.md', 'index.md'])
+        self.assertEqual(self.graph.pages['index.md']['template'], 'template.html')
+
+    def test_broken_references(self):
+        """Test references missing from the outputs are reported."""
+
+        outputs = ['index.html', 'blog/post/index.html']
+        self.assertEqual(
+            self.graph.broken_references(outputs),
+            [('index.md', 'images/me.png'), ('index.md', 'blog/gone/index.html')],
+        )
+        self.assertEqual(self.graph.broken_references(outputs, {'blog/post/index.md'}), [])
+
+    def test_scan_updates_pages(self):
+        """Test rescanning pages replaces their entries and drops removed pages."""
+
+        (self.content_dir / 'index.md').write_text('# Home')
+        (self.content_dir / 'blog' / 'post' / 'index.md').unlink()
+        self.graph.scan(self.content_dir, 'template.html', ['index.md', 'blog/post/index.md'])
+
+        self.assertEqual(list(self.graph.pages), ['index.md'])
+        self.assertEqual(self.graph.pages['index.md']['links'], [])
+
+    def test_record_matches_scan(self):
+        """Test the references collected while pages render record the graph a scan does."""
+
+        template_path = self.root / 'template.html'
+        template_path.write_text('<title>{{ Title }}</title>{{ Content }}')
+        (self.content_dir / 'blog' / 'post' / 'index.md').write_text(
+            '# Post\n\n[Home](/)\n\n```\n[Code](/code)\n```\n\n- ![me](../../images/me.png)'
+        )
+        expected = DependencyGraph()
+        expected.scan(self.content_dir, template_path)
+
+        def stage(workers):
+            def build(references, stream_threshold):
+                with OutputWriter(self.root / 'public') as writer:
+                    stage_pages(
+                        self.content_dir, template_path, writer, workers,
+                        references=references, stream_threshold=stream_threshold
+                    )
+            return build
+
+        def pipeline(references, stream_threshold):
+            jobs = [(str(self.content_dir / key), entry['output']) for key, entry in expected.pages.items()]
+            with OutputWriter(self.root / 'public') as writer:
+                build_pages_pipelined(
+                    jobs, template_path, writer=writer, references=references, stream_threshold=stream_threshold
+                )
+
+        builds = {'serial': stage(1), 'pool': stage(3), 'pipeline': pipeline}
+        for stream_threshold in (None, 0):
+            for name, build in builds.items():
+                with self.subTest(name, stream_threshold=stream_threshold):
+                    references = {}
+                    build(references, stream_threshold)
+                    graph = DependencyGraph({'stale.md': {}})
+                    graph.record(references, template_path, replace=True)
+                    self.assertEqual(graph, expected)
+
+    def test_round_trip(self):
+        """Test a saved graph loads back equal."""
+
+        graph_path = self.root / 'graph.json'
+        self.graph.save(graph_path)
+        self.assertEqual(DependencyGraph.load(graph_path), self.graph)
+        self.assertEqual(DependencyGraph.load(self.root / 'missing.json'), DependencyGraph())
+
+
+if __name__ == '__main__':
+    unittest.main()
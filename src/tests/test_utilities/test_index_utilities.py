@@ -0,0 +1,126 @@
+import os
+from pathlib import Path
+import tempfile
+import time
+import unittest
+
+from utilities.index_utilities import ContentIndex
+from utilities.page_utilities import list_pages
+
+
+class TestContentIndex(unittest.TestCase):
+    """Suite of tests for ContentIndex."""
+
+    def setUp(self):
+        """SetUp test class."""
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.content_dir = self.root / 'content'
+        (self.content_dir / 'blog' / 'post').mkdir(parents=True)
+        (self.content_dir / 'images').mkdir()
+        (self.content_dir / 'index.md').write_text('# Home\n\nWelcome')
+        (self.content_dir / 'blog' / 'post' / 'index.md').write_text('Intro\n\n# Post\n\nText')
+        (self.content_dir / 'blog' / 'notes.txt').write_text('not a page')
+        # Well past the mtime granularity, so that nothing is looked at again as racy.
+        old_ns = time.time_ns() - 60 * 10 ** 9
+        for path in (self.content_dir, *self.content_dir.rglob('*')):
+            os.utime(path, ns=(old_ns, old_ns))
+
+        self.index = ContentIndex(self.content_dir)
+        self.summary = self.index.refresh()
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def bump(self, path: Path):
+        """Move the mtime of path forward so the change cannot be missed."""
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_first_refresh(self):
+        """Test every directory is listed and every page recorded with its title."""
+
+        self.assertEqual(sorted(self.summary.scanned), ['', 'blog', 'blog/post', 'images'])
+        self.assertEqual(sorted(self.index.jobs()), sorted(list_pages(self.content_dir)))
+        self.assertEqual(self.index.pages['blog/post/index.md']['title'], 'Post')
+        self.assertEqual(self.index.pages['blog/post/index.md']['output'], 'blog/post/index.html')
+        self.assertEqual(self.index.titles()[str(self.content_dir / 'index.md')], 'Home')
+
+    def test_unchanged_refresh(self):
+        """Test a refresh without changes lists no directory and reads no page."""
+        self.assertEqual(self.index.refresh(), ([], [], []))
+
+    def test_added_page(self):
+        """Test only the directory that gained a page is listed again."""
+
+        (self.content_dir / 'blog' / 'new.md').write_text('# New')
+        self.bump(self.content_dir / 'blog')
+
+        summary = self.index.refresh()
+        self.assertEqual(summary, (['blog'], ['blog/new.md'], []))
+        self.assertEqual(self.index.pages['blog/new.md']['title'], 'New')
+
+    def test_edited_page(self):
+        """Test an edit is picked up without listing any directory."""
+
+        (self.content_dir / 'index.md').write_text('# Home page\n\nWelcome')
+        self.bump(self.content_dir / 'index.md')
+
+        self.assertEqual(self.index.refresh(), ([], ['index.md'], []))
+        self.assertEqual(self.index.pages['index.md']['title'], 'Home page')
+
+    def test_racy_entries_are_read_again(self):
+        """Test changes leaving the mtime as it was are picked up while it is within the granularity."""
+
+        mtime_ns = time.time_ns()
+        (self.content_dir / 'blog' / 'new.md').write_text('# New')
+        (self.content_dir / 'index.md').write_text('# Home page\n\nWelcome')
+        for path in (self.content_dir / 'blog', self.content_dir / 'index.md'):
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        self.index.refresh()
+
+        # Changed again within the same tick of a coarse clock.
+        (self.content_dir / 'blog' / 'newer.md').write_text('# Newer')
+        (self.content_dir / 'index.md').write_text('# Home PAGE\n\nWelcome')
+        for path in (self.content_dir / 'blog', self.content_dir / 'index.md'):
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+        summary = self.index.refresh()
+        self.assertEqual(summary.scanned, ['blog'])
+        self.assertIn('blog/newer.md', summary.changed)
+        self.assertEqual(self.index.pages['index.md']['title'], 'Home PAGE')
+
+    def test_removed_page(self):
+        """Test removed pages and directories are dropped."""
+
+        (self.content_dir / 'blog' / 'post' / 'index.md').unlink()
+        (self.content_dir / 'blog' / 'post').rmdir()
+        self.bump(self.content_dir / 'blog')
+
+        summary = self.index.refresh()
+        self.assertEqual(summary.removed, ['blog/post/index.md'])
+        self.assertNotIn('blog/post', self.index.dirs)
+
+    def test_missing_title(self):
+        """Test a page without a title is indexed without one."""
+
+        (self.content_dir / 'index.md').write_text('No title')
+        self.bump(self.content_dir / 'index.md')
+        self.index.refresh()
+
+        self.assertIsNone(self.index.pages['index.md']['title'])
+        self.assertNotIn(str(self.content_dir / 'index.md'), self.index.titles())
+
+    def test_round_trip(self):
+        """Test a saved index loads back equal, and not for another content dir."""
+
+        index_path = self.root / 'index.json'
+        self.index.save(index_path)
+        self.assertEqual(ContentIndex.load(index_path, self.content_dir), self.index)
+        self.assertEqual(ContentIndex.load(index_path, self.root), ContentIndex(self.root))
+
+
+if __name__ == '__main__':
+    unittest.main()
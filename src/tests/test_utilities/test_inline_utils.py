@@ -1,14 +1,20 @@
+import random
 import unittest
-from nodes import TextNode, TextType
+from unittest import mock
+from nodes import SpanTextNode, TextNode, TextType
 
 from utilities import (
+    DelimiterTable,
     split_nodes_delimiter, 
+    split_nodes_delimiters,
     extract_markdown_images,
     extract_markdown_links,
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes
 )
+from utilities.inline_utilities import INLINE_DELIMITERS, INLINE_PARSERS
+from nodes.textnode import text_nodes_to_html
 
 class TestSplitNodesDelimiter(unittest.TestCase):
     """Suite of tests for test_split_nodes_delimiter."""
@@ -129,6 +135,117 @@ class TestSplitNodesDelimiter(unittest.TestCase):
 
 
 
+class TestDelimiterTable(unittest.TestCase):
+    """Suite of tests for DelimiterTable and split_nodes_delimiters."""
+
+    def setUp(self):
+        """Set up a table with strikethrough registered."""
+        self.table = DelimiterTable()
+        self.table.register("~~", TextType.STRIKETHROUGH)
+
+    def test_scan_spans(self):
+        """Test scan returns offsets into the text, delimiters excluded."""
+        text = "a **b** _c_ `d`"
+
+        spans = DelimiterTable().scan(text)
+
+        self.assertListEqual(
+            [
+                (0, 2, TextType.TEXT),
+                (4, 5, TextType.BOLD),
+                (7, 8, TextType.TEXT),
+                (9, 10, TextType.ITALIC),
+                (11, 12, TextType.TEXT),
+                (13, 14, TextType.CODE),
+            ],
+            spans,
+        )
+
+    def test_scan_range(self):
+        """Test scan reads only text[start:end]."""
+        self.assertListEqual(
+            [(6, 7, TextType.BOLD), (9, 11, TextType.TEXT)],
+            DelimiterTable().scan("**a **b** c**", 4, 11),
+        )
+
+    def test_scan_missing_closing(self):
+        """Test scan raises for the earliest delimiter left open."""
+        with self.assertRaisesRegex(ValueError, r"No closing delimiter found for \*\*"):
+            DelimiterTable().scan("_a **b_ c")
+
+    def test_register_errors(self):
+        """Test empty and duplicate delimiters are refused."""
+        with self.assertRaises(ValueError):
+            self.table.register("", TextType.BOLD)
+        with self.assertRaises(ValueError):
+            self.table.register("~~", TextType.STRIKETHROUGH)
+
+    def test_registered_delimiter(self):
+        """Test a registered delimiter splits like the built in ones."""
+        node = TextNode("**bold** and ~~gone~~", TextType.TEXT)
+
+        result = split_nodes_delimiters([node], self.table)
+
+        self.assertListEqual(
+            [
+                TextNode("bold", TextType.BOLD),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("gone", TextType.STRIKETHROUGH),
+            ],
+            result,
+        )
+        self.assertEqual("<b>bold</b> and <s>gone</s>", text_nodes_to_html(result))
+
+    def test_not_registered_by_default(self):
+        """Test ~~ is plain text unless registered."""
+        node = TextNode("~~gone~~", TextType.TEXT)
+        self.assertListEqual([node], split_nodes_delimiters([node]))
+
+    def test_same_as_split_passes(self):
+        """Test nodes and errors match one split_nodes_delimiter pass per delimiter."""
+        texts = [
+            "plain",
+            "**b** _i_ `c` ~~s~~",
+            "**b `c` b** and `c **b** c`",
+            "_i **b** i_",
+            "****",
+            "~~a `b` a~~",
+            "`a ~~b` c~~",
+            "**a",
+        ]
+        nodes = [TextNode("x", TextType.LINK, "y"), TextNode("_a", TextType.TEXT), TextNode("b**", TextType.TEXT)]
+
+        for table in (DelimiterTable(), self.table):
+            for old_nodes in [[TextNode(text, TextType.TEXT)] for text in texts] + [nodes]:
+                with self.subTest(table=table, nodes=old_nodes):
+                    try:
+                        expected = old_nodes
+                        for delimiter, text_type in table.delimiters:
+                            expected = split_nodes_delimiter(old_nodes=expected, delimiter=delimiter, text_type=text_type)
+                    except ValueError as e:
+                        with self.assertRaisesRegex(ValueError, str(e).replace("*", "\\*")):
+                            split_nodes_delimiters(old_nodes, table)
+                        continue
+                    self.assertListEqual(expected, split_nodes_delimiters(old_nodes, table))
+
+    def test_span_nodes(self):
+        """Test span nodes are scanned in their source and give span nodes with spans."""
+        source = "[x](y) **b** _i_ c"
+        node = SpanTextNode(source, 6, len(source), TextType.TEXT)
+
+        result = split_nodes_delimiters([node], spans=True)
+
+        self.assertListEqual(split_nodes_delimiters([TextNode(node.text, TextType.TEXT)]), result)
+        for new_node in result:
+            self.assertIsInstance(new_node, SpanTextNode)
+            self.assertIs(source, new_node.source)
+        self.assertNotIsInstance(split_nodes_delimiters([node])[0], SpanTextNode)
+
+    def test_default_table(self):
+        """Test the default table holds the built in delimiters."""
+        self.assertEqual(INLINE_DELIMITERS, DelimiterTable().delimiters)
+
+
 class TestExtractMarkdownImages(unittest.TestCase):
     """Suite of tests for extract_markdown_images."""
 
@@ -511,19 +628,133 @@ class TestTextToTextNodes(unittest.TestCase):
         """Test text to list of TextNodes."""
 
         text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
-        new_nodes = text_to_textnodes(text)
-        self.assertListEqual(
-            [
-                TextNode("This is ", TextType.TEXT),
-                TextNode("text", TextType.BOLD),
-                TextNode(" with an ", TextType.TEXT),
-                TextNode("italic", TextType.ITALIC),
-                TextNode(" word and a ", TextType.TEXT),
-                TextNode("code block", TextType.CODE),
-                TextNode(" and an ", TextType.TEXT),
-                TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
-                TextNode(" and a ", TextType.TEXT),
-                TextNode("link", TextType.LINK, "https://boot.dev"),
-            ],
-            new_nodes,
-        )
\ No newline at end of file
+        for parser in INLINE_PARSERS:
+            with self.subTest(parser=parser):
+                new_nodes = text_to_textnodes(text, parser=parser)
+                self.assertListEqual(
+                    [
+                        TextNode("This is ", TextType.TEXT),
+                        TextNode("text", TextType.BOLD),
+                        TextNode(" with an ", TextType.TEXT),
+                        TextNode("italic", TextType.ITALIC),
+                        TextNode(" word and a ", TextType.TEXT),
+                        TextNode("code block", TextType.CODE),
+                        TextNode(" and an ", TextType.TEXT),
+                        TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
+                        TextNode(" and a ", TextType.TEXT),
+                        TextNode("link", TextType.LINK, "https://boot.dev"),
+                    ],
+                    new_nodes,
+                )
+
+    def test_unknown_parser(self):
+        """Test an unknown parser name is rejected."""
+
+        with self.assertRaises(ValueError):
+            text_to_textnodes("text", parser="nope")
+
+
+class TestScanConformance(unittest.TestCase):
+    """The scan parser must emit the same nodes as the split passes."""
+
+    texts = [
+        "",
+        "This is a text node",
+        "**Bold1** normal **Bold2**",
+        "**Bold1**_Italic1_",
+        "Empty bold: ****",
+        "This is text with a ![rick roll](https://i.imgur.com/aKaOqIh.gif) and ![obi wan](https://i.imgur.com/fJRm4Vk.jpeg)",
+        "![image1](https://i.imgur.com/img1.png)![image2](https://i.imgur.com/img2.png)",
+        "This text contains a malformed image ![broken-image]https://i.imgur.com/broken.png)",
+        "This text has ![an image without a URL](). And another broken one ![broken-image](broken-url).",
+        "[link1](https://example.com/1)[link2](https://example.com/2)",
+        "This text contains a malformed link [broken-link](https://example.com/broken",
+        "This contains an image ![image](https://example.com/image.jpg) and a [link](https://example.com)",
+        "**bold with `code` inside** and _italic_ and `code`",
+        "This is a huge wall of text with images ![image1](https://img1.com) "
+        + "and **more** text and ![image2](https://img2.com) [x](y). " * 200,
+    ]
+
+    invalid_texts = [
+        "This has **bold without closing",
+        "An _italic around **bold** words_",
+        "This is a code block: `function([param](https://example.com))` and a real [link](https://real.com)",
+        "A link [with_underscore](https://example.com/a_b) and _one",
+        "_italic before a [link](https://example.com) and **bold after",
+        "`code` ![image](https://example.com/i.png) then _italic and **bold",
+        "`[![x](y)!!~~]a![x](y)**`[l](u)",
+    ]
+
+    # Fragments of the random texts compared by test_same_results.
+    fragments = ['a', ' ', '*', '**', '_', '`', '~~', '!', '[', ']', '[l](u)', '![x](y)']
+
+    def parse(self, text, **kwargs):
+        """Return the nodes of text, or the message of the error it raises."""
+
+        try:
+            return text_to_textnodes(text, **kwargs)
+        except ValueError as error:
+            return str(error)
+
+    def test_same_nodes(self):
+        """Test both parsers emit equal node lists."""
+
+        for text in self.texts:
+            with self.subTest(text=text[:40]):
+                self.assertListEqual(
+                    text_to_textnodes(text, parser='split'),
+                    text_to_textnodes(text, parser='scan'),
+                )
+
+    def test_same_nodes_as_spans(self):
+        """Test the scan parser emits the nodes of the split passes as spans of the text."""
+
+        for text in self.texts:
+            with self.subTest(text=text[:40]):
+                nodes = text_to_textnodes(text, spans=True)
+                self.assertListEqual(text_to_textnodes(text, parser='split'), nodes)
+                self.assertTrue(all(isinstance(node, SpanTextNode) for node in nodes))
+        for node in text_to_textnodes(self.texts[-2], spans=True):
+            self.assertIs(self.texts[-2], node.source)
+
+        with self.assertRaises(ValueError):
+            text_to_textnodes("text", parser='split', spans=True)
+
+    def test_same_errors(self):
+        """Test both parsers reject unbalanced delimiters."""
+
+        for text in self.invalid_texts:
+            for parser in INLINE_PARSERS:
+                with self.subTest(text=text, parser=parser):
+                    with self.assertRaises(ValueError):
+                        text_to_textnodes(text, parser=parser)
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text, spans=True)
+
+    def test_same_error_messages(self):
+        """Test both parsers fail on the same delimiter, the earliest left open in any text gap."""
+
+        for text in self.invalid_texts:
+            with self.subTest(text=text):
+                message = self.parse(text, parser='split')
+                self.assertIsInstance(message, str)
+                self.assertEqual(message, self.parse(text, parser='scan'))
+                self.assertEqual(message, self.parse(text, spans=True))
+
+        self.assertEqual(
+            self.parse("_italic before a [link](https://example.com) and **bold after"),
+            'No closing delimiter found for **',
+        )
+
+    def test_same_results(self):
+        """Test both parsers give the same nodes or error on random texts, with a registered delimiter."""
+
+        table = DelimiterTable(INLINE_DELIMITERS + (('~~', TextType.STRIKETHROUGH),))
+        rng = random.Random(4)
+        with mock.patch('utilities.inline_utilities.DELIMITERS', table):
+            for _ in range(3000):
+                text = ''.join(rng.choice(self.fragments) for _ in range(rng.randint(0, 16)))
+                with self.subTest(text=text):
+                    expected = self.parse(text, parser='split')
+                    self.assertEqual(expected, self.parse(text, parser='scan'))
+                    self.assertEqual(expected, self.parse(text, spans=True))
@@ -0,0 +1,69 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from utilities.manifest_utilities import BuildManifest, file_digest, remove_output
+
+
+class TestBuildManifest(unittest.TestCase):
+    """Suite of tests for BuildManifest."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """Test a manifest survives a round trip."""
+
+        manifest = BuildManifest(
+            template_digest='abc',
+            pages={'index.md': {'digest': 'def', 'dest': 'index.html'}},
+            static={'index.css': [1, 2]},
+        )
+        manifest_path = self.root / 'manifest.json'
+        manifest.save(manifest_path)
+
+        self.assertEqual(BuildManifest.load(manifest_path), manifest)
+
+    def test_load_missing_or_corrupt(self):
+        """Test a missing or corrupt manifest loads empty."""
+
+        with self.subTest('Missing manifest.'):
+            self.assertEqual(BuildManifest.load(self.root / 'missing.json'), BuildManifest())
+
+        with self.subTest('Corrupt manifest.'):
+            manifest_path = self.root / 'corrupt.json'
+            manifest_path.write_text('{not json')
+            self.assertEqual(BuildManifest.load(manifest_path), BuildManifest())
+
+    def test_file_digest(self):
+        """Test digests follow file content."""
+
+        path = self.root / 'a.md'
+        path.write_text('# A')
+        digest = file_digest(path)
+
+        self.assertEqual(digest, file_digest(path))
+        path.write_text('# B')
+        self.assertNotEqual(digest, file_digest(path))
+
+    def test_remove_output_prunes_empty_dirs(self):
+        """Test removing an output prunes empty parents but not the root."""
+
+        path = self.root / 'blog' / 'post' / 'index.html'
+        path.parent.mkdir(parents=True)
+        path.write_text('<html></html>')
+
+        remove_output(path, self.root)
+
+        self.assertFalse((self.root / 'blog').exists())
+        self.assertTrue(self.root.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+from pathlib import Path
+import json
+import tempfile
+import unittest
+
+from utilities.manifest_utilities import BuildManifest, file_digest
+from utilities.output_utilities import OUTPUT_MANIFEST, OutputWriter, WriteSummary, load_output_manifest
+from utilities.page_utilities import generate_pages_incremental, stage_pages
+from utilities.static_utilities import sync_static_dir
+
+
+class TestOutputWriter(unittest.TestCase):
+    """Suite of tests for OutputWriter."""
+
+    def setUp(self):
+        """SetUp test class."""
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+        self.public_dir = root / 'public'
+        self.static_dir = root / 'static'
+        (self.static_dir / 'images').mkdir(parents=True)
+        (self.static_dir / 'index.css').write_text('body {}')
+        (self.static_dir / 'images' / 'a.png').write_bytes(b'png')
+
+        with OutputWriter(self.public_dir) as writer:
+            writer.copy_tree(self.static_dir)
+            writer.write('index.html', '<p>home</p>')
+            writer.write('blog/post.html', '<p>post</p>')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_first_write(self):
+        """Test every file lands in the public dir and the staging dir is gone."""
+
+        self.assertEqual((self.public_dir / 'blog' / 'post.html').read_text(), '<p>post</p>')
+        self.assertEqual((self.public_dir / 'images' / 'a.png').read_bytes(), b'png')
+        self.assertFalse(Path(self.tmp_dir.name, 'public.staging').exists())
+
+    def test_unchanged_files_are_kept(self):
+        """Test files with the same bytes keep their inode, changed ones are written."""
+
+        unchanged = (self.public_dir / 'index.html').stat()
+        with OutputWriter(self.public_dir) as writer:
+            writer.copy_tree(self.static_dir)
+            writer.write('index.html', '<p>home</p>')
+            writer.write('blog/post.html', '<p>new post</p>')
+
+        stat = (self.public_dir / 'index.html').stat()
+        self.assertEqual((stat.st_ino, stat.st_mtime_ns), (unchanged.st_ino, unchanged.st_mtime_ns))
+        self.assertEqual((self.public_dir / 'blog' / 'post.html').read_text(), '<p>new post</p>')
+        self.assertEqual(
+            sorted(writer.summary.written), ['blog/post.html'],
+        )
+        self.assertIsInstance(writer.summary, WriteSummary)
+
+    def test_removed_files_are_dropped(self):
+        """Test files no longer written are gone after the swap."""
+
+        with OutputWriter(self.public_dir) as writer:
+            writer.write('index.html', '<p>home</p>')
+
+        self.assertEqual(sorted(p.name for p in self.public_dir.iterdir()), ['index.html'])
+
+    def test_failure_keeps_public_dir(self):
+        """Test a failing build leaves the public dir untouched."""
+
+        with self.assertRaises(RuntimeError):
+            with OutputWriter(self.public_dir) as writer:
+                writer.write('index.html', '<p>broken</p>')
+                raise RuntimeError('render failed')
+
+        self.assertEqual((self.public_dir / 'index.html').read_text(), '<p>home</p>')
+        self.assertTrue((self.public_dir / 'blog' / 'post.html').exists())
+        self.assertFalse(writer.staging_dir.exists())
+
+    def test_later_write_wins(self):
+        """Test a key written twice holds the last data."""
+
+        with OutputWriter(self.public_dir) as writer:
+            writer.copy('index.html', self.static_dir / 'index.css')
+            writer.write('index.html', '<p>page</p>')
+
+        self.assertEqual((self.public_dir / 'index.html').read_text(), '<p>page</p>')
+
+    def test_write_stream(self):
+        """Test a streamed file is written piece by piece and kept when its bytes did not change."""
+
+        def build(digests):
+            with OutputWriter(self.public_dir, digests=digests) as writer:
+                writer.write_stream('index.html', lambda sink: [sink.write(part) for part in ('<p>', 'home', '</p>')])
+                writer.write_stream('blog/post.html', lambda sink: sink.write('<p>new post</p>'))
+            return writer.summary
+
+        for digests in (False, True):
+            with self.subTest(digests=digests):
+                build(digests)
+                unchanged = (self.public_dir / 'index.html').stat()
+                summary = build(digests)
+
+                stat = (self.public_dir / 'index.html').stat()
+                self.assertEqual((stat.st_ino, stat.st_mtime_ns), (unchanged.st_ino, unchanged.st_mtime_ns))
+                self.assertEqual((self.public_dir / 'blog' / 'post.html').read_text(), '<p>new post</p>')
+                self.assertEqual(summary, WriteSummary([], ['index.html', 'blog/post.html']))
+
+    def test_failed_stream_keeps_public_dir(self):
+        """Test a stream raising midway leaves neither a partial file nor a changed public dir."""
+
+        def write(sink):
+            sink.write('<p>half')
+            raise RuntimeError('render failed')
+
+        with self.assertRaises(RuntimeError):
+            with OutputWriter(self.public_dir) as writer:
+                writer.write_stream('index.html', write)
+
+        self.assertEqual((self.public_dir / 'index.html').read_text(), '<p>home</p>')
+        self.assertFalse(writer.staging_dir.exists())
+
+
+
+class TestOutputManifest(unittest.TestCase):
+    """Suite of tests for OutputWriter with digests."""
+
+    def setUp(self):
+        """SetUp test class."""
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.public_dir = self.root / 'public'
+        self.static_dir = self.root / 'static'
+        self.static_dir.mkdir()
+        (self.static_dir / 'index.css').write_text('body {}')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def build(self, pages: dict[str, str]) -> OutputWriter:
+        """Write the static dir and pages with digests."""
+
+        with OutputWriter(self.public_dir, digests=True) as writer:
+            writer.copy_tree(self.static_dir)
+            for key, html in pages.items():
+                writer.write(key, html)
+        return writer
+
+    def test_manifest_lists_every_file(self):
+        """Test the manifest holds the digest and size of every file but itself."""
+
+        self.build({'index.html': '<p>home</p>'})
+
+        manifest = json.loads((self.public_dir / OUTPUT_MANIFEST).read_text())
+        self.assertEqual(sorted(manifest['files']), ['index.css', 'index.html'])
+        for key, entry in manifest['files'].items():
+            path = self.public_dir / key
+            self.assertEqual(entry, {'sha256': file_digest(path), 'size': path.stat().st_size})
+
+    def test_site_manifest_json_is_kept(self):
+        """Test a page or asset named manifest.json is written like any other file."""
+
+        (self.static_dir / 'manifest.json').write_text('{"name": "site"}')
+        self.build({'index.html': '<p>home</p>', 'app/manifest.json': '{"name": "app"}'})
+
+        self.assertEqual((self.public_dir / 'manifest.json').read_text(), '{"name": "site"}')
+        self.assertEqual((self.public_dir / 'app' / 'manifest.json').read_text(), '{"name": "app"}')
+        self.assertIn('manifest.json', load_output_manifest(self.public_dir))
+
+    def test_unchanged_by_digest(self):
+        """Test files are matched against the previous manifest."""
+
+        self.build({'index.html': '<p>home</p>', 'about.html': '<p>about</p>'})
+        writer = self.build({'index.html': '<p>home</p>', 'about.html': '<p>ABOUT</p>'})
+
+        self.assertEqual(writer.summary.written, ['about.html'])
+        self.assertEqual(sorted(writer.summary.unchanged), ['index.css', 'index.html'])
+        self.assertEqual(load_output_manifest(self.public_dir), writer.files)
+
+    def test_missing_manifest_writes_everything(self):
+        """Test a public dir without a manifest is written in full."""
+
+        self.build({'index.html': '<p>home</p>'})
+        (self.public_dir / OUTPUT_MANIFEST).unlink()
+
+        writer = self.build({'index.html': '<p>home</p>'})
+        self.assertEqual(sorted(writer.summary.written), ['index.css', 'index.html'])
+
+    def test_edited_output_is_rewritten(self):
+        """Test a file changed after the manifest was written is not trusted to match it."""
+
+        self.build({'index.html': '<p>the cat</p>'})
+        (self.public_dir / 'index.html').write_text('<p>teh cat</p>')
+
+        writer = self.build({'index.html': '<p>the cat</p>'})
+        self.assertEqual(writer.summary.written, ['index.html'])
+        self.assertEqual((self.public_dir / 'index.html').read_text(), '<p>the cat</p>')
+
+    def test_in_place_writers_update_manifest(self):
+        """Test incremental builds and static syncs keep the deploy manifest true to the files."""
+
+        content_dir = self.root / 'content'
+        content_dir.mkdir()
+        template_path = self.root / 'template.html'
+        template_path.write_text('{{ Content }}')
+        page = content_dir / 'index.md'
+
+        def deploy_build():
+            with OutputWriter(self.public_dir, digests=True) as writer:
+                writer.copy_tree(self.static_dir, link=False)
+                stage_pages(content_dir, template_path, writer)
+
+        page.write_text('# Cat\n\nthe cat')
+        deploy_build()
+        expected = (self.public_dir / 'index.html').read_text()
+
+        page.write_text('# Cat\n\nteh cat')
+        generate_pages_incremental(content_dir, template_path, self.public_dir, BuildManifest())
+        (self.static_dir / 'index.css').write_text('body {color: red}')
+        sync_static_dir(self.static_dir, self.public_dir, previous=['index.css'])
+        for key, entry in load_output_manifest(self.public_dir).items():
+            path = self.public_dir / key
+            self.assertEqual(entry, {'sha256': file_digest(path), 'size': path.stat().st_size})
+
+        page.write_text('# Cat\n\nthe cat')
+        deploy_build()
+        self.assertEqual((self.public_dir / 'index.html').read_text(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,29 @@
+import os
 from pathlib import Path
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
 from utilities import extract_title_markdown
 from utilities.block_utilities import BlockType
-from utilities.page_utilities import generate_page
+from utilities.cache_utilities import RenderCache
+from utilities.index_utilities import ContentIndex
+from utilities.manifest_utilities import BuildManifest
+from utilities.output_utilities import OutputWriter
+from utilities.page_utilities import (
+    PageGenerationError,
+    PageResult,
+    extract_title_lines,
+    generate_page,
+    generate_pages_incremental,
+    generate_pages_recursive,
+    list_pages,
+    render_page,
+    render_site,
+    stage_pages
+)
+from utilities.template_utilities import CompiledTemplate
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -48,6 +68,40 @@ This is the same paragraph on a new line
         error_msg = str(context.exception)
         self.assertEqual(error_msg, 'Missing or incorrect title')
 
+    def test_extract_title_lines(self):
+        """Test the title of markdown lines matches extract_title_markdown."""
+
+        md = "Intro\n## Not a title\n#  This is a title \nText\n"
+        self.assertEqual(extract_title_lines(md.splitlines(True)), extract_title_markdown(md))
+        with self.assertRaises(ValueError):
+            extract_title_lines(["## This is not a title\n"])
+
+    def test_extract_title_same_everywhere(self):
+        """Test text, bytes and lines agree on the title, or on there being none."""
+
+        cases = [
+            ("#\nTitle\n", None),
+            ("#   \n# Real title\n", "Real title"),
+            ("#\t Tabbed\t\r\n", "Tabbed"),
+            ("# Two  words \nText", "Two  words"),
+            ("Text\n #  Indented\n", None),
+            ("#No space\n", None),
+            ("", None),
+        ]
+        for md, expected in cases:
+            with self.subTest(md=md):
+                found = []
+                for extract, text in (
+                    (extract_title_markdown, md),
+                    (extract_title_markdown, md.encode()),
+                    (extract_title_lines, md.splitlines(True)),
+                ):
+                    try:
+                        found.append(extract(text))
+                    except ValueError:
+                        found.append(None)
+                self.assertEqual(found, [expected] * 3)
+
 
 class TestGeneratePage(unittest.TestCase):
     """Suite of tests for generate_page."""
@@ -64,6 +118,22 @@ class TestGeneratePage(unittest.TestCase):
             import shutil
             shutil.rmtree(public_dir)
 
+        # Run from another directory these would be left behind, e.g. as a page of the site.
+        created = [
+            path for path in (public_dir, self.from_path.parent, self.from_path, self.template_path)
+            if not path.exists()
+        ]
+        self.addCleanup(self.remove_paths, created)
+
+    def remove_paths(self, paths: list[Path]):
+        """Remove the files and directories a test created."""
+
+        for path in paths:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+
     def test_generate_page_no_values(self):
         """Test get error from generate_page."""
 
@@ -88,3 +158,409 @@ class TestGeneratePage(unittest.TestCase):
         self.assertIn("Test Title", content)
         self.assertIn("Some content", content)
 
+    def test_generate_page_cached(self):
+        """Test a cached render writes the same page."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            from_path = Path(tmp_dir) / 'index.md'
+            to_path = Path(tmp_dir) / 'index.html'
+            template_path = Path(tmp_dir) / 'template.html'
+            from_path.write_text("# Test Title\nSome **content**")
+            template_path.write_text("<title>{{ Title }}</title>{{ Content }}")
+
+            generate_page(from_path, template_path, to_path)
+            expected = to_path.read_text()
+
+            cache = RenderCache(Path(tmp_dir) / 'cache')
+            for _ in range(2):
+                generate_page(from_path, template_path, to_path, cache=cache)
+                self.assertEqual(to_path.read_text(), expected)
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_generate_page_streamed(self):
+        """Test a page streamed block by block matches one read whole."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            from_path = Path(tmp_dir) / 'index.md'
+            template_path = Path(tmp_dir) / 'template.html'
+            to_path = Path(tmp_dir) / 'index.html'
+            from_path.write_text("# Title\n\nSome **content**\n\n- a\n- b\n\n```\ncode\n\nmore\n```\n")
+            template_path.write_text("<title>{{ Title }}</title>{{ Content }}")
+
+            generate_page(from_path, template_path, to_path)
+            expected = to_path.read_text()
+
+            generate_page(from_path, template_path, to_path, stream_threshold=0)
+            self.assertEqual(to_path.read_text(), expected)
+        self.assertIn("<pre><code>code\n\nmore\n</code></pre>", expected)
+
+    def test_streamed_matches_in_memory(self):
+        """Test streamed, mapped and in memory renders give the same html or the same error."""
+
+        template = CompiledTemplate.compile("<title>{{ Title }}</title>{{ Content }}")
+        documents = [
+            "# Title\n\nSome **content**\n\n1. one\n2. two\n",
+            "#\nTitle\n\n# Real\n",
+            "#   \n\n# Real\n\ntext",
+            "",
+            "\n\n  \n",
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            from_path = Path(tmp_dir) / 'index.md'
+            for markdown in documents:
+                from_path.write_text(markdown)
+                for title in (None, 'Known'):
+                    with self.subTest(markdown=markdown, title=title):
+                        outcomes = []
+                        for thresholds in ({}, {'stream_threshold': 0}, {'mmap_threshold': 0}):
+                            try:
+                                outcomes.append(render_page(from_path, template, title=title, **thresholds))
+                            except ValueError as e:
+                                outcomes.append(str(e))
+                        self.assertEqual(outcomes[1:], outcomes[:1] * 2)
+
+    def test_generate_page_mapped(self):
+        """Test a page read through mmap matches one read whole."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            from_path = Path(tmp_dir) / 'index.md'
+            template_path = Path(tmp_dir) / 'template.html'
+            to_path = Path(tmp_dir) / 'index.html'
+            from_path.write_text("Intro\n\n# Title\n\n> a _quote_\n\n1. one\n2. two\n")
+            template_path.write_text("<title>{{ Title }}</title>{{ Content }}")
+
+            generate_page(from_path, template_path, to_path)
+            expected = to_path.read_text()
+
+            generate_page(from_path, template_path, to_path, mmap_threshold=0)
+            self.assertEqual(to_path.read_text(), expected)
+
+    def test_extract_title_bytes(self):
+        """Test the title is found in bytes as in text."""
+
+        md = "Intro\n## Not a title\n#  Tïtle \r\nText\n"
+        self.assertEqual(extract_title_markdown(md.encode()), "Tïtle")
+        with self.assertRaises(ValueError):
+            extract_title_markdown(b"## Not a title\n")
+
+
+
+class TestRenderSite(unittest.TestCase):
+    """Suite of tests for render_site."""
+
+    def setUp(self):
+        """SetUp test class."""
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+        self.content_dir = root / 'content'
+        self.template_path = root / 'template.html'
+        self.public_dir = root / 'public'
+
+        for rel_path, text in {
+            'index.md': '# Home\n\nWelcome',
+            'blog/a.md': '# A\n\n- **one**',
+            'blog/b.md': '# B\n\n> quote',
+        }.items():
+            path = self.content_dir / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+        self.template_path.write_text('<title>{{ Title }}</title>{{ Content }}')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_matches_generate_page(self):
+        """Test every page is written as generate_page writes it."""
+
+        sources = sorted(self.content_dir.rglob('*.md'))
+        results = render_site(sources, self.template_path, self.public_dir)
+
+        self.assertEqual([result.source for result in results], [str(source) for source in sources])
+        self.assertEqual([result.title for result in results], ['A', 'B', 'Home'])
+        self.assertTrue(all(result.ok for result in results))
+
+        expected_dir = Path(self.tmp_dir.name) / 'expected'
+        for source, result in zip(sources, results):
+            dest = expected_dir / source.relative_to(self.content_dir).with_suffix('.html')
+            generate_page(source, self.template_path, dest)
+            self.assertEqual(Path(result.dest).read_text(), dest.read_text())
+
+    def test_failures_are_returned(self):
+        """Test a failing page is reported without stopping the others."""
+
+        broken = self.content_dir / 'broken.md'
+        broken.write_text('no title')
+        index = self.content_dir / 'index.md'
+
+        results = render_site([broken, index], self.template_path, self.public_dir, self.content_dir)
+
+        self.assertEqual(results[0].error, 'ValueError: Missing or incorrect title')
+        self.assertFalse((self.public_dir / 'broken.html').exists())
+        self.assertEqual(results[1][:3], (str(index), str((self.public_dir / 'index.html').resolve()), 'Home'))
+        self.assertIsInstance(results[1], PageResult)
+
+    def test_source_outside_content_dir_is_returned(self):
+        """Test a source outside content_dir fails alone, relative sources still resolve."""
+
+        outside = Path(self.tmp_dir.name) / 'outside.md'
+        outside.write_text('# Outside')
+        index = self.content_dir / 'index.md'
+
+        results = render_site([outside, Path(os.path.relpath(index))], self.template_path, self.public_dir, self.content_dir)
+
+        self.assertEqual(results[0].dest, '')
+        self.assertTrue(results[0].error.startswith('ValueError: '))
+        self.assertEqual(results[1].title, 'Home')
+        self.assertTrue((self.public_dir / 'index.html').exists())
+
+    def test_empty(self):
+        """Test no pages render nothing."""
+        self.assertEqual(render_site([], self.template_path, self.public_dir), [])
+
+
+class TestGeneratePagesIncremental(unittest.TestCase):
+    """Suite of tests for generate_pages_incremental."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+
+        self.content_dir = root / 'content'
+        self.public_dir = root / 'public'
+        self.template_path = root / 'template.html'
+
+        (self.content_dir / 'blog').mkdir(parents=True)
+        (self.content_dir / 'index.md').write_text('# Home\n\nWelcome')
+        (self.content_dir / 'blog' / 'post.md').write_text('# Post\n\nA post')
+        self.template_path.write_text('<title>{{ Title }}</title>{{ Content }}')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def build(self, manifest):
+        """Run an incremental build."""
+        return generate_pages_incremental(self.content_dir, self.template_path, self.public_dir, manifest)
+
+    def test_first_build_renders_everything(self):
+        """Test an empty manifest renders every page."""
+
+        summary = self.build(BuildManifest())
+
+        self.assertEqual(sorted(summary.rendered), ['blog/post.md', 'index.md'])
+        self.assertEqual(
+            (self.public_dir / 'blog' / 'post.html').read_text(),
+            '<title>Post</title><div><h1>Post</h1><p>A post</p></div>'
+        )
+
+    def test_only_changed_pages_render(self):
+        """Test unchanged pages are skipped."""
+
+        manifest = BuildManifest()
+        self.build(manifest)
+
+        (self.content_dir / 'index.md').write_text('# Home\n\nWelcome back')
+        summary = self.build(manifest)
+
+        self.assertEqual(summary.rendered, ['index.md'])
+        self.assertEqual(summary.unchanged, ['blog/post.md'])
+        self.assertIn('Welcome back', (self.public_dir / 'index.html').read_text())
+
+    def test_template_change_renders_everything(self):
+        """Test a template change invalidates every page."""
+
+        manifest = BuildManifest()
+        self.build(manifest)
+
+        self.template_path.write_text('<h1>{{ Title }}</h1>{{ Content }}')
+        summary = self.build(manifest)
+
+        self.assertEqual(len(summary.rendered), 2)
+
+    def test_base_path_change_renders_everything(self):
+        """Test pages rendered for another base path are rendered again."""
+
+        self.template_path.write_text('<a href="/">{{ Title }}</a>{{ Content }}')
+        manifest = BuildManifest()
+        self.build(manifest)
+
+        summary = generate_pages_incremental(
+            self.content_dir, self.template_path, self.public_dir, manifest, base_path='/docs/'
+        )
+        self.assertEqual(len(summary.rendered), 2)
+        self.assertIn('<a href="/docs/">', (self.public_dir / 'index.html').read_text())
+        summary = generate_pages_incremental(
+            self.content_dir, self.template_path, self.public_dir, manifest, base_path='/docs/'
+        )
+        self.assertEqual(summary.rendered, [])
+
+    def test_removed_source_removes_output(self):
+        """Test outputs of deleted sources are removed."""
+
+        manifest = BuildManifest()
+        self.build(manifest)
+
+        (self.content_dir / 'blog' / 'post.md').unlink()
+        summary = self.build(manifest)
+
+        self.assertEqual(summary.removed, ['blog/post.md'])
+        self.assertFalse((self.public_dir / 'blog').exists())
+        self.assertTrue((self.public_dir / 'index.html').exists())
+
+    def test_missing_output_is_rendered(self):
+        """Test an output deleted by hand is rendered again."""
+
+        manifest = BuildManifest()
+        self.build(manifest)
+
+        (self.public_dir / 'index.html').unlink()
+        summary = self.build(manifest)
+
+        self.assertEqual(summary.rendered, ['index.md'])
+
+    def test_references_collected_while_rendering(self):
+        """Test the references of the rendered pages come from the blocks the render split."""
+
+        (self.content_dir / 'index.md').write_text('# Home\n\n![me](/me.png) and [a post](blog/post.html)')
+        expected = {'index.html': (['me.png'], ['blog/post.html']), 'blog/post.html': ([], [])}
+
+        with mock.patch('utilities.page_utilities.markdown_to_blocks', side_effect=AssertionError('split twice')):
+            summary = self.build(BuildManifest())
+        self.assertEqual(summary.references, expected)
+
+        summary = generate_pages_incremental(
+            self.content_dir, self.template_path, self.public_dir, BuildManifest(), workers=2
+        )
+        self.assertEqual(summary.references, expected)
+
+        (self.content_dir / 'blog' / 'post.md').write_text('# Post\n\n[home](/)')
+        manifest = BuildManifest()
+        self.build(manifest)
+        (self.content_dir / 'blog' / 'post.md').write_text('# Post\n\n[home](/) again')
+        self.assertEqual(self.build(manifest).references, {'blog/post.html': ([], ['index.html'])})
+
+
+class TestGeneratePagesParallel(unittest.TestCase):
+    """Suite of tests for parallel generate_pages_recursive."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+        self.content_dir = self.root / 'content'
+        self.template_path = self.root / 'template.html'
+
+        for i in range(12):
+            page = self.content_dir / f'section{i % 3}' / f'page{i}.md'
+            page.parent.mkdir(parents=True, exist_ok=True)
+            page.write_text(f'# Page {i}\n\nSome **bold** text\n\n- item {i}')
+        self.template_path.write_text('<title>{{ Title }}</title>{{ Content }}')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def read_tree(self, root):
+        """Read every file under root."""
+        return {p.relative_to(root): p.read_bytes() for p in root.rglob('*') if p.is_file()}
+
+    def test_parallel_output_matches_sequential(self):
+        """Test a parallel build writes the same bytes as a sequential one."""
+
+        generate_pages_recursive(self.content_dir, self.template_path, self.root / 'serial')
+        generate_pages_recursive(self.content_dir, self.template_path, self.root / 'parallel', workers=3)
+
+        self.assertEqual(len(self.read_tree(self.root / 'serial')), 12)
+        self.assertEqual(self.read_tree(self.root / 'serial'), self.read_tree(self.root / 'parallel'))
+
+    def test_parallel_failures_are_collected(self):
+        """Test every failing page is reported and the others are still written."""
+
+        (self.content_dir / 'section0' / 'page0.md').write_text('No title here')
+        (self.content_dir / 'section1' / 'page1.md').write_text('## Not a title either')
+
+        with self.assertRaises(PageGenerationError) as context:
+            generate_pages_recursive(self.content_dir, self.template_path, self.root / 'public', workers=3)
+
+        failed = [Path(from_path).name for from_path, _ in context.exception.failures]
+        self.assertEqual(sorted(failed), ['page0.md', 'page1.md'])
+        self.assertIn('ValueError: Missing or incorrect title', str(context.exception))
+        self.assertEqual(len(self.read_tree(self.root / 'public')), 10)
+
+    def test_staged_output_matches_direct(self):
+        """Test pages staged through an OutputWriter match pages written directly."""
+
+        generate_pages_recursive(self.content_dir, self.template_path, self.root / 'direct')
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                staged_dir = self.root / f'staged{workers}'
+                with OutputWriter(staged_dir) as writer:
+                    stage_pages(self.content_dir, self.template_path, writer, workers)
+                self.assertEqual(self.read_tree(self.root / 'direct'), self.read_tree(staged_dir))
+
+    def test_streamed_pages_are_staged(self):
+        """Test pages streamed into an OutputWriter match pages rendered whole."""
+
+        generate_pages_recursive(self.content_dir, self.template_path, self.root / 'direct')
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                staged_dir = self.root / f'streamed{workers}'
+                with OutputWriter(staged_dir) as writer:
+                    stage_pages(self.content_dir, self.template_path, writer, workers, stream_threshold=0)
+                self.assertEqual(self.read_tree(self.root / 'direct'), self.read_tree(staged_dir))
+
+    def test_base_path_in_every_build(self):
+        """Test every way of building rebases the template links to the base path."""
+
+        self.template_path.write_text('<a href="/">{{ Title }}</a>{{ Content }}')
+        expected = {}
+        for from_path, key in list_pages(self.content_dir):
+            generate_page(from_path, self.template_path, self.root / 'expected' / key, '/docs/')
+            expected[Path(key)] = (self.root / 'expected' / key).read_bytes()
+        self.assertIn(b'<a href="/docs/">', expected[Path('section0/page0.html')])
+
+        for workers in (1, 3):
+            with self.subTest('recursive', workers=workers):
+                public_dir = self.root / f'recursive{workers}'
+                generate_pages_recursive(self.content_dir, self.template_path, public_dir, '/docs/', workers)
+                self.assertEqual(self.read_tree(public_dir), expected)
+
+            for stream_threshold in (None, 0):
+                with self.subTest('staged', workers=workers, stream_threshold=stream_threshold):
+                    public_dir = self.root / f'staged{workers}'
+                    with OutputWriter(public_dir) as writer:
+                        stage_pages(
+                            self.content_dir, self.template_path, writer, workers,
+                            stream_threshold=stream_threshold, base_path='/docs/'
+                        )
+                    self.assertEqual(self.read_tree(public_dir), expected)
+
+    def test_staged_titles_from_index(self):
+        """Test staged pages take their titles from the content index."""
+
+        index = ContentIndex(self.content_dir)
+        index.refresh()
+        index.pages['section0/page0.md']['title'] = 'Indexed'
+
+        with OutputWriter(self.root / 'public') as writer:
+            stage_pages(self.content_dir, self.template_path, writer, index=index)
+
+        self.assertIn('<title>Indexed</title>', (self.root / 'public' / 'section0' / 'page0.html').read_text())
+        self.assertEqual(len(self.read_tree(self.root / 'public')), 12)
+
+    def test_staged_failure_keeps_public_dir(self):
+        """Test a failing staged build reports every failure and writes nothing."""
+
+        (self.content_dir / 'section0' / 'page0.md').write_text('No title here')
+
+        with self.assertRaises(PageGenerationError) as context:
+            with OutputWriter(self.root / 'public') as writer:
+                stage_pages(self.content_dir, self.template_path, writer, workers=3)
+
+        self.assertEqual(len(context.exception.failures), 1)
+        self.assertFalse((self.root / 'public').exists())
@@ -0,0 +1,122 @@
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from utilities.output_utilities import OutputWriter
+from utilities.page_utilities import PageGenerationError, generate_pages_recursive, list_pages
+from utilities.pipeline_utilities import PIPELINE_STAGES, build_pages_pipelined
+from utilities.profile_utilities import BuildProfiler, profiling
+
+
+class TestBuildPagesPipelined(unittest.TestCase):
+    """Suite of tests for build_pages_pipelined."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+        self.content_dir = self.root / 'content'
+        self.template_path = self.root / 'template.html'
+
+        for i in range(12):
+            page = self.content_dir / f'section{i % 3}' / f'page{i}.md'
+            page.parent.mkdir(parents=True, exist_ok=True)
+            page.write_text(f'# Page {i}\n\nSome **bold** text\n\n- item {i}')
+        self.template_path.write_text('<title>{{ Title }}</title>{{ Content }}')
+        generate_pages_recursive(self.content_dir, self.template_path, self.root / 'expected')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def read_tree(self, root):
+        """Read every file under root."""
+        return {p.relative_to(root): p.read_bytes() for p in root.rglob('*') if p.is_file()}
+
+    def test_output_matches_sequential(self):
+        """Test the pipeline writes the same bytes as a sequential build."""
+
+        jobs = list_pages(self.content_dir)
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                public_dir = self.root / f'public{workers}'
+                report = build_pages_pipelined(
+                    jobs, self.template_path, public_dir=public_dir, workers=workers, queue_size=1
+                )
+
+                self.assertEqual(self.read_tree(public_dir), self.read_tree(self.root / 'expected'))
+                self.assertEqual(report.pages, 12)
+                self.assertEqual(tuple(report.stages), PIPELINE_STAGES)
+                self.assertTrue(all(stage.pages == 12 for stage in report.stages.values()))
+
+    def test_output_writer(self):
+        """Test the writer stage can hand pages to an OutputWriter."""
+
+        with OutputWriter(self.root / 'public') as writer:
+            build_pages_pipelined(list_pages(self.content_dir), self.template_path, writer=writer)
+        self.assertEqual(self.read_tree(self.root / 'public'), self.read_tree(self.root / 'expected'))
+
+    def test_streamed_pages_are_written_in_blocks(self):
+        """Test sources over a threshold are streamed into the destination, never written whole."""
+
+        jobs = list_pages(self.content_dir)
+        thresholds = {'stream_threshold': 0}, {'mmap_threshold': 0}
+        for workers in (1, 3):
+            for options in thresholds:
+                with self.subTest(workers=workers, **options):
+                    references = {}
+                    public_dir = self.root / 'public'
+                    with mock.patch.object(OutputWriter, 'write', side_effect=AssertionError('written whole')):
+                        with OutputWriter(public_dir) as writer:
+                            report = build_pages_pipelined(
+                                jobs, self.template_path, writer=writer, workers=workers,
+                                references=references, **options
+                            )
+                    self.assertEqual(self.read_tree(public_dir), self.read_tree(self.root / 'expected'))
+                    self.assertEqual(report.pages, 12)
+                    self.assertEqual(sorted(references), sorted(key for _, key in jobs))
+
+                    build_pages_pipelined(
+                        jobs, self.template_path, public_dir=self.root / 'direct', workers=workers, **options
+                    )
+                    self.assertEqual(self.read_tree(self.root / 'direct'), self.read_tree(self.root / 'expected'))
+
+    def test_profiled_renders_are_merged(self):
+        """Test every page is profiled, in a render thread or in worker processes."""
+
+        jobs = list_pages(self.content_dir)
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                profiler = BuildProfiler()
+                with profiling(profiler):
+                    build_pages_pipelined(jobs, self.template_path, public_dir=self.root / 'public', workers=workers)
+
+                self.assertEqual(set(profiler.records), {from_path for from_path, _ in jobs})
+                for stages in profiler.records.values():
+                    self.assertLessEqual({'read', 'template', 'to_html', 'write', 'total'}, set(stages))
+                self.assertEqual(profiler.summary()['pages'], 12)
+
+    def test_failures_are_collected(self):
+        """Test every failing page is reported and the others are still written."""
+
+        (self.content_dir / 'section0' / 'page0.md').write_text('No title here')
+        jobs = list_pages(self.content_dir) + [(str(self.content_dir / 'missing.md'), 'missing.html')]
+
+        with self.assertRaises(PageGenerationError) as context:
+            build_pages_pipelined(jobs, self.template_path, public_dir=self.root / 'public')
+
+        failed = sorted(Path(from_path).name for from_path, _ in context.exception.failures)
+        self.assertEqual(failed, ['missing.md', 'page0.md'])
+        self.assertEqual(len(self.read_tree(self.root / 'public')), 11)
+
+    def test_needs_a_destination(self):
+        """Test a pipeline without public dir or writer is refused."""
+
+        with self.assertRaises(ValueError):
+            build_pages_pipelined([], self.template_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
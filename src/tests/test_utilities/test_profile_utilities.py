@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from utilities.page_utilities import generate_page, generate_pages_recursive
+from utilities.profile_utilities import BuildProfiler, get_profiler, percentile, profiling, stage
+
+
+class TestBuildProfiler(unittest.TestCase):
+    """Suite of tests for BuildProfiler."""
+
+    def test_percentile(self):
+        """Test nearest rank percentiles."""
+
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_stages_accumulate_per_page(self):
+        """Test stages are attributed to the current page."""
+
+        profiler = BuildProfiler()
+        with profiling(profiler):
+            with stage('static_copy'):
+                pass
+            with profiler.page('a.md'):
+                with stage('read'):
+                    pass
+                with stage('read'):
+                    pass
+
+        self.assertEqual(set(profiler.records), {'<build>', 'a.md'})
+        self.assertEqual(set(profiler.records['a.md']), {'read', 'total'})
+        self.assertEqual(set(profiler.records['<build>']), {'static_copy'})
+
+    def test_inactive_profiler(self):
+        """Test stage does nothing outside profiling."""
+
+        self.assertIsNone(get_profiler())
+        with stage('read'):
+            pass
+        self.assertIsNone(get_profiler())
+
+    def test_summary(self):
+        """Test the summary orders stages and pages."""
+
+        profiler = BuildProfiler()
+        profiler.merge({
+            'slow.md': {'read': 0.2, 'inline': 0.5, 'total': 0.8},
+            'fast.md': {'read': 0.1, 'total': 0.1},
+        })
+        summary = profiler.summary(slowest=1)
+
+        self.assertEqual(list(summary['stages']), ['read', 'inline', 'total'])
+        self.assertEqual(summary['stages']['read']['count'], 2)
+        self.assertEqual(summary['slowest_pages'][0]['page'], 'slow.md')
+        self.assertEqual(len(summary['slowest_pages']), 1)
+        self.assertEqual(json.loads(profiler.to_json()), json.loads(json.dumps(profiler.summary())))
+        self.assertIn('slow.md', profiler.format_table())
+
+
+class TestProfiledBuild(unittest.TestCase):
+    """Suite of tests for profiled page generation."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+        self.content_dir = self.root / 'content'
+        self.template_path = self.root / 'template.html'
+        self.content_dir.mkdir()
+        for i in range(4):
+            (self.content_dir / f'page{i}.md').write_text(f'# Page {i}\n\nSome **bold** text\n\n- item')
+        self.template_path.write_text('<title>{{ Title }}</title>{{ Content }}')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_generate_page_stages(self):
+        """Test a profiled page records every stage and writes the same html."""
+
+        from_path = self.content_dir / 'page0.md'
+        generate_page(from_path, self.template_path, self.root / 'plain.html')
+
+        profiler = BuildProfiler()
+        with profiling(profiler):
+            generate_page(from_path, self.template_path, self.root / 'profiled.html')
+
+        self.assertEqual(
+            set(profiler.records[str(from_path)]),
+            {'read', 'template', 'extract_title', 'markdown_to_blocks', 'classify', 'inline', 'to_html', 'write', 'total'}
+        )
+        self.assertEqual((self.root / 'plain.html').read_text(), (self.root / 'profiled.html').read_text())
+
+    def test_parallel_records_are_merged(self):
+        """Test worker processes hand their timings back."""
+
+        profiler = BuildProfiler()
+        with profiling(profiler):
+            generate_pages_recursive(self.content_dir, self.template_path, self.root / 'public', workers=2)
+
+        self.assertEqual(profiler.summary()['pages'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from utilities.reader_utilities import iter_mapped_lines, open_mapped
+
+
+class TestMappedReading(unittest.TestCase):
+    """Suite of tests for open_mapped and iter_mapped_lines."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'page.md'
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_lines_match_text_mode(self):
+        """Test mapped lines decode like a file opened in text mode."""
+
+        self.path.write_bytes('# Tïtle\r\n\r\nbody\nlast'.encode())
+        with open_mapped(self.path) as mapped:
+            lines = list(iter_mapped_lines(mapped))
+        with self.path.open('r', encoding='utf-8') as f:
+            self.assertEqual(lines, list(f))
+
+    def test_empty_file(self):
+        """Test an empty file maps to no lines."""
+
+        self.path.write_bytes(b'')
+        with open_mapped(self.path) as mapped:
+            self.assertEqual(list(iter_mapped_lines(mapped)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
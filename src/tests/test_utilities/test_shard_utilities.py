@@ -0,0 +1,212 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from utilities.graph_utilities import DependencyGraph
+from utilities.output_utilities import OUTPUT_MANIFEST, OutputWriter
+from utilities.page_utilities import generate_pages_recursive, list_pages, stage_pages
+from utilities.shard_utilities import (
+    Shard,
+    ShardMergeError,
+    content_digest,
+    merge_shards,
+    parse_shard,
+    partition,
+    shard_jobs,
+    shard_manifest_fields
+)
+from utilities.static_utilities import list_files
+
+
+def build_shard(content_dir, template_path, shard_dir, shard):
+    """Build one shard the way a separate machine would."""
+
+    references = {}
+    fields = shard_manifest_fields(shard, content_digest(list_pages(content_dir), template_path), references)
+    with OutputWriter(shard_dir, digests=True, manifest_fields=fields) as writer:
+        stage_pages(content_dir, template_path, writer, shard=shard, references=references)
+
+
+class TestPartition(unittest.TestCase):
+    """Suite of tests for shard partitioning."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.sizes = {f'section{i % 7}/page{i}.html': (i * 37) % 500 for i in range(200)}
+
+    def test_parse_shard(self):
+        """Test i/N specs are parsed and invalid ones rejected."""
+
+        self.assertEqual(parse_shard('2/4'), Shard(2, 4))
+        self.assertEqual(str(Shard(2, 4)), '2/4')
+        for text in ('0/4', '5/4', '1/0', '1', 'a/b', '1/2/3'):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_partition_covers_every_key_once(self):
+        """Test the shards are disjoint and together hold every key."""
+
+        shards = partition(self.sizes, 4)
+        keys = [key for shard in shards for key in shard]
+        self.assertEqual(sorted(keys), sorted(self.sizes))
+
+    def test_partition_is_deterministic(self):
+        """Test the partition does not depend on the order keys are listed in."""
+
+        reordered = dict(reversed(list(self.sizes.items())))
+        self.assertEqual(partition(reordered, 4), partition(self.sizes, 4))
+
+    def test_partition_is_balanced(self):
+        """Test shard sizes differ by no more than the largest key."""
+
+        loads = [sum(self.sizes[key] for key in shard) for shard in partition(self.sizes, 4)]
+        self.assertLessEqual(max(loads) - min(loads), max(self.sizes.values()))
+
+    def test_more_shards_than_keys(self):
+        """Test surplus shards are empty."""
+        self.assertEqual(partition({'a.html': 10, 'b.html': 0}, 3), [['a.html'], ['b.html'], []])
+
+
+class TestShardedBuild(unittest.TestCase):
+    """Suite of tests for sharded builds and their merge."""
+
+    def setUp(self):
+        """SetUp test class."""
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.content_dir = self.root / 'content'
+        self.template_path = self.root / 'template.html'
+        self.template_path.write_text('<title>{{ Title }}</title><main>{{ Content }}</main>')
+
+        for i in range(3):
+            section = self.content_dir / f'section{i}'
+            section.mkdir(parents=True)
+            for j in range(4):
+                (section / f'page{j}.md').write_text(f'# Page {i}.{j}\n\n' + 'Some **text**.\n\n' * (i * 4 + j))
+
+        generate_pages_recursive(self.content_dir, self.template_path, self.root / 'expected')
+        self.shard_dirs = [self.root / 'shards' / f'{i}-of-3' for i in range(1, 4)]
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def read_tree(self, root: Path) -> dict[str, str]:
+        """Return every file under root except the manifest."""
+        return {key: (root / key).read_text() for key in list_files(root) if key != OUTPUT_MANIFEST}
+
+    def build_shards(self):
+        """Build the three shards in separate processes."""
+
+        with ProcessPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(build_shard, self.content_dir, self.template_path, shard_dir, Shard(i, 3))
+                for i, shard_dir in enumerate(self.shard_dirs, 1)
+            ]
+            for future in futures:
+                future.result()
+
+    def test_shard_jobs(self):
+        """Test the shard jobs split the pages without overlap."""
+
+        jobs = list_pages(self.content_dir)
+        shards = [shard_jobs(jobs, Shard(i, 3)) for i in range(1, 4)]
+        self.assertEqual(sorted(job for shard in shards for job in shard), sorted(jobs))
+        self.assertTrue(all(shards))
+        self.assertEqual(shard_jobs(jobs, None), jobs)
+
+    def test_generate_pages_recursive_shards(self):
+        """Test the recursive shards together write the pages of a full build."""
+
+        merged = {}
+        for i, shard_dir in enumerate(self.shard_dirs, 1):
+            generate_pages_recursive(self.content_dir, self.template_path, shard_dir, shard=Shard(i, 3))
+            merged.update(self.read_tree(shard_dir))
+        self.assertEqual(merged, self.read_tree(self.root / 'expected'))
+
+    def test_merge(self):
+        """Test merged shard outputs equal a full build, with a manifest of every file."""
+
+        self.build_shards()
+        manifest = json.loads((self.shard_dirs[1] / OUTPUT_MANIFEST).read_text())
+        self.assertEqual(manifest['shard'], [2, 3])
+
+        summary = merge_shards(self.shard_dirs, self.root / 'public')
+        self.assertEqual((summary.shards, summary.files), (3, 12))
+        self.assertEqual(self.read_tree(self.root / 'public'), self.read_tree(self.root / 'expected'))
+        merged = json.loads((self.root / 'public' / OUTPUT_MANIFEST).read_text())
+        self.assertEqual(len(merged['files']), 12)
+
+        summary = merge_shards(self.shard_dirs, self.root / 'public')
+        self.assertEqual(summary.written, [])
+
+    def test_merge_references(self):
+        """Test the references the shards collected merge into the graph a full scan records."""
+
+        (self.content_dir / 'section1' / 'page2.md').write_text('# Linked\n\n[Next](page3) ![logo](/logo.png)')
+        self.build_shards()
+        summary = merge_shards(self.shard_dirs, self.root / 'public')
+
+        graph = DependencyGraph()
+        graph.record(summary.references, self.template_path)
+        expected = DependencyGraph()
+        expected.scan(self.content_dir, self.template_path)
+        self.assertEqual(graph, expected)
+        self.assertEqual(graph.dependents('logo.png'), ['section1/page2.md'])
+
+    def test_merge_collision(self):
+        """Test a path written by two shards fails the merge and keeps the public dir."""
+
+        self.build_shards()
+        with OutputWriter(self.shard_dirs[2], digests=True, manifest_fields={'shard': [3, 3]}) as writer:
+            writer.write('section0/page0.html', 'other')
+
+        with self.assertRaises(ShardMergeError) as cm:
+            merge_shards(self.shard_dirs, self.root / 'public')
+        self.assertIn('section0/page0.html is written by both shard', str(cm.exception))
+        self.assertFalse((self.root / 'public').exists())
+
+    def test_merge_incomplete(self):
+        """Test missing shards and files missing from a shard fail the merge."""
+
+        self.build_shards()
+        removed = sorted(json.loads((self.shard_dirs[0] / OUTPUT_MANIFEST).read_text())['files'])[0]
+        (self.shard_dirs[0] / removed).unlink()
+
+        with self.assertRaises(ShardMergeError) as cm:
+            merge_shards(self.shard_dirs[:2], self.root / 'public')
+        self.assertEqual(
+            cm.exception.problems,
+            [f'{removed} of shard 1/3 is missing from {self.shard_dirs[0]}', 'missing shard(s) 3/3'],
+        )
+
+    def test_merge_needs_same_content_and_count(self):
+        """Test shards built from different content, or for another shard count, fail the merge."""
+
+        self.build_shards()
+        (self.content_dir / 'section0' / 'page0.md').write_text('# Edited\n\nBetween two shard builds.')
+        build_shard(self.content_dir, self.template_path, self.shard_dirs[2], Shard(3, 3))
+
+        with self.assertRaises(ShardMergeError) as cm:
+            merge_shards(self.shard_dirs, self.root / 'public')
+        self.assertEqual(cm.exception.problems, ['shards built from different content: 1/3, 2/3 / 3/3'])
+        self.assertFalse((self.root / 'public').exists())
+
+        other_dir = self.root / 'shards' / '2-of-2'
+        build_shard(self.content_dir, self.template_path, other_dir, Shard(2, 2))
+        with self.assertRaises(ShardMergeError) as cm:
+            merge_shards([self.shard_dirs[2], other_dir], self.root / 'public')
+        self.assertIn('shards of different shard counts: 2/2, 3/3', cm.exception.problems)
+
+    def test_merge_needs_shard_manifests(self):
+        """Test a plain output dir is not taken for a shard."""
+
+        with self.assertRaises(FileNotFoundError):
+            merge_shards([self.root / 'expected'], self.root / 'public')
+
+
+if __name__ == '__main__':
+    unittest.main()
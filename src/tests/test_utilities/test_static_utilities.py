@@ -0,0 +1,105 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from utilities.static_utilities import clone_file, is_current, list_files, sync_static_dir
+
+
+class TestSyncStaticDir(unittest.TestCase):
+    """Suite of tests for sync_static_dir."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+
+        self.static_dir = root / 'static'
+        self.public_dir = root / 'public'
+
+        (self.static_dir / 'images').mkdir(parents=True)
+        (self.static_dir / 'index.css').write_text('body {}')
+        (self.static_dir / 'images' / 'logo.png').write_bytes(b'png')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_list_files(self):
+        """Test files are listed relative to the root."""
+        self.assertEqual(sorted(list_files(self.static_dir)), ['images/logo.png', 'index.css'])
+
+    def test_first_sync_copies_everything(self):
+        """Test every static file lands in the public dir."""
+
+        for link in (True, False):
+            with self.subTest(link=link):
+                summary = sync_static_dir(self.static_dir, self.public_dir / str(link), link=link)
+
+                self.assertEqual(sorted(summary.copied), ['images/logo.png', 'index.css'])
+                self.assertEqual((self.public_dir / str(link) / 'images' / 'logo.png').read_bytes(), b'png')
+
+    def test_sync_does_not_link_by_default(self):
+        """Test the public files are not the static ones unless link is asked for."""
+
+        sync_static_dir(self.static_dir, self.public_dir)
+        (self.static_dir / 'index.css').write_text('body { color: red; }')
+
+        self.assertEqual((self.public_dir / 'index.css').read_text(), 'body {}')
+        self.assertFalse((self.public_dir / 'index.css').samefile(self.static_dir / 'index.css'))
+
+    def test_second_sync_skips_current_files(self):
+        """Test unchanged files are not copied again."""
+
+        for compare in ('mtime', 'hash'):
+            with self.subTest(compare=compare):
+                sync_static_dir(self.static_dir, self.public_dir, link=False, compare=compare)
+                summary = sync_static_dir(self.static_dir, self.public_dir, link=False, compare=compare)
+
+                self.assertEqual(summary.copied, [])
+                self.assertEqual(len(summary.unchanged), 2)
+
+    def test_changed_file_is_copied(self):
+        """Test a modified file is copied again."""
+
+        sync_static_dir(self.static_dir, self.public_dir, link=False)
+        (self.static_dir / 'index.css').write_text('body { color: red; }')
+        summary = sync_static_dir(self.static_dir, self.public_dir, link=False)
+
+        self.assertEqual(summary.copied, ['index.css'])
+        self.assertEqual((self.public_dir / 'index.css').read_text(), 'body { color: red; }')
+
+    def test_stale_files_are_removed(self):
+        """Test files deleted from static are removed, generated pages are kept."""
+
+        previous = sync_static_dir(self.static_dir, self.public_dir).copied
+        (self.public_dir / 'index.html').write_text('<html></html>')
+        (self.static_dir / 'images' / 'logo.png').unlink()
+
+        summary = sync_static_dir(self.static_dir, self.public_dir, previous=previous)
+
+        self.assertEqual(summary.removed, ['images/logo.png'])
+        self.assertFalse((self.public_dir / 'images').exists())
+        self.assertTrue((self.public_dir / 'index.html').exists())
+
+    def test_missing_source(self):
+        """Test a missing source dir raises."""
+
+        with self.assertRaises(FileNotFoundError):
+            sync_static_dir(self.static_dir / 'missing', self.public_dir)
+
+    def test_clone_file_keeps_mtime(self):
+        """Test a cloned file is recognised as current."""
+
+        from_path = self.static_dir / 'index.css'
+        to_path = self.public_dir / 'index.css'
+        clone_file(from_path, to_path)
+
+        self.assertTrue(is_current(from_path, to_path))
+        os.utime(from_path, ns=(0, 0))
+        if not os.path.samefile(from_path, to_path):
+            self.assertFalse(is_current(from_path, to_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+from pathlib import Path
+import tempfile
+import unittest
+
+from nodes import LeafNode, ParentNode
+from utilities.template_utilities import CompiledTemplate, load_template
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    """Suite of tests for CompiledTemplate."""
+
+    def setUp(self):
+        """Setup data for test."""
+        self.text = '<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>'
+
+    def test_compile(self):
+        """Test template is split into segments and slots."""
+
+        template = CompiledTemplate.compile(self.text)
+
+        self.assertEqual(template.slots, ['Title', 'Content'])
+        self.assertEqual(
+            template.segments,
+            ['<html><head><title>', '</title></head><body>', '</body></html>']
+        )
+
+    def test_render_matches_replace(self):
+        """Test render matches the chained str.replace output."""
+
+        template = CompiledTemplate.compile(self.text)
+
+        self.assertEqual(
+            template.render(Title='A title', Content='<p>Body</p>'),
+            self.text.replace('{{ Title }}', 'A title').replace('{{ Content }}', '<p>Body</p>')
+        )
+
+    def test_render_missing_value(self):
+        """Test placeholders without a value are left untouched."""
+
+        template = CompiledTemplate.compile(self.text)
+
+        self.assertEqual(
+            template.render(Title='A title'),
+            '<html><head><title>A title</title></head><body>{{ Content }}</body></html>'
+        )
+
+    def test_write_streams_nodes(self):
+        """Test write streams node values and matches render."""
+
+        template = CompiledTemplate.compile(self.text)
+        node = ParentNode('div', [LeafNode('b', 'Body')])
+        sink = io.StringIO()
+        template.write(sink, Title='A title', Content=node)
+
+        self.assertEqual(sink.getvalue(), template.render(Title='A title', Content=node.to_html()))
+
+    def test_base_path_only_rebases_template(self):
+        """Test base path rewriting applies to the template links, not the content."""
+
+        text = '<link href="/index.css"><img src="/logo.png">{{ Content }}'
+        template = CompiledTemplate.compile(text, base_path='/site/')
+
+        self.assertEqual(
+            template.render(Content='<a href="/blog">Blog</a>'),
+            '<link href="/site/index.css"><img src="/site/logo.png"><a href="/blog">Blog</a>'
+        )
+
+
+class TestLoadTemplate(unittest.TestCase):
+    """Suite of tests for load_template."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.template_path = Path(self.tmp_dir.name) / 'template.html'
+        self.template_path.write_text('<title>{{ Title }}</title>')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def test_cached_per_path(self):
+        """Test the same compiled template is returned while the file is unchanged."""
+        self.assertIs(load_template(self.template_path), load_template(self.template_path))
+
+    def test_recompiled_on_change(self):
+        """Test a modified template is compiled again."""
+
+        load_template(self.template_path)
+        self.template_path.write_text('<h1>{{ Title }}</h1><p>changed</p>')
+
+        self.assertEqual(load_template(self.template_path).segments, ['<h1>', '</h1><p>changed</p>'])
+
+
+if __name__ == '__main__':
+    unittest.main()
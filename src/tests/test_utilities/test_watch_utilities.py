@@ -0,0 +1,284 @@
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+import unittest
+from unittest import mock
+from urllib.request import urlopen
+
+from utilities.graph_utilities import DependencyGraph
+from utilities.manifest_utilities import (
+    OUTPUT_MANIFEST,
+    OUTPUT_MANIFEST_VERSION,
+    BuildManifest,
+    file_digest,
+    load_output_manifest,
+)
+from utilities.page_utilities import generate_pages_incremental, generate_pages_recursive
+from utilities.static_utilities import sync_static_dir, update_public_dir
+from utilities.watch_utilities import SiteWatcher, TreeSnapshot, diff_snapshots, start_server
+
+
+class TestDiffSnapshots(unittest.TestCase):
+    """Suite of tests for diff_snapshots."""
+
+    def test_diff_snapshots(self):
+        """Test changed, added and removed keys are reported."""
+
+        old = {'a.md': (1, 1), 'b.md': (1, 1), 'c.md': (1, 1)}
+        new = {'a.md': (1, 1), 'b.md': (2, 1), 'd.md': (1, 1)}
+
+        self.assertEqual(diff_snapshots(old, new), (['b.md', 'd.md'], ['c.md']))
+
+
+class TestTreeSnapshot(unittest.TestCase):
+    """Suite of tests for TreeSnapshot."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+        (self.root / 'blog' / 'old').mkdir(parents=True)
+        (self.root / 'index.md').write_text('# Home')
+        (self.root / 'blog' / 'post.md').write_text('# Post')
+        (self.root / 'blog' / 'notes.txt').write_text('notes')
+        self.age(self.root, self.root / 'blog', self.root / 'blog' / 'old')
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def age(self, *dir_paths: Path):
+        """Date directories well before the mtime granularity of the last listing."""
+        old_ns = time.time_ns() - 60 * 10 ** 9
+        for dir_path in dir_paths:
+            os.utime(dir_path, ns=(old_ns, old_ns))
+
+    def test_refresh(self):
+        """Test every file with the suffix is fingerprinted."""
+
+        snapshot = TreeSnapshot(self.root, '.md')
+        files = snapshot.refresh()
+
+        self.assertEqual(sorted(files), ['blog/post.md', 'index.md'])
+        self.assertEqual(files['index.md'][1], len('# Home'))
+        self.assertEqual(snapshot.scanned, ['', 'blog', 'blog/old'])
+        self.assertEqual(TreeSnapshot(self.root / 'missing').refresh(), {})
+
+    def test_only_changed_dirs_are_listed(self):
+        """Test a refresh lists only the directories whose mtime changed."""
+
+        snapshot = TreeSnapshot(self.root, '.md')
+        snapshot.refresh()
+        self.assertEqual(snapshot.refresh(), snapshot.refresh())
+        self.assertEqual(snapshot.scanned, [])
+
+        (self.root / 'blog' / 'new.md').write_text('# New')
+        self.assertIn('blog/new.md', snapshot.refresh())
+        self.assertEqual(snapshot.scanned, ['blog'])
+
+    def test_racy_listing_is_repeated(self):
+        """Test a directory listed within the mtime granularity of its mtime is listed again."""
+
+        snapshot = TreeSnapshot(self.root, '.md')
+        snapshot.refresh()
+        # As if the mtime had not moved on a filesystem with coarse timestamps.
+        (self.root / 'blog' / 'new.md').write_text('# New')
+        self.age(self.root / 'blog')
+        snapshot.dirs['blog']['mtime_ns'] = os.stat(self.root / 'blog').st_mtime_ns
+        snapshot.dirs['blog']['listed_ns'] = snapshot.dirs['blog']['mtime_ns']
+
+        self.assertIn('blog/new.md', snapshot.refresh())
+        self.assertEqual(snapshot.scanned, ['blog'])
+
+
+class TestSiteWatcher(unittest.TestCase):
+    """Suite of tests for SiteWatcher."""
+
+    def setUp(self):
+        """SetUp test class."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+
+        self.content_dir = root / 'content'
+        self.static_dir = root / 'static'
+        self.public_dir = root / 'public'
+        self.template_path = root / 'template.html'
+
+        (self.content_dir / 'blog').mkdir(parents=True)
+        self.static_dir.mkdir()
+        (self.content_dir / 'index.md').write_text('# Home\n\nWelcome')
+        (self.content_dir / 'blog' / 'post.md').write_text('# Post\n\nA post')
+        (self.static_dir / 'index.css').write_text('body {}')
+        self.template_path.write_text('<title>{{ Title }}</title>{{ Content }}')
+
+        sync_static_dir(self.static_dir, self.public_dir, link=False)
+        generate_pages_recursive(self.content_dir, self.template_path, self.public_dir)
+        self.watcher = SiteWatcher(
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            self.public_dir,
+            sync_options={'link': False},
+        )
+
+    def tearDown(self):
+        """TearDown test class."""
+        self.tmp_dir.cleanup()
+
+    def touch(self, path: Path, text: str):
+        """Write text with an mtime the watcher cannot mistake for the old one."""
+        path.write_text(text)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_nothing_changed(self):
+        """Test a poll without changes does nothing."""
+        self.assertIsNone(self.watcher.poll())
+
+    def test_changed_page_is_rendered(self):
+        """Test only the edited page is rendered again."""
+
+        self.touch(self.content_dir / 'index.md', '# Home\n\nWelcome back')
+        rebuild = self.watcher.poll()
+
+        self.assertEqual(rebuild.pages, ['index.md'])
+        self.assertIn('Welcome back', (self.public_dir / 'index.html').read_text())
+        self.assertEqual(self.watcher.latencies, [rebuild.latency])
+        self.assertIsNone(self.watcher.poll())
+
+    def test_render_options(self):
+        """Test pages are rebuilt with the thresholds of the build, streamed ones never rendered whole."""
+
+        expected = (self.public_dir / 'index.html').read_text()
+        for options in ({'stream_threshold': 0}, {'mmap_threshold': 0}):
+            with self.subTest(**options):
+                self.watcher.render_options = options
+                self.touch(self.content_dir / 'index.md', '# Home\n\nWelcome')
+                with mock.patch('utilities.page_utilities.render_markdown', side_effect=AssertionError('in memory')):
+                    rebuild = self.watcher.poll()
+
+                self.assertEqual(rebuild.pages, ['index.md'])
+                self.assertEqual((self.public_dir / 'index.html').read_text(), expected)
+
+    def test_removed_static_reports_dependents(self):
+        """Test removing an image reports the pages still pointing at it."""
+
+        (self.static_dir / 'me.png').write_bytes(b'png')
+        self.touch(self.content_dir / 'index.md', '# Home\n\n![me](/me.png)')
+        self.watcher.graph = DependencyGraph()
+        self.watcher.graph.scan(self.content_dir, self.template_path)
+        self.watcher.poll()
+
+        (self.static_dir / 'me.png').unlink()
+        with self.assertLogs('utilities.graph_utilities', 'WARNING') as logs:
+            self.watcher.poll()
+        self.assertEqual(logs.output, ['WARNING:utilities.graph_utilities:Broken reference in index.md: me.png'])
+
+    def test_references_recorded_from_rebuilds(self):
+        """Test the graph records what the rebuilt pages point to without reading them again."""
+
+        self.watcher.graph = DependencyGraph()
+        self.watcher.graph.scan(self.content_dir, self.template_path)
+
+        self.touch(self.content_dir / 'index.md', '# Home\n\n![me](/me.png)')
+        (self.content_dir / 'blog' / 'post.md').unlink()
+        with mock.patch.object(DependencyGraph, 'scan', side_effect=AssertionError('scanned')):
+            with self.assertLogs('utilities.graph_utilities', 'WARNING'):
+                self.watcher.poll()
+
+        self.assertEqual(list(self.watcher.graph.pages), ['index.md'])
+        self.assertEqual(self.watcher.graph.pages['index.md']['assets'], ['me.png'])
+
+    def test_template_change_renders_every_page(self):
+        """Test a template edit renders every page."""
+
+        self.touch(self.template_path, '<h1>{{ Title }}</h1>{{ Content }}')
+        rebuild = self.watcher.poll()
+
+        self.assertEqual(sorted(rebuild.pages), ['blog/post.md', 'index.md'])
+        self.assertTrue((self.public_dir / 'blog' / 'post.html').read_text().startswith('<h1>Post</h1>'))
+
+    def test_removed_page_and_static(self):
+        """Test deleted sources remove their outputs and new static files are synced."""
+
+        (self.content_dir / 'blog' / 'post.md').unlink()
+        (self.static_dir / 'index.css').unlink()
+        self.touch(self.static_dir / 'site.js', 'let a = 1;')
+        rebuild = self.watcher.poll()
+
+        self.assertEqual(rebuild.removed, ['blog/post.md'])
+        self.assertFalse((self.public_dir / 'blog').exists())
+        self.assertFalse((self.public_dir / 'index.css').exists())
+        self.assertTrue((self.public_dir / 'site.js').exists())
+
+    def test_manifests_are_updated(self):
+        """Test a rebuild is recorded in the build manifest and in the deploy manifest of the public dir."""
+
+        manifest_path = self.public_dir.parent / 'manifest.json'
+        manifest = BuildManifest()
+        update_public_dir(self.static_dir, self.public_dir, manifest, link=False)
+        generate_pages_incremental(self.content_dir, self.template_path, self.public_dir, manifest)
+        (self.public_dir / OUTPUT_MANIFEST).write_text(json.dumps({'version': OUTPUT_MANIFEST_VERSION, 'files': {}}))
+        watcher = SiteWatcher(
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            self.public_dir,
+            sync_options={'link': False},
+            manifest=manifest,
+            manifest_path=manifest_path,
+        )
+
+        self.touch(self.content_dir / 'index.md', '# Home\n\nWelcome back')
+        (self.content_dir / 'blog' / 'post.md').unlink()
+        self.touch(self.static_dir / 'site.js', 'let a = 1;')
+        self.touch(self.template_path, '<h1>{{ Title }}</h1>{{ Content }}')
+        watcher.poll()
+
+        saved = BuildManifest.load(manifest_path)
+        self.assertEqual(saved, manifest)
+        self.assertEqual(list(saved.pages), ['index.md'])
+        self.assertEqual(saved.template_digest, file_digest(self.template_path))
+        self.assertEqual(sorted(saved.static), ['index.css', 'site.js'])
+        self.assertEqual(generate_pages_incremental(
+            self.content_dir, self.template_path, self.public_dir, saved
+        ).unchanged, ['index.md'])
+        self.assertEqual(update_public_dir(self.static_dir, self.public_dir, saved, link=False).copied, [])
+
+        files = load_output_manifest(self.public_dir)
+        self.assertEqual(sorted(files), ['index.html', 'site.js'])
+        self.assertEqual(files['index.html']['sha256'], file_digest(self.public_dir / 'index.html'))
+
+    def test_failing_page_keeps_watching(self):
+        """Test a page that fails to render does not stop the watcher."""
+
+        self.touch(self.content_dir / 'index.md', 'No title any more')
+
+        with self.assertLogs('utilities.watch_utilities', level='ERROR'):
+            rebuild = self.watcher.poll()
+        self.assertEqual(rebuild.pages, [])
+
+
+class TestStartServer(unittest.TestCase):
+    """Suite of tests for start_server."""
+
+    def test_serves_public_dir(self):
+        """Test the server returns files from the public dir."""
+
+        with tempfile.TemporaryDirectory() as public_dir:
+            (Path(public_dir) / 'index.html').write_text('<p>served</p>')
+            server = start_server(public_dir, port=0)
+            try:
+                port = server.server_address[1]
+                with urlopen(f'http://localhost:{port}/index.html') as response:
+                    self.assertEqual(response.read(), b'<p>served</p>')
+            finally:
+                server.shutdown()
+                server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
 from .inline_utilities import (
     split_nodes_delimiter,
+    split_nodes_delimiters,
+    register_delimiter,
+    DelimiterTable,
     extract_markdown_images,
     extract_markdown_links,
     split_nodes_image,
@@ -10,6 +13,7 @@ from .block_utilities import (
     markdown_to_blocks,
     block_to_block_type,
     markdown_to_html_node,
+    markdown_to_html,
     BlockType
 )
-from .page_utilities import extract_title_markdown
\ No newline at end of file
+from .page_utilities import extract_title_markdown, render_site
\ No newline at end of file
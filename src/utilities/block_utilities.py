@@ -1,9 +1,21 @@
+import io
+from pathlib import Path
 import re
 from enum import Enum, auto
+from typing import Iterable, Iterator, NamedTuple
 from nodes import ParentNode
-from nodes.textnode import TextNode, TextType, text_node_to_html_node
+from nodes.textnode import (
+    LeafPool,
+    TextNode,
+    TextType,
+    text_node_to_html_node,
+    text_nodes_to_html,
+    text_nodes_to_html_nodes
+)
 
 from utilities.inline_utilities import text_to_textnodes
+from utilities.profile_utilities import stage
+from utilities.reader_utilities import iter_mapped_lines, open_mapped
 
 
 class BlockType(Enum):
@@ -18,144 +30,419 @@ class BlockType(Enum):
 
 def markdown_to_blocks(markdown) -> list[str]:
     """Transform markdown to blocks."""
+
+    # Fences may hold blank lines, only then is the line by line split needed.
+    if FENCE in markdown:
+        return list(iter_markdown_blocks(markdown.split('\n')))
     return list(filter(str.strip, map(str.strip, markdown.strip().split('\n\n'))))
 
 
+FENCE = '```'
+# A fence opens on a line holding only the backticks and an optional info string.
+FENCE_OPEN_PATTERN = re.compile(r'```[^`]*')
+
+
+def iter_markdown_blocks(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the blocks of markdown lines, e.g. an open file, one at a time.
+
+    Blank lines inside a code fence opening a block do not end the block.
+    A fence never closed is split on its blank lines like any other text.
+    """
+
+    block: list[str] = []
+    in_fence = False
+
+    for line in lines:
+        line = line.rstrip('\n')
+        if in_fence:
+            block.append(line)
+            in_fence = not line.rstrip().endswith(FENCE)
+            continue
+
+        if not line:
+            text = '\n'.join(block).strip()
+            if text:
+                yield text
+            block = []
+            continue
+
+        if not block and FENCE_OPEN_PATTERN.fullmatch(line.strip()):
+            in_fence = True
+        block.append(line)
+
+    if in_fence:
+        yield from filter(str.strip, map(str.strip, '\n'.join(block).strip().split('\n\n')))
+        return
+    text = '\n'.join(block).strip()
+    if text:
+        yield text
+
+
+HEADING_PATTERN = re.compile(r'#{1,6} ')
+CODE_PATTERN = re.compile(r'```[\s\S]*```$', re.DOTALL)
+ORDERED_ITEM_PATTERN = re.compile(r'(\d+)\. ')
+
+
+class ClassifiedBlock(NamedTuple):
+    """A block type with the data parsed while classifying it."""
+    block_type: BlockType
+    level: int = 0
+    lines: list[str] | None = None
+
+
+def classify_block(markdown_block) -> ClassifiedBlock:
+    """Classify markdown_block, looking at each of its lines once.
+
+    Headings carry their level, lists their item bodies and quotes their
+    lines with the '>' markers stripped.
+    """
+
+    heading = HEADING_PATTERN.match(markdown_block)
+    if heading:
+        return ClassifiedBlock(BlockType.HEADING, level=heading.end() - 1)
+
+    if CODE_PATTERN.match(markdown_block):
+        return ClassifiedBlock(BlockType.CODE)
+
+    quote_lines: list[str] | None = []
+    ulist_items: list[str] | None = []
+    olist_items: list[str] | None = []
+
+    for number, line in enumerate(markdown_block.strip().split('\n'), 1):
+        if quote_lines is not None:
+            if line.startswith('>'):
+                quote_lines.append(line.lstrip('>').strip())
+            else:
+                quote_lines = None
+
+        if ulist_items is not None:
+            if line.startswith('- '):
+                ulist_items.append(line[2:])
+            else:
+                ulist_items = None
+
+        if olist_items is not None:
+            item = ORDERED_ITEM_PATTERN.match(line)
+            if item and int(item.group(1)) == number:
+                olist_items.append(line[item.end():])
+            else:
+                olist_items = None
+
+        if quote_lines is None and ulist_items is None and olist_items is None:
+            return ClassifiedBlock(BlockType.PARAGRAPH)
+
+    if quote_lines is not None:
+        return ClassifiedBlock(BlockType.QUOTE, lines=quote_lines)
+    if ulist_items is not None:
+        return ClassifiedBlock(BlockType.UNORDERED_LIST, lines=ulist_items)
+    return ClassifiedBlock(BlockType.ORDERED_LIST, lines=olist_items)
+
+
 def block_to_block_type(markdown_block) -> BlockType:
     """Return block type based on markdown_block."""
+    return classify_block(markdown_block).block_type
 
-    if re.match(r'^#{1,6} ', markdown_block):
-        return BlockType.HEADING
-    
-    if re.match(r'^```[\s\S]*```$', markdown_block, re.DOTALL):
-        return BlockType.CODE
-
-    lines = markdown_block.strip().split('\n')
-    if all(line.startswith('>') for line in lines):
-        return BlockType.QUOTE
-    
-    if all(line.startswith('- ') for line in lines):
-        return BlockType.UNORDERED_LIST
-    
-    if all(re.match(r'^\d+\. ', line) for line in lines):
-        numbers = [int(re.match(r'^(\d+)\.', line).group(1)) for line in lines]
-        if numbers == list(range(1, len(numbers) + 1)):
-            return BlockType.ORDERED_LIST
-    
-    return BlockType.PARAGRAPH
 
+def markdown_to_html_node(markdown_text, pool: LeafPool | None = None) -> ParentNode:
+    """Generate a full Parent HTMLNode, its inline leaves shared through pool when given.
 
-def markdown_to_html_node(markdown_text) -> ParentNode:
-    """Generate a full Parent HTMLNode"""
+    Pooled leaves are FrozenLeafNodes, shared by every tree built with the
+    same pool, so they cannot be changed.
+    """
 
-    blocks = markdown_to_blocks(markdown_text)
+    with stage('markdown_to_blocks'):
+        blocks = markdown_to_blocks(markdown_text)
 
     children = []
 
     for block in blocks:
-        html_node = block_to_html_node(block)
+        html_node = block_to_html_node(block, pool)
         children.append(html_node)
 
     return ParentNode("div", children, None)
 
 
-def block_to_html_node(block):
+class MarkdownStream():
+    """Body html of a markdown file, converted block by block while it is written."""
+
+    def __init__(self, path, mapped = False, on_block = None):
+        """MarkdownStream constructor, mapped reads the file through mmap.
+
+        on_block, when given, is called with every block as it is written.
+        """
+        self.path = Path(path)
+        self.mapped = mapped
+        self.on_block = on_block
+
+    def write_html(self, sink) -> None:
+        """Write the html of each block to sink as soon as it is read.
+
+        Raises like markdown_to_html for a file without blocks.
+        """
+
+        if self.mapped:
+            with open_mapped(self.path) as mapped:
+                written = self._write_blocks(iter_mapped_lines(mapped), sink)
+        else:
+            with self.path.open('r') as f:
+                written = self._write_blocks(f, sink)
+        if not written:
+            raise ValueError("Children cannot be None")
+        sink.write('</div>')
+
+    def _write_blocks(self, lines, sink) -> bool:
+        on_block = self.on_block
+        written = False
+        empty = None
+        for block in iter_markdown_blocks(lines):
+            if on_block is not None:
+                on_block(block)
+            if not written:
+                sink.write('<div>')
+                written = True
+            try:
+                html = block_to_html(block)
+            except EmptyElementError as e:
+                empty = empty or e
+                continue
+            if empty is None:
+                sink.write(html)
+        if empty is not None:
+            raise empty
+        return written
+
+    def to_html(self) -> str:
+        """Return the html of the whole file."""
+
+        sink = io.StringIO()
+        self.write_html(sink)
+        return sink.getvalue()
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"MarkdownStream({self.path!r}, {self.mapped})"
+
+
+def block_to_html_node(block, pool: LeafPool | None = None):
     """Block to html."""
 
-    block_type = block_to_block_type(block)
-    match block_type:
+    with stage('classify'):
+        classified = classify_block(block)
+    match classified.block_type:
         case BlockType.PARAGRAPH:
-            return paragraph_to_html_node(block)
+            return paragraph_to_html_node(block, pool)
         case BlockType.HEADING:
-            return heading_to_html_node(block)
+            return heading_to_html_node(block, classified.level, pool)
         case BlockType.CODE:
             return code_to_html_node(block)
         case BlockType.ORDERED_LIST:
-            return olist_to_html_node(block)
+            return olist_to_html_node(block, classified.lines, pool)
         case BlockType.UNORDERED_LIST:
-            return ulist_to_html_node(block)
+            return ulist_to_html_node(block, classified.lines, pool)
         case BlockType.QUOTE:
-            return quote_to_html_node(block)
+            return quote_to_html_node(block, classified.lines, pool)
         case _:
             raise ValueError("invalid block type")
 
 
-def text_to_children(text):
-    """Text to children node."""
-    return list(map(text_node_to_html_node, text_to_textnodes(text)))
+def text_to_children(text, pool: LeafPool | None = None):
+    """Text to children node, shared through pool when given."""
+    with stage('inline'):
+        return text_nodes_to_html_nodes(text_to_textnodes(text), pool)
+
 
+def heading_parts(block, level = None) -> tuple[int, str]:
+    """Return the level and text of a heading block."""
 
-def paragraph_to_html_node(block):
+    if level is None:
+        level = 0
+        for char in block:
+            if char == "#":
+                level += 1
+            else:
+                break
+    if level + 1 >= len(block):
+        raise ValueError(f"invalid heading level: {level}")
+    return level, block[level + 1 :]
+
+
+def code_text(block) -> str:
+    """Return the text inside the fences of a code block."""
+
+    if not block.startswith("```") or not block.endswith("```"):
+        raise ValueError("invalid code block")
+    return block[4:-3]
+
+
+def olist_items(block) -> list[str]:
+    """Return the item bodies of an ordered_list block."""
+
+    items = []
+    for line in block.split("\n"):
+        item = ORDERED_ITEM_PATTERN.match(line)
+        items.append(line[item.end():] if item else line[3:])
+    return items
+
+
+def ulist_items(block) -> list[str]:
+    """Return the item bodies of an unordered_list block."""
+    return [item[2:] for item in block.split("\n")]
+
+
+def quote_text(block, lines = None) -> str:
+    """Return the text of a quote block, its lines joined without the '>' markers."""
+
+    if lines is None:
+        lines = []
+        for line in block.split("\n"):
+            if not line.startswith(">"):
+                raise ValueError("invalid quote block")
+            lines.append(line.lstrip(">").strip())
+    return " ".join(lines)
+
+
+def paragraph_to_html_node(block, pool = None):
     """Transform paragraph blocks."""
 
-    lines = block.split("\n")
-    paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
+    paragraph = block.replace("\n", " ")
+    children = text_to_children(paragraph, pool)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(block, level = None, pool = None):
     """Transform heading blocks."""
 
-    level = 0
-    for char in block:
-        if char == "#":
-            level += 1
-        else:
-            break
-    if level + 1 >= len(block):
-        raise ValueError(f"invalid heading level: {level}")
-    text = block[level + 1 :]
-    children = text_to_children(text)
+    level, text = heading_parts(block, level)
+    children = text_to_children(text, pool)
     return ParentNode(f"h{level}", children)
 
 
 def code_to_html_node(block):
     """Transform code blocks."""
 
-    if not block.startswith("```") or not block.endswith("```"):
-        raise ValueError("invalid code block")
-    text = block[4:-3]
-    raw_text_node = TextNode(text, TextType.TEXT)
+    raw_text_node = TextNode(code_text(block), TextType.TEXT)
     child = text_node_to_html_node(raw_text_node)
     code = ParentNode("code", [child])
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block):
+def olist_to_html_node(block, items = None, pool = None):
     """Transform ordered_list blocks."""
 
-    items = block.split("\n")
+    if items is None:
+        items = olist_items(block)
+
     html_items = []
-    for item in items:
-        text = item[3:]
-        children = text_to_children(text)
+    for text in items:
+        children = text_to_children(text, pool)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
 
-def ulist_to_html_node(block):
+def ulist_to_html_node(block, items = None, pool = None):
     """Transform unordered_list blocks."""
 
-    items = block.split("\n")
+    if items is None:
+        items = ulist_items(block)
+
     html_items = []
-    for item in items:
-        text = item[2:]
-        children = text_to_children(text)
+    for text in items:
+        children = text_to_children(text, pool)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block):
+def quote_to_html_node(block, lines = None, pool = None):
     """Transform quote blocks."""
 
-    lines = block.split("\n")
-    new_lines = []
-    for line in lines:
-        if not line.startswith(">"):
-            raise ValueError("invalid quote block")
-        new_lines.append(line.lstrip(">").strip())
-    content = " ".join(new_lines)
-    children = text_to_children(content)
+    content = quote_text(block, lines)
+    children = text_to_children(content, pool)
     return ParentNode("blockquote", children)
-    
\ No newline at end of file
+
+
+# Direct rendering: the same html as the node tree, written as strings
+# straight from the block classification and the inline tokens.
+
+class EmptyElementError(ValueError):
+    """Raised, with the message of ParentNode, for an element without children.
+
+    The node tree only finds those once every block is parsed, so the direct
+    path holds one back until the blocks after it are rendered.
+    """
+
+    def __init__(self):
+        """EmptyElementError constructor."""
+        super().__init__("Children cannot be None")
+
+
+def markdown_to_html(markdown_text, on_block = None) -> str:
+    """Return the html of markdown_to_html_node(markdown_text) without building nodes.
+
+    Raises what markdown_to_html_node(markdown_text).to_html() would.
+    on_block, when given, is called with every block before they render.
+    """
+
+    with stage('markdown_to_blocks'):
+        blocks = markdown_to_blocks(markdown_text)
+    if on_block is not None:
+        with stage('references'):
+            for block in blocks:
+                on_block(block)
+    if not blocks:
+        raise ValueError("Children cannot be None")
+    return f"<div>{join_elements(block_to_html, blocks)}</div>"
+
+
+def join_elements(render, items) -> str:
+    """Return the joined render(item) of items, raising an EmptyElementError only after every item rendered."""
+
+    parts = []
+    empty = None
+    for item in items:
+        try:
+            parts.append(render(item))
+        except EmptyElementError as e:
+            empty = empty or e
+    if empty is not None:
+        raise empty
+    return ''.join(parts)
+
+
+def block_to_html(block) -> str:
+    """Return the html of block_to_html_node(block) without building nodes."""
+
+    with stage('classify'):
+        classified = classify_block(block)
+    match classified.block_type:
+        case BlockType.PARAGRAPH:
+            return element_html("p", block.replace("\n", " "))
+        case BlockType.HEADING:
+            level, text = heading_parts(block, classified.level)
+            return element_html(f"h{level}", text)
+        case BlockType.CODE:
+            return f"<pre><code>{code_text(block)}</code></pre>"
+        case BlockType.ORDERED_LIST:
+            return f"<ol>{join_elements(list_item_html, classified.lines)}</ol>"
+        case BlockType.UNORDERED_LIST:
+            return f"<ul>{join_elements(list_item_html, classified.lines)}</ul>"
+        case BlockType.QUOTE:
+            return element_html("blockquote", quote_text(block, classified.lines))
+        case _:
+            raise ValueError("invalid block type")
+
+
+def element_html(tag: str, text) -> str:
+    """Return the element tag around the inline html of text."""
+
+    with stage('inline'):
+        text_nodes = text_to_textnodes(text)
+    if not text_nodes:
+        # As ParentNode refuses an element without children.
+        raise EmptyElementError()
+    with stage('to_html'):
+        return f"<{tag}>{text_nodes_to_html(text_nodes)}</{tag}>"
+
+
+def list_item_html(text) -> str:
+    """Return the li element of a list item."""
+    return element_html('li', text)
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+import sys
+
+
+# Modules whose source decides the html rendered for a markdown document.
+PARSER_MODULES = (
+    'nodes.htmlnode',
+    'nodes.textnode',
+    'utilities.block_utilities',
+    'utilities.inline_utilities',
+)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def parser_version() -> str:
+    """Return a digest of the parser sources, so edits to them invalidate the cache."""
+
+    digest = hashlib.sha256()
+    for name in PARSER_MODULES:
+        __import__(name)
+        digest.update(Path(sys.modules[name].__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def content_key(markdown: str) -> str:
+    """Return the cache key of a markdown document."""
+    return hashlib.sha256(markdown.encode()).hexdigest()
+
+
+class RenderCache():
+    """On disk LRU cache mapping markdown content to its rendered body html.
+
+    Entries live in a directory per parser version and their mtime records
+    the last use, so several build processes can share one cache. Entries
+    another process removed or replaced meanwhile are treated as misses,
+    the cache never fails a build.
+    """
+
+    def __init__(self, cache_dir, max_bytes: int = DEFAULT_MAX_BYTES, version: str | None = None):
+        """RenderCache constructor."""
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.version = version or parser_version()
+        self.entries_dir = self.cache_dir / self.version
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_versions()
+
+    def _remove_stale_versions(self) -> None:
+        """Delete entries written by other parser versions."""
+
+        for item in self.cache_dir.iterdir():
+            if not item.is_dir() or item.name == self.version:
+                continue
+            try:
+                for entry in item.iterdir():
+                    entry.unlink(missing_ok=True)
+                item.rmdir()
+            except OSError as e:
+                # Another process is removing it too, or still writing to it.
+                logger.debug(f'Could not remove stale render cache {item}: {e}')
+
+    def _entry_path(self, markdown: str) -> Path:
+        return self.entries_dir / f'{content_key(markdown)}.html'
+
+    def get(self, markdown: str) -> str | None:
+        """Return the cached html for markdown, or None."""
+
+        path = self._entry_path(markdown)
+        try:
+            html = path.read_text()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process since it was read.
+            pass
+
+        self.hits += 1
+        return html
+
+    def put(self, markdown: str, html: str) -> None:
+        """Store the html rendered for markdown."""
+
+        path = self._entry_path(markdown)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            tmp_path.write_text(html)
+            tmp_path.replace(path)
+            size = path.stat().st_size
+        except OSError as e:
+            # The entry or its directory was removed by another process.
+            tmp_path.unlink(missing_ok=True)
+            logger.debug(f'Could not store render cache entry {path.name}: {e}')
+            return
+
+        self._written += size
+        if self._written > self.max_bytes // 8:
+            self.prune()
+
+    def prune(self) -> None:
+        """Evict the least recently used entries until the cache fits max_bytes."""
+
+        self._written = 0
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.entries_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith('.html'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total += stat.st_size
+        except FileNotFoundError:
+            return
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+
+        logger.info(f'Render cache pruned to {total} bytes.')
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"RenderCache({self.entries_dir}, {self.max_bytes}, hits={self.hits}, misses={self.misses})"
@@ -0,0 +1,215 @@
+import json
+import logging
+from pathlib import Path, PurePosixPath
+import posixpath
+from urllib.parse import urlsplit
+
+from utilities.block_utilities import BlockType, block_to_block_type, iter_markdown_blocks
+from utilities.inline_utilities import extract_markdown_images, extract_markdown_links
+from utilities.static_utilities import list_files
+
+
+# 2 stores the template path normalized.
+GRAPH_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_path(path) -> str:
+    """Return path the way the graph stores it, './template.html' as 'template.html'."""
+    return posixpath.normpath(Path(path).as_posix())
+
+
+def resolve_url(url: str, page_output: str) -> str | None:
+    """Return the output path a url of page_output points to, None for external urls.
+
+    Urls without a suffix point to the index.html of a directory, the way the
+    site is served.
+    """
+
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+
+    if parts.path.startswith('/'):
+        path = parts.path.lstrip('/')
+    else:
+        path = posixpath.join(posixpath.dirname(page_output), parts.path)
+    path = posixpath.normpath(path) if path else '.'
+
+    if path == '.':
+        return 'index.html'
+    if not PurePosixPath(path).suffix:
+        return f'{path}/index.html'
+    return path
+
+
+class PageReferences():
+    """Images and internal links of a page, collected block by block while it renders."""
+
+    def __init__(self, page_output: str):
+        """PageReferences constructor."""
+        self.page_output = page_output
+        self.assets: set[str] = set()
+        self.links: set[str] = set()
+
+    def add(self, block: str) -> None:
+        """Collect the references of a block, code blocks have none."""
+
+        if block_to_block_type(block) == BlockType.CODE:
+            return
+        for _, url in extract_markdown_images(block):
+            target = resolve_url(url, self.page_output)
+            if target is not None:
+                self.assets.add(target)
+        for _, url in extract_markdown_links(block):
+            target = resolve_url(url, self.page_output)
+            if target is not None:
+                self.links.add(target)
+
+    def result(self) -> tuple[list[str], list[str]]:
+        """Return the sorted assets and links."""
+        return sorted(self.assets), sorted(self.links)
+
+
+def page_references(blocks, page_output: str) -> tuple[list[str], list[str]]:
+    """Return the sorted output paths of the images and internal links in the blocks of a page."""
+
+    references = PageReferences(page_output)
+    for block in blocks:
+        references.add(block)
+    return references.result()
+
+
+class DependencyGraph():
+    """What every page was built from and points to: its template, images and internal links.
+
+    Pages are keyed by their path relative to the content dir, references are
+    output paths relative to the public dir.
+    """
+
+    def __init__(self, pages: dict[str, dict] | None = None):
+        """DependencyGraph constructor."""
+        self.pages = pages if pages is not None else {}
+
+    def add(self, key: str, output: str, template: str, assets: list[str], links: list[str]) -> None:
+        """Record the dependencies of page key, replacing the previous ones."""
+        self.pages[key] = {'output': output, 'template': normalize_path(template), 'assets': assets, 'links': links}
+
+    def record(self, references: dict, template: str, replace = False) -> None:
+        """Record the (assets, links) of rendered pages, keyed by output path.
+
+        With replace the pages not in references are dropped, as after a
+        full build.
+        """
+
+        if replace:
+            self.pages = {}
+        for output, (assets, links) in references.items():
+            key = PurePosixPath(output).with_suffix('.md').as_posix()
+            self.add(key, output, template, list(assets), list(links))
+
+    def remove(self, key: str) -> None:
+        """Forget page key."""
+        self.pages.pop(key, None)
+
+    def scan(self, content_dir, template_path, keys = None) -> None:
+        """Record the pages keys of content_dir, every page when None, dropping the ones gone.
+
+        Pages are read and split again, the references of pages being
+        rendered are cheaper collected by the render and recorded.
+        """
+
+        content_path = Path(content_dir)
+        if keys is None:
+            keys = [item.relative_to(content_path).as_posix() for item in content_path.rglob('*.md')]
+            self.pages = {}
+
+        for key in keys:
+            path = content_path / key
+            if not path.exists():
+                self.remove(key)
+                continue
+            output = PurePosixPath(key).with_suffix('.html').as_posix()
+            with path.open('r') as f:
+                assets, links = page_references(iter_markdown_blocks(f), output)
+            self.add(key, output, template_path, assets, links)
+
+    def dependents(self, target: str) -> list[str]:
+        """Return the pages that use target as their template, an image or a link."""
+
+        target = normalize_path(target)
+        return sorted(
+            key for key, entry in self.pages.items()
+            if entry['template'] == target or target in entry['assets'] or target in entry['links']
+        )
+
+    def affected_by(self, targets) -> list[str]:
+        """Return the pages depending on any of targets."""
+
+        targets = {normalize_path(target) for target in targets}
+        return sorted(
+            key for key, entry in self.pages.items()
+            if entry['template'] in targets or not targets.isdisjoint(entry['assets'] + entry['links'])
+        )
+
+    def broken_references(self, outputs, pages = None) -> list[tuple[str, str]]:
+        """Return the (page, reference) pairs whose target is not among the output paths.
+
+        pages limits the check to those pages, every page when None.
+        """
+
+        outputs = set(outputs)
+        broken = []
+        for key, entry in sorted(self.pages.items()):
+            if pages is not None and key not in pages:
+                continue
+            for target in entry['assets'] + entry['links']:
+                if target not in outputs:
+                    broken.append((key, target))
+        return broken
+
+    def report(self, public_dir, pages = None) -> list[tuple[str, str]]:
+        """Log and return the references missing from public_dir, of pages or every page."""
+
+        broken = self.broken_references(list_files(public_dir), pages)
+        for key, target in broken:
+            logger.warning(f'Broken reference in {key}: {target}')
+        return broken
+
+    @classmethod
+    def load(cls, graph_path) -> 'DependencyGraph':
+        """Load a graph, falling back to an empty one."""
+
+        graph_path = Path(graph_path)
+        if not graph_path.exists():
+            return cls()
+
+        try:
+            data = json.loads(graph_path.read_text())
+        except (OSError, ValueError):
+            logger.warning(f'Ignoring unreadable dependency graph {graph_path}.')
+            return cls()
+
+        if data.get('version') != GRAPH_VERSION:
+            return cls()
+        return cls(data.get('pages', {}))
+
+    def save(self, graph_path) -> None:
+        """Write the graph as json."""
+
+        graph_path = Path(graph_path)
+        graph_path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = {'version': GRAPH_VERSION, 'pages': self.pages}
+        tmp_path = graph_path.with_name(graph_path.name + '.tmp')
+        tmp_path.write_text(json.dumps(data, indent=1, sort_keys=True))
+        tmp_path.replace(graph_path)
+
+    def __eq__(self, other: 'DependencyGraph') -> bool:
+        """Equal method."""
+        return self.pages == other.pages
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"DependencyGraph({len(self.pages)} pages)"
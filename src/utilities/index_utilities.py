@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+from pathlib import Path, PurePosixPath
+import time
+from typing import NamedTuple
+
+from utilities.manifest_utilities import MTIME_GRANULARITY_NS
+from utilities.page_utilities import extract_title_lines
+
+
+INDEX_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshSummary(NamedTuple):
+    """What a content index refresh had to look at."""
+    scanned: list[str]
+    changed: list[str]
+    removed: list[str]
+
+
+def read_title(path) -> str | None:
+    """Return the title of the page at path, reading no further than its first heading."""
+
+    try:
+        with Path(path).open('r') as f:
+            return extract_title_lines(f)
+    except ValueError:
+        return None
+
+
+class ContentIndex():
+    """The markdown sources of a content dir with their size, mtime, title and output path.
+
+    Pages are keyed by their posix path relative to the content dir. The
+    listing of every directory is kept with its mtime, a refresh only lists
+    the directories whose mtime changed, which is when entries were added,
+    removed or renamed. Known pages are still stat'ed to notice edits.
+
+    A mtime only moves on when the filesystem's clock ticks, which can be
+    seconds apart. Directories and pages whose mtime is within
+    MTIME_GRANULARITY_NS of when they were listed or read are looked at
+    again on the next refresh, they may have changed since unnoticed.
+    """
+
+    def __init__(self, content_dir, dirs: dict[str, dict] | None = None, pages: dict[str, dict] | None = None):
+        """ContentIndex constructor."""
+        self.content_dir = Path(content_dir)
+        self.dirs = dirs if dirs is not None else {}
+        self.pages = pages if pages is not None else {}
+
+    def refresh(self) -> RefreshSummary:
+        """Bring the index up to date with the content dir."""
+
+        summary = RefreshSummary([], [], [])
+        seen_dirs = set()
+        seen_pages = set()
+        stack = ['']
+
+        while stack:
+            rel_dir = stack.pop()
+            dir_path = self.content_dir / rel_dir
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            seen_dirs.add(rel_dir)
+
+            listing = self.dirs.get(rel_dir)
+            if listing is None or listing['mtime_ns'] != mtime_ns or is_racy(mtime_ns, listing['listed_ns']):
+                listing = self._list_dir(dir_path, mtime_ns)
+                self.dirs[rel_dir] = listing
+                summary.scanned.append(rel_dir)
+
+            stack.extend(posix_join(rel_dir, name) for name in reversed(listing['dirs']))
+            for name in listing['files']:
+                key = posix_join(rel_dir, name)
+                try:
+                    stat = os.stat(dir_path / name)
+                except FileNotFoundError:
+                    continue
+                seen_pages.add(key)
+
+                page = self.pages.get(key)
+                if (
+                    page is not None and
+                    (page['size'], page['mtime_ns']) == (stat.st_size, stat.st_mtime_ns) and
+                    not is_racy(stat.st_mtime_ns, page['read_ns'])
+                ):
+                    continue
+                self.pages[key] = {
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'read_ns': time.time_ns(),
+                    'title': read_title(dir_path / name),
+                    'output': PurePosixPath(key).with_suffix('.html').as_posix(),
+                }
+                summary.changed.append(key)
+
+        for rel_dir in set(self.dirs) - seen_dirs:
+            del self.dirs[rel_dir]
+        for key in sorted(set(self.pages) - seen_pages):
+            del self.pages[key]
+            summary.removed.append(key)
+
+        logger.info(
+            f'Content index: {len(summary.scanned)} dir(s) listed, '
+            f'{len(summary.changed)} page(s) read, {len(summary.removed)} removed.'
+        )
+        return summary
+
+    @staticmethod
+    def _list_dir(dir_path: Path, mtime_ns: int) -> dict:
+        listed_ns = time.time_ns()
+        files = []
+        dirs = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                elif entry.name.endswith('.md') and entry.is_file():
+                    files.append(entry.name)
+        return {'mtime_ns': mtime_ns, 'listed_ns': listed_ns, 'files': sorted(files), 'dirs': sorted(dirs)}
+
+    def jobs(self) -> list[tuple[str, str]]:
+        """Return the (source path, output key) of every page, like list_pages."""
+        return [(str(self.content_dir / key), page['output']) for key, page in sorted(self.pages.items())]
+
+    def titles(self) -> dict[str, str]:
+        """Return the title of every page that has one, keyed by source path like jobs."""
+
+        return {
+            str(self.content_dir / key): page['title']
+            for key, page in self.pages.items()
+            if page['title'] is not None
+        }
+
+    @classmethod
+    def load(cls, index_path, content_dir) -> 'ContentIndex':
+        """Load the index of content_dir, falling back to an empty one."""
+
+        index_path = Path(index_path)
+        if not index_path.exists():
+            return cls(content_dir)
+
+        try:
+            data = json.loads(index_path.read_text())
+        except (OSError, ValueError):
+            logger.warning(f'Ignoring unreadable content index {index_path}.')
+            return cls(content_dir)
+
+        if data.get('version') != INDEX_VERSION or data.get('content_dir') != str(Path(content_dir)):
+            return cls(content_dir)
+        return cls(content_dir, data.get('dirs', {}), data.get('pages', {}))
+
+    def save(self, index_path) -> None:
+        """Write the index as json."""
+
+        index_path = Path(index_path)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = {
+            'version': INDEX_VERSION,
+            'content_dir': str(self.content_dir),
+            'dirs': self.dirs,
+            'pages': self.pages,
+        }
+        tmp_path = index_path.with_name(f'{index_path.name}.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(data, indent=1, sort_keys=True))
+        tmp_path.replace(index_path)
+
+    def __eq__(self, other: 'ContentIndex') -> bool:
+        """Equal method."""
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"ContentIndex({str(self.content_dir)!r}, {len(self.dirs)} dirs, {len(self.pages)} pages)"
+
+
+def is_racy(mtime_ns: int, seen_ns: int) -> bool:
+    """Return True when a change right after seen_ns could have left mtime_ns as it was."""
+    return seen_ns - mtime_ns < MTIME_GRANULARITY_NS
+
+
+def posix_join(rel_dir: str, name: str) -> str:
+    """Join a name to a relative posix dir, '' being the root."""
+    return f'{rel_dir}/{name}' if rel_dir else name
@@ -1,6 +1,127 @@
 import re
 
-from nodes import TextNode, TextType
+from nodes import SpanTextNode, TextNode, TextType
+
+
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+# Delimiters in the order the split passes apply them, earlier ones win.
+INLINE_DELIMITERS: tuple[tuple[str, TextType], ...] = (
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+    ("`", TextType.CODE),
+)
+
+
+class DelimiterTable():
+    """Inline delimiters in precedence order, scanned for on offsets into the text.
+
+    A scan finds the matches of the first delimiter and recurses into the
+    text between them for the delimiters after it, as the split passes
+    would, but without slicing the text. A delimiter that does not occur
+    in a range costs a single find.
+    """
+
+    def __init__(self, delimiters = INLINE_DELIMITERS):
+        """DelimiterTable constructor."""
+        self.delimiters: tuple[tuple[str, TextType], ...] = ()
+        # The (delimiter, width, text type) of each level.
+        self._levels: list[tuple[str, int, TextType]] = []
+        for delimiter, text_type in delimiters:
+            self.register(delimiter, text_type)
+
+    def register(self, delimiter: str, text_type: TextType) -> None:
+        """Add delimiter for text_type, after, so below, every delimiter already in the table."""
+
+        if not delimiter:
+            raise ValueError('A delimiter cannot be empty')
+        if any(delimiter == known for known, _ in self.delimiters):
+            raise ValueError(f'Delimiter already registered: {delimiter}')
+
+        self.delimiters += ((delimiter, text_type),)
+        self._levels.append((delimiter, len(delimiter), text_type))
+
+    def scan(self, text: str, start: int = 0, end: int | None = None) -> list[tuple[int, int, TextType]]:
+        """Return the (start, end, text type) spans of text[start:end], delimiters excluded.
+
+        Emits the spans the split passes would, one per node, and raises
+        ValueError for the delimiter their first failing pass would.
+        """
+
+        spans: list[tuple[int, int, TextType]] = []
+        unclosed = self._scan(text, start, len(text) if end is None else end, 0, spans, _span)
+        if unclosed < len(self._levels):
+            raise ValueError(f'No closing delimiter found for {self.delimiters[unclosed][0]}')
+        return spans
+
+    def _scan(self, text: str, start: int, end: int, level: int, nodes: list, make = None) -> int:
+        """Append the nodes of text[start:end] for the delimiters from level on to nodes.
+
+        Nodes are TextNodes, or make(text, start, end, text type) when
+        given. Returns the level of the earliest delimiter left open, the
+        table length when none is.
+        """
+
+        levels = self._levels
+        count = len(levels)
+        while level < count:
+            delimiter, width, text_type = levels[level]
+            opening = text.find(delimiter, start, end)
+            if opening != -1:
+                break
+            level += 1
+        else:
+            if start < end:
+                if make is None:
+                    nodes.append(TextNode(text[start:end], TextType.TEXT))
+                else:
+                    nodes.append(make(text, start, end, TextType.TEXT))
+            return count
+
+        find = text.find
+        unclosed = count
+        position = start
+        while opening != -1:
+            closing = find(delimiter, opening + width, end)
+            if closing == -1:
+                # Delimiters after this one cannot fail an earlier pass.
+                return level
+
+            if position < opening:
+                below = self._scan(text, position, opening, level + 1, nodes, make)
+                if below < unclosed:
+                    unclosed = below
+            if make is None:
+                nodes.append(TextNode(text[opening + width:closing], text_type))
+            else:
+                nodes.append(make(text, opening + width, closing, text_type))
+            position = closing + width
+            opening = find(delimiter, position, end)
+
+        if position < end:
+            below = self._scan(text, position, end, level + 1, nodes, make)
+            if below < unclosed:
+                unclosed = below
+        return unclosed
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"DelimiterTable({[delimiter for delimiter, _ in self.delimiters]})"
+
+
+def _span(text: str, start: int, end: int, text_type: TextType) -> tuple[int, int, TextType]:
+    return start, end, text_type
+
+
+# Delimiters of the scan and split parsers, extended with register_delimiter.
+DELIMITERS = DelimiterTable()
+
+
+def register_delimiter(delimiter: str, text_type: TextType) -> None:
+    """Register an inline delimiter, e.g. '~~' for TextType.STRIKETHROUGH, below the built in ones."""
+    DELIMITERS.register(delimiter, text_type)
+
 
 def split_nodes_delimiter(*, old_nodes: list[TextNode], delimiter: str, text_type: TextType) -> list[TextNode]:
     """Split nodes by delimiter."""
@@ -37,14 +158,50 @@ def split_nodes_delimiter(*, old_nodes: list[TextNode], delimiter: str, text_typ
     return new_nodes
 
 
+def split_nodes_delimiters(
+    old_nodes: list[TextNode],
+    table: DelimiterTable = None,
+    spans: bool = False
+    ) -> list[TextNode]:
+    """Split nodes by every delimiter of table, DELIMITERS by default, in one scan per node.
+
+    Gives the nodes, and the error, of a split_nodes_delimiter pass per
+    delimiter in table order. SpanTextNodes are scanned in their source
+    without slicing it, with spans the new nodes are SpanTextNodes too.
+    """
+
+    if table is None:
+        table = DELIMITERS
+
+    new_nodes: list[TextNode] = []
+    unclosed = len(table.delimiters)
+    make = SpanTextNode if spans else None
+
+    for old_node in old_nodes:
+        if old_node.text_type != TextType.TEXT:
+            new_nodes.append(old_node)
+            continue
+
+        if isinstance(old_node, SpanTextNode):
+            text, start, end = old_node.source, old_node.start, old_node.end
+        else:
+            text, start, end = old_node.text, 0, len(old_node.text)
+        # The passes would fail on the earliest delimiter left open in any node.
+        unclosed = min(unclosed, table._scan(text, start, end, 0, new_nodes, make))
+
+    if unclosed < len(table.delimiters):
+        raise ValueError(f'No closing delimiter found for {table.delimiters[unclosed][0]}')
+    return new_nodes
+
+
 def extract_markdown_images(text: str) -> list[tuple[str, str]]:
     """Use regex to find markdown image tag."""
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text: str) -> list[tuple[str, str]]:
     """Use regex to find markdown link tag."""
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
@@ -121,15 +278,94 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
     return new_nodes
 
 
-def text_to_textnodes(text) -> list[TextNode]:
-    """Transform markdown text to a list of TextNodes."""
+def split_text_to_textnodes(text) -> list[TextNode]:
+    """Transform markdown text to TextNodes with one split pass per syntax."""
     nodes = [TextNode(text, TextType.TEXT)]
     
     nodes = split_nodes_image(nodes)
     nodes = split_nodes_link(nodes)
     
-    nodes = split_nodes_delimiter(old_nodes=nodes, delimiter="**", text_type=TextType.BOLD)
-    nodes = split_nodes_delimiter(old_nodes=nodes, delimiter="_", text_type=TextType.ITALIC)
-    nodes = split_nodes_delimiter(old_nodes=nodes, delimiter="`", text_type=TextType.CODE)
+    for delimiter, text_type in DELIMITERS.delimiters:
+        nodes = split_nodes_delimiter(old_nodes=nodes, delimiter=delimiter, text_type=text_type)
     
-    return nodes
\ No newline at end of file
+    return nodes
+
+
+def scan_text_to_textnodes(text, spans = False) -> list[TextNode]:
+    """Transform markdown text to TextNodes in a single left to right scan.
+
+    Emits the same nodes, and raises the same error, as split_text_to_textnodes,
+    but works on offsets into the original text instead of re-slicing it after
+    every match. With spans the nodes are SpanTextNodes of text, only the urls
+    are sliced.
+    """
+    nodes: list[TextNode] = []
+    make = SpanTextNode if spans else None
+    position = 0
+    unclosed = len(DELIMITERS.delimiters)
+
+    for image in IMAGE_PATTERN.finditer(text):
+        level = _scan_links(text, position, image.start(), nodes, make)
+        if level < unclosed:
+            unclosed = level
+        nodes.append(_match_node(image, TextType.IMAGE, spans))
+        position = image.end()
+    level = _scan_links(text, position, len(text), nodes, make)
+    if level < unclosed:
+        unclosed = level
+
+    # Like the split passes, fail on the earliest delimiter left open anywhere.
+    if unclosed < len(DELIMITERS.delimiters):
+        raise ValueError(f'No closing delimiter found for {DELIMITERS.delimiters[unclosed][0]}')
+    return nodes
+
+
+def _scan_links(text: str, start: int, end: int, nodes: list[TextNode], make = None) -> int:
+    """Scan text[start:end] for links, returning the earliest delimiter level left open."""
+    scan = DELIMITERS._scan
+    unclosed = len(DELIMITERS.delimiters)
+    position = start
+
+    for link in LINK_PATTERN.finditer(text, start, end):
+        if position < link.start():
+            level = scan(text, position, link.start(), 0, nodes, make)
+            if level < unclosed:
+                unclosed = level
+        if make is None:
+            nodes.append(TextNode(link.group(1), TextType.LINK, link.group(2)))
+        else:
+            nodes.append(_match_node(link, TextType.LINK, True))
+        position = link.end()
+    if position < end:
+        level = scan(text, position, end, 0, nodes, make)
+        if level < unclosed:
+            unclosed = level
+    return unclosed
+
+
+def _match_node(match: re.Match, text_type: TextType, spans = False) -> TextNode:
+    """Return the node of an image or link match."""
+    if spans:
+        return SpanTextNode(match.string, match.start(1), match.end(1), text_type, match.group(2))
+    return TextNode(match.group(1), text_type, match.group(2))
+
+
+INLINE_PARSERS = {
+    'split': split_text_to_textnodes,
+    'scan': scan_text_to_textnodes,
+}
+
+
+def text_to_textnodes(text, parser: str = 'scan', spans: bool = False) -> list[TextNode]:
+    """Transform markdown text to a list of TextNodes, SpanTextNodes with spans.
+
+    Spans are only produced by the scan parser.
+    """
+
+    if parser not in INLINE_PARSERS:
+        raise ValueError(f'Unknown inline parser: {parser}')
+    if spans:
+        if parser != 'scan':
+            raise ValueError(f'The {parser} parser does not produce spans')
+        return scan_text_to_textnodes(text, spans=True)
+    return INLINE_PARSERS[parser](text)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+
+MANIFEST_VERSION = 1
+
+# Written into the public dir for deploys, listing the digest of every other file.
+# A dotfile, so it cannot take the place of a page or asset such as a web app's manifest.json.
+OUTPUT_MANIFEST = '.deploy-manifest.json'
+OUTPUT_MANIFEST_VERSION = 1
+
+# Coarsest mtime resolution in use (FAT, some network mounts), a directory
+# modified this close to when it was listed may have changed unnoticed.
+MTIME_GRANULARITY_NS = 2 * 10 ** 9
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path) -> str:
+    """Return the sha256 hex digest of a file."""
+
+    with Path(path).open('rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def template_digest(template_path, base_path: str | None = None) -> str:
+    """Return the digest pages rendered into a template depend on, the base path its links are rebased to included."""
+
+    digest = file_digest(template_path)
+    return f'{digest}:{base_path}' if base_path else digest
+
+
+def static_fingerprint(path) -> list[int]:
+    """Return the [mtime_ns, size] fingerprint of a static file."""
+
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class BuildManifest():
+    """Fingerprints of the inputs used by the previous build."""
+
+    def __init__(
+        self,
+        template_digest: str | None = None,
+        pages: dict[str, dict[str, str]] | None = None,
+        static: dict[str, list[int]] | None = None
+        ):
+        """BuildManifest constructor."""
+        self.template_digest = template_digest
+        self.pages = pages if pages is not None else {}
+        self.static = static if static is not None else {}
+
+    @classmethod
+    def load(cls, manifest_path) -> 'BuildManifest':
+        """Load a manifest, falling back to an empty one."""
+
+        manifest_path = Path(manifest_path)
+        if not manifest_path.exists():
+            return cls()
+
+        try:
+            data = json.loads(manifest_path.read_text())
+        except (OSError, ValueError):
+            logger.warning(f'Ignoring unreadable build manifest {manifest_path}.')
+            return cls()
+
+        if data.get('version') != MANIFEST_VERSION:
+            return cls()
+
+        return cls(
+            template_digest=data.get('template_digest'),
+            pages=data.get('pages', {}),
+            static=data.get('static', {}),
+        )
+
+    def save(self, manifest_path) -> None:
+        """Write the manifest as json."""
+
+        manifest_path = Path(manifest_path)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = {
+            'version': MANIFEST_VERSION,
+            'template_digest': self.template_digest,
+            'pages': self.pages,
+            'static': self.static,
+        }
+        tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+        tmp_path.write_text(json.dumps(data, indent=1, sort_keys=True))
+        tmp_path.replace(manifest_path)
+
+    def __eq__(self, other: 'BuildManifest') -> bool:
+        """Equal method."""
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"BuildManifest({self.template_digest}, {len(self.pages)} pages, {len(self.static)} static)"
+
+
+def remove_output(path, root) -> None:
+    """Remove a generated file and prune the empty directories above it."""
+
+    path = Path(path)
+    root = Path(root).resolve()
+
+    if path.exists():
+        path.unlink()
+
+    parent = path.parent.resolve()
+    while parent != root and root in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+        parent = parent.parent
+
+
+def load_output_manifest(public_dir) -> dict[str, dict]:
+    """Return the files listed by the deploy manifest of public_dir, empty when missing or stale."""
+
+    try:
+        data = json.loads((Path(public_dir) / OUTPUT_MANIFEST).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != OUTPUT_MANIFEST_VERSION:
+        return {}
+    return data.get('files', {})
+
+
+def update_output_manifest(public_dir, keys) -> None:
+    """Bring the deploy manifest of public_dir, if it has one, up to date for the files at keys.
+
+    Every writer that changes files of a public dir in place calls this
+    with the keys it wrote or removed, so a later build never trusts a
+    digest of bytes that are gone. Entries are taken from the files as
+    they are now, a missing file is dropped from the manifest.
+    """
+
+    public_path = Path(public_dir)
+    manifest_path = public_path / OUTPUT_MANIFEST
+    try:
+        data = json.loads(manifest_path.read_text())
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError):
+        data = None
+    if not isinstance(data, dict) or data.get('version') != OUTPUT_MANIFEST_VERSION:
+        # A manifest that cannot be brought up to date is worse than none.
+        manifest_path.unlink(missing_ok=True)
+        return
+
+    files = data.get('files', {})
+    for key in keys:
+        if key == OUTPUT_MANIFEST:
+            continue
+        path = public_path / key
+        try:
+            files[key] = {'sha256': file_digest(path), 'size': path.stat().st_size}
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            files.pop(key, None)
+    data['files'] = dict(sorted(files.items()))
+
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    tmp_path.write_text(json.dumps(data, indent=2))
+    tmp_path.replace(manifest_path)
+
+
+def remove_output_manifest(public_dir) -> None:
+    """Drop the deploy manifest of public_dir, for writers that cannot tell which files they changed."""
+    (Path(public_dir) / OUTPUT_MANIFEST).unlink(missing_ok=True)
@@ -0,0 +1,304 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+import threading
+from typing import NamedTuple
+
+from utilities.manifest_utilities import OUTPUT_MANIFEST, OUTPUT_MANIFEST_VERSION, file_digest, load_output_manifest
+from utilities.static_utilities import clone_file, is_current, list_files
+
+
+DEFAULT_WRITE_WORKERS = 8
+# Queued writes hold their whole data, at most this many per worker are queued.
+PENDING_WRITES_PER_WORKER = 4
+
+# renameat2 flag swapping two paths in one step, Linux only.
+RENAME_EXCHANGE = 2
+AT_FDCWD = -100
+
+logger = logging.getLogger(__name__)
+
+
+class WriteSummary(NamedTuple):
+    """Outcome of a staged output write."""
+    written: list[str]
+    unchanged: list[str]
+
+
+def same_bytes(path: Path, data: bytes) -> bool:
+    """Return True when the file at path holds exactly data."""
+
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return False
+
+
+class HashingSink():
+    """Text sink encoding what is written into a binary file, hashing it on the way."""
+
+    def __init__(self, file):
+        """HashingSink constructor."""
+        self.file = file
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text: str) -> int:
+        """Write text to the file."""
+        data = text.encode()
+        self.hash.update(data)
+        self.size += len(data)
+        self.file.write(data)
+        return len(text)
+
+
+def exchange_paths(first: Path, second: Path) -> bool:
+    """Atomically swap two existing paths, returning False where renameat2 is unsupported."""
+
+    try:
+        import ctypes
+
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (ImportError, OSError, AttributeError):
+        return False
+    return renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE) == 0
+
+
+class OutputWriter():
+    """Writes the files of a build into a staging dir, then swaps it into the public dir.
+
+    Used as a context manager the public dir is only replaced when the block
+    succeeds, a failing build leaves it as it was. Files whose bytes did not
+    change are hardlinked from the current public dir instead of written, so
+    they keep their mtime. At most workers * PENDING_WRITES_PER_WORKER
+    writes are queued, write blocks until one of them is done, and
+    write_stream writes in the calling thread without holding the data.
+
+    With digests set every file is hashed and recorded in a .deploy-manifest.json
+    written with the output. Files are then recognised as unchanged by the
+    digest in the previous manifest, without reading the current output,
+    unless the file changed after that manifest was written, e.g. by hand,
+    in which case it is hashed again. manifest_fields are written as extra
+    top level fields of that manifest.
+    """
+
+    def __init__(self, public_dir, workers = DEFAULT_WRITE_WORKERS, digests = False, manifest_fields = None):
+        """OutputWriter constructor."""
+        self.public_dir = Path(public_dir)
+        self.staging_dir = self.public_dir.with_name(self.public_dir.name + '.staging')
+        self.workers = workers
+        self.digests = digests
+        self.manifest_fields = manifest_fields or {}
+        self.summary = WriteSummary([], [])
+        self.files: dict[str, dict] = {}
+        self._previous: dict[str, dict] = {}
+        # mtime of the previous manifest, files changed since are not trusted to match it.
+        self._previous_ns = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: dict[str, Future] = {}
+        self._slots = threading.BoundedSemaphore(max(1, workers) * PENDING_WRITES_PER_WORKER)
+        self._made_dirs: set[Path] = set()
+
+    def __enter__(self) -> 'OutputWriter':
+        if self.staging_dir.exists():
+            shutil.rmtree(self.staging_dir)
+        self.staging_dir.mkdir(parents=True)
+        self._made_dirs = {self.staging_dir}
+        if self.digests:
+            self._previous = load_output_manifest(self.public_dir)
+            if self._previous:
+                self._previous_ns = (self.public_dir / OUTPUT_MANIFEST).stat().st_mtime_ns
+        self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def _staged_path(self, key: str) -> Path:
+        to_path = self.staging_dir / key
+        if to_path.parent not in self._made_dirs:
+            to_path.parent.mkdir(parents=True, exist_ok=True)
+            self._made_dirs.add(to_path.parent)
+        return to_path
+
+    def _replace(self, key: str) -> None:
+        # A later file for the same key replaces the earlier one.
+        previous = self._pending.pop(key, None)
+        if previous is not None:
+            previous.result()
+
+    def _submit(self, key: str, fn, *args) -> Future:
+        self._replace(key)
+        future = self._executor.submit(fn, *args)
+        self._pending[key] = future
+        return future
+
+    def write(self, key: str, data: str | bytes) -> None:
+        """Queue data to be written at the posix relative path key."""
+
+        if isinstance(data, str):
+            data = data.encode()
+        self._slots.acquire()
+        try:
+            future = self._submit(key, self._write_bytes, key, self._staged_path(key), data)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def write_stream(self, key: str, write) -> None:
+        """Write the file at key by calling write(sink) in this thread, sink taking str.
+
+        The file is hashed while it is written, so it is never held whole.
+        """
+
+        to_path = self._staged_path(key)
+        self._replace(key)
+        future = Future()
+        future.set_result(self._write_stream(key, to_path, write))
+        self._pending[key] = future
+
+    def copy(self, key: str, from_path, compare: str = 'mtime', link: bool = False) -> None:
+        """Queue the file at from_path to be placed at the posix relative path key, hardlinked with link."""
+        self._submit(key, self._copy_file, key, Path(from_path), self._staged_path(key), compare, link)
+
+    def copy_tree(self, source_path, compare: str = 'mtime', link: bool = False) -> None:
+        """Queue every file under source_path at its relative path."""
+
+        source_path = Path(source_path)
+        if not source_path.exists():
+            raise FileNotFoundError(f"Source path does not exist: {source_path}")
+        for key in list_files(source_path):
+            self.copy(key, source_path / key, compare, link)
+
+    def _recorded(self, key: str, digest: str, size: int) -> bool:
+        """Record the digest of key, returning True when the previous build wrote the same."""
+
+        entry = {'sha256': digest, 'size': size}
+        self.files[key] = entry
+        if self._previous.get(key) != entry:
+            return False
+        current = self.public_dir / key
+        try:
+            stat = current.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        if stat.st_size != size:
+            return False
+        if stat.st_ctime_ns < self._previous_ns:
+            return True
+        # Changed since the manifest was written, its digest says nothing about these bytes.
+        return file_digest(current) == digest
+
+    def _write_bytes(self, key: str, to_path: Path, data: bytes) -> bool:
+        current = self.public_dir / key
+        if self.digests:
+            unchanged = self._recorded(key, hashlib.sha256(data).hexdigest(), len(data))
+        else:
+            unchanged = same_bytes(current, data)
+
+        if unchanged:
+            clone_file(current, to_path, link=True)
+            return False
+        to_path.unlink(missing_ok=True)
+        to_path.write_bytes(data)
+        return True
+
+    def _write_stream(self, key: str, to_path: Path, write) -> bool:
+        to_path.unlink(missing_ok=True)
+        try:
+            with to_path.open('wb') as f:
+                sink = HashingSink(f)
+                write(sink)
+        except BaseException:
+            to_path.unlink(missing_ok=True)
+            raise
+
+        current = self.public_dir / key
+        digest = sink.hash.hexdigest()
+        if self.digests:
+            unchanged = self._recorded(key, digest, sink.size)
+        else:
+            try:
+                unchanged = current.stat().st_size == sink.size and file_digest(current) == digest
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                unchanged = False
+
+        if unchanged:
+            clone_file(current, to_path, link=True)
+            return False
+        return True
+
+    def _copy_file(self, key: str, from_path: Path, to_path: Path, compare: str, link: bool) -> bool:
+        current = self.public_dir / key
+        if self.digests:
+            unchanged = self._recorded(key, file_digest(from_path), from_path.stat().st_size)
+        else:
+            unchanged = is_current(from_path, current, compare)
+
+        if unchanged:
+            clone_file(current, to_path, link=True)
+            return False
+        clone_file(from_path, to_path, link)
+        return True
+
+    def commit(self) -> WriteSummary:
+        """Wait for the queued writes and swap the staging dir into place."""
+
+        try:
+            for key, future in self._pending.items():
+                (self.summary.written if future.result() else self.summary.unchanged).append(key)
+        except BaseException:
+            self.abort()
+            raise
+        self._executor.shutdown()
+
+        if self.digests:
+            self.files.pop(OUTPUT_MANIFEST, None)
+            manifest = {
+                **self.manifest_fields,
+                'version': OUTPUT_MANIFEST_VERSION,
+                'files': dict(sorted(self.files.items())),
+            }
+            manifest_path = self.staging_dir / OUTPUT_MANIFEST
+            manifest_path.unlink(missing_ok=True)
+            manifest_path.write_text(json.dumps(manifest, indent=2))
+
+        if not self.public_dir.exists():
+            self.staging_dir.rename(self.public_dir)
+        elif exchange_paths(self.staging_dir, self.public_dir):
+            shutil.rmtree(self.staging_dir)
+        else:
+            backup_dir = self.public_dir.with_name(self.public_dir.name + '.old')
+            if backup_dir.exists():
+                shutil.rmtree(backup_dir)
+            self.public_dir.rename(backup_dir)
+            self.staging_dir.rename(self.public_dir)
+            shutil.rmtree(backup_dir)
+
+        if self.digests:
+            # Unlinking the old tree touched the ctime of the files kept from it,
+            # the manifest has to be newer than every file it vouches for.
+            os.utime(self.public_dir / OUTPUT_MANIFEST)
+
+        logger.info(
+            f'Output: {len(self.summary.written)} written, '
+            f'{len(self.summary.unchanged)} unchanged.'
+        )
+        return self.summary
+
+    def abort(self) -> None:
+        """Drop the queued writes and the staging dir, leaving the public dir untouched."""
+
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
@@ -1,25 +1,102 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 import logging
+import math
+import os
 from pathlib import Path
 import re
+import time
+from typing import NamedTuple
 
-from utilities.block_utilities import markdown_to_html_node
+from utilities.block_utilities import MarkdownStream, markdown_to_blocks, markdown_to_html
+from utilities.graph_utilities import PageReferences
+from utilities.manifest_utilities import file_digest, remove_output, template_digest, update_output_manifest
+from utilities.profile_utilities import BuildProfiler, get_profiler, profiling, stage
+from utilities.profile_utilities import page as profile_page
+from utilities.reader_utilities import open_mapped
+from utilities.shard_utilities import shard_jobs
+from utilities.template_utilities import CompiledTemplate, load_template
 
-def extract_title_markdown(text: str):
-    """Extract title from the first header."""
+# A title is the text of the first "# " heading line with any, read as the
+# same ascii whitespace from text, bytes or line by line.
+TITLE_PATTERN = re.compile(r'^#[ \t]+(\S(?:.*\S)?)', re.MULTILINE | re.ASCII)
+TITLE_PATTERN_BYTES = re.compile(TITLE_PATTERN.pattern.encode(), TITLE_PATTERN.flags)
 
-    match = re.search(r'^#\s+(.+)$', text, re.MULTILINE)
+
+def extract_title_markdown(text: str | bytes):
+    """Extract title from the first header, text may also be bytes or a mapped file."""
+
+    if isinstance(text, str):
+        match = TITLE_PATTERN.search(text)
+    else:
+        match = TITLE_PATTERN_BYTES.search(text)
 
     if match:
-        if not re.match(r'^#+', match.group(0)[1:]):
-            return match.group(1).strip()
+        title = match.group(1)
+        return title if isinstance(title, str) else title.decode()
+    raise ValueError('Missing or incorrect title')
+
+
+def extract_title_lines(lines) -> str:
+    """Extract title from the first header of markdown lines, reading no further."""
+
+    for line in lines:
+        match = TITLE_PATTERN.match(line)
+        if match:
+            return match.group(1)
     raise ValueError('Missing or incorrect title')
 
 
 logger = logging.getLogger(__name__)
 
 
-def generate_page(from_path, template_path, dest_path, base_path = None) -> None:
-    """Generate page converting from md to html."""
+def is_streamed(from_path, mmap_threshold = None, stream_threshold = None) -> bool:
+    """Return True when page_content converts from_path block by block instead of reading it whole."""
+
+    size = Path(from_path).stat().st_size
+    return any(threshold is not None and size >= threshold for threshold in (mmap_threshold, stream_threshold))
+
+
+def render_markdown(markdown: str, cache = None, on_block = None) -> str:
+    """Return the body html of markdown, rendered without a node tree or from the cache.
+
+    on_block, when given, is called with every block of markdown.
+    """
+
+    if cache is None:
+        return markdown_to_html(markdown, on_block)
+
+    with stage('cache'):
+        content = cache.get(markdown)
+    if content is None:
+        content = markdown_to_html(markdown, on_block)
+        with stage('cache'):
+            cache.put(markdown, content)
+    elif on_block is not None:
+        # A cached body is never split by a render, only for its blocks.
+        with stage('references'):
+            for block in markdown_to_blocks(markdown):
+                on_block(block)
+    return content
+
+
+def generate_page(
+    from_path,
+    template_path,
+    dest_path,
+    base_path = None,
+    cache = None,
+    mmap_threshold = None,
+    stream_threshold = None,
+    references = None
+    ) -> None:
+    """Generate page converting from md to html.
+
+    Sources of at least mmap_threshold bytes are read through mmap, None never
+    maps. Sources of at least stream_threshold bytes are converted and written
+    block by block, None never streams. A PageReferences given as references
+    collects the references of the page while it renders.
+    """
     
     msg = f'Generating page from {from_path} to {dest_path} using {template_path}.'
     logger.info(msg)
@@ -27,38 +104,664 @@ def generate_page(from_path, template_path, dest_path, base_path = None) -> None
     if not from_path or not template_path or not dest_path:
         raise ValueError('All paths must be valid.')
 
-    with Path(from_path).open('r') as f:
+    with profile_page(from_path):
+        with stage('template'):
+            template = load_template(template_path, base_path)
+
+        with stage('write'):
+            dest_path = Path(dest_path).resolve()
+            
+            if dest_path.is_dir():
+                raise IsADirectoryError(f"Destination path '{dest_path}' is a directory, not a file.")
+
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+        write_page(from_path, template, dest_path, cache, mmap_threshold, stream_threshold, references=references)
+
+    logger.info(f"Page generated at {dest_path}.")
+
+
+def page_content(from_path, cache = None, mmap_threshold = None, title = None, references = None, stream_threshold = None):
+    """Return the title and body of from_path.
+
+    The body is an html string, or a MarkdownStream for sources of at least
+    mmap_threshold or stream_threshold bytes. A title already known, e.g. from the content
+    index, is not looked up again. A PageReferences given as references
+    collects the blocks of the page, a stream's as it is written.
+    """
+
+    size = Path(from_path).stat().st_size
+    mapped = mmap_threshold is not None and size >= mmap_threshold
+    on_block = references.add if references is not None else None
+
+    if mapped:
+        # The title is searched in the mapped bytes, only the blocks get decoded.
+        if title is None:
+            with stage('extract_title'), open_mapped(from_path) as f:
+                title = extract_title_markdown(f)
+        return title, MarkdownStream(from_path, True, on_block)
+
+    if stream_threshold is not None and size >= stream_threshold:
+        # Blocks are read, converted and written one at a time, bypassing the cache.
+        if title is None:
+            with stage('extract_title'), Path(from_path).open('r') as f:
+                title = extract_title_lines(f)
+        return title, MarkdownStream(from_path, False, on_block)
+
+    with stage('read'), Path(from_path).open('r') as f:
         markdown = f.read()
+    if title is None:
+        with stage('extract_title'):
+            title = extract_title_markdown(markdown)
+    return title, render_markdown(markdown, cache, on_block)
 
-    with Path(template_path).open('r') as t:
-        template = t.read()
 
-    title = extract_title_markdown(markdown)
-    content = markdown_to_html_node(markdown).to_html()
+def fill_template(template, title: str, content) -> str:
+    """Return the compiled template filled with title and a body from page_content."""
 
-    html = template.replace('{{ Title }}', title).replace('{{ Content }}', content)
-    if base_path:
-        html = html.replace('href="/', f"href={base_path}").replace('src="/', f'src="{base_path}')
+    if not isinstance(content, str):
+        with stage('to_html'):
+            content = content.to_html()
+    with stage('template'):
+        return template.render(Title=title, Content=content)
 
-    dest_path = Path(dest_path).resolve()
-    
-    if dest_path.is_dir():
-        raise IsADirectoryError(f"Destination path '{dest_path}' is a directory, not a file.")
 
-    dest_path.parent.mkdir(parents=True, exist_ok=True)
-    dest_path.write_text(html)
+def render_page(
+    from_path,
+    template,
+    cache = None,
+    mmap_threshold = None,
+    title = None,
+    references = None,
+    stream_threshold = None
+    ) -> tuple[str, str]:
+    """Return the title and full html of from_path rendered into the compiled template."""
 
-    logger.info(f"Page generated at {dest_path}.")
+    title, content = page_content(from_path, cache, mmap_threshold, title, references, stream_threshold)
+    return title, fill_template(template, title, content)
+
+
+def render_document(markdown: str, template, cache = None, title = None, references = None) -> tuple[str, str]:
+    """Return the title and full html of markdown text rendered into the compiled template."""
+
+    if title is None:
+        with stage('extract_title'):
+            title = extract_title_markdown(markdown)
+    on_block = references.add if references is not None else None
+    return title, fill_template(template, title, render_markdown(markdown, cache, on_block))
+
+
+def write_page(
+    from_path,
+    template,
+    dest_path,
+    cache = None,
+    mmap_threshold = None,
+    stream_threshold = None,
+    title = None,
+    references = None
+    ) -> str:
+    """Render from_path into the compiled template at dest_path, whose parent must exist.
+
+    Returns the page title.
+    """
+
+    # Profiled builds serialize eagerly so each stage is timed on its own.
+    title, content = page_content(from_path, cache, mmap_threshold, title, references, stream_threshold)
+    profiled = get_profiler() is not None and not isinstance(content, MarkdownStream)
+    if profiled:
+        if not isinstance(content, str):
+            with stage('to_html'):
+                content = content.to_html()
+        with stage('template'):
+            html = template.render(Title=title, Content=content)
+
+    with stage('write'):
+        # Stream into a sibling file so a failing render never leaves a partial page.
+        dest_path = Path(dest_path)
+        tmp_path = dest_path.with_name(dest_path.name + '.tmp')
+        try:
+            with tmp_path.open('w') as f:
+                if profiled:
+                    f.write(html)
+                else:
+                    template.write(f, Title=title, Content=content)
+            tmp_path.replace(dest_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    return title
+
+
+class PageResult(NamedTuple):
+    """Outcome of one page of render_site."""
+    source: str
+    dest: str
+    title: str | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Whether the page was written."""
+        return self.error is None
+
+
+def render_site(
+    pages,
+    template,
+    out_dir,
+    content_dir = None,
+    base_path = None,
+    cache = None,
+    mmap_threshold = None,
+    stream_threshold = None
+    ) -> list[PageResult]:
+    """Render many markdown sources with one template into out_dir.
 
-def generate_pages_recursive(content_dir, template_path, public_dir, base_path = None):
-    """Generate pages recursively."""
+    Each source is written at its path relative to content_dir, which defaults
+    to the common directory of the sources, with an .html suffix. The template
+    may be a path or a CompiledTemplate, it is compiled once for the batch and
+    each output directory is created once. Failures are returned in the
+    results, in the order of pages, instead of raised.
+    """
+
+    sources = [Path(page) for page in pages]
+    if not sources:
+        return []
+    if content_dir is None:
+        content_dir = os.path.commonpath([source.resolve().parent for source in sources])
+    content_path = Path(content_dir).resolve()
+    out_path = Path(out_dir).resolve()
+
+    if not isinstance(template, CompiledTemplate):
+        template = load_template(template, base_path)
+
+    results = []
+    made_dirs = set()
+    written = []
+    for source in sources:
+        dest_path = ''
+        start = time.perf_counter()
+        try:
+            # A source outside content_dir fails on its own instead of the batch.
+            dest_path = out_path / source.resolve().relative_to(content_path).with_suffix('.html')
+            with profile_page(source):
+                if dest_path.parent not in made_dirs:
+                    with stage('write'):
+                        dest_path.parent.mkdir(parents=True, exist_ok=True)
+                    made_dirs.add(dest_path.parent)
+                written.append(dest_path.relative_to(out_path).as_posix())
+                title = write_page(source, template, dest_path, cache, mmap_threshold, stream_threshold)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            results.append(PageResult(str(source), str(dest_path), error=error, seconds=time.perf_counter() - start))
+            continue
+        results.append(PageResult(str(source), str(dest_path), title, seconds=time.perf_counter() - start))
+
+    update_output_manifest(out_path, written)
+    failed = sum(not result.ok for result in results)
+    logger.info('Rendered %d page(s) into %s, %d failed.', len(results) - failed, out_path, failed)
+    return results
+
+
+def generate_pages_recursive(
+    content_dir,
+    template_path,
+    public_dir,
+    base_path = None,
+    workers = 1,
+    cache = None,
+    mmap_threshold = None,
+    shard = None,
+    stream_threshold = None
+    ):
+    """Generate pages recursively, only the pages of shard when given."""
 
     content_path = Path(content_dir)
     public_path = Path(public_dir)
+    if shard is not None:
+        selected = {key for _, key in shard_jobs(list_pages(content_dir), shard)}
     
+    jobs = []
+    keys = []
     for item in content_path.rglob("*.md"):
         rel_path = item.relative_to(content_path)
+        if shard is not None and rel_path.with_suffix(".html").as_posix() not in selected:
+            continue
         
         dest_path = public_path / rel_path.with_suffix(".html")
         
-        generate_page(str(item), template_path, str(dest_path))
\ No newline at end of file
+        jobs.append((str(item), str(dest_path)))
+        keys.append(rel_path.with_suffix(".html").as_posix())
+
+    try:
+        render_pages(
+            jobs, template_path, workers, cache=cache, mmap_threshold=mmap_threshold, stream_threshold=stream_threshold,
+            base_path=base_path
+        )
+    finally:
+        update_output_manifest(public_path, keys)
+
+
+class PageGenerationError(Exception):
+    """Raised when one or more pages of a parallel build fail."""
+
+    def __init__(self, failures: list[tuple[str, str]]):
+        """PageGenerationError constructor."""
+        self.failures = failures
+        details = '\n'.join(f'  {from_path}: {error}' for from_path, error in failures)
+        super().__init__(f'{len(failures)} page(s) failed to generate:\n{details}')
+
+
+def generate_page_batch(
+    batch: list[tuple[str, str]],
+    template_path,
+    cache = None,
+    profile = False,
+    mmap_threshold = None,
+    stream_threshold = None,
+    base_path = None,
+    outputs = None
+    ):
+    """Generate a batch of pages, returning the failures instead of raising.
+
+    With profile set the stage timings of the batch are returned as well,
+    as (failures, records), so a worker process can hand them back. With
+    outputs, a dict of dest_path to output path, the (assets, links) of
+    those pages are collected while they render and returned keyed by output
+    path, as (failures, references) or (failures, references, records).
+    """
+
+    failures = []
+    references = {}
+    profiler = BuildProfiler()
+    with profiling(profiler) if profile else nullcontext():
+        for from_path, dest_path in batch:
+            try:
+                output = outputs.get(dest_path) if outputs is not None else None
+                collector = PageReferences(output) if output is not None else None
+                generate_page(
+                    from_path, template_path, dest_path, base_path, cache,
+                    mmap_threshold=mmap_threshold, stream_threshold=stream_threshold, references=collector
+                )
+                if collector is not None:
+                    references[output] = collector.result()
+            except Exception as e:
+                failures.append((from_path, f'{type(e).__name__}: {e}'))
+
+    if outputs is not None and profile:
+        return failures, references, profiler.records
+    if outputs is not None:
+        return failures, references
+    if profile:
+        return failures, profiler.records
+    return failures
+
+
+def render_pages(
+    jobs: list[tuple[str, str]],
+    template_path,
+    workers = 1,
+    batch_size = None,
+    cache = None,
+    mmap_threshold = None,
+    stream_threshold = None,
+    base_path = None,
+    outputs = None
+    ) -> dict | None:
+    """Generate (from_path, dest_path) jobs, across a process pool when workers > 1.
+
+    With outputs, a dict of dest_path to output path, returns the (assets,
+    links) of those pages, collected while they render, keyed by output path.
+    """
+
+    references = {}
+    if workers <= 1 or len(jobs) <= 1:
+        for from_path, dest_path in jobs:
+            output = outputs.get(dest_path) if outputs is not None else None
+            collector = PageReferences(output) if output is not None else None
+            generate_page(
+                from_path, template_path, dest_path, base_path, cache,
+                mmap_threshold=mmap_threshold, stream_threshold=stream_threshold, references=collector
+            )
+            if collector is not None:
+                references[output] = collector.result()
+        return references if outputs is not None else None
+
+    if batch_size is None:
+        # A few batches per worker keeps the pool busy when page sizes vary.
+        batch_size = max(1, math.ceil(len(jobs) / (workers * 4)))
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+    profiler = get_profiler()
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                generate_page_batch,
+                batch,
+                template_path,
+                cache,
+                profiler is not None,
+                mmap_threshold,
+                stream_threshold,
+                base_path,
+                {dest_path: outputs[dest_path] for _, dest_path in batch if dest_path in outputs} if outputs else {},
+            ): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failures.extend(
+                    (from_path, f'{type(e).__name__}: {e}') for from_path, _ in futures[future]
+                )
+                continue
+
+            if profiler is not None:
+                result, batch_references, records = result
+                profiler.merge(records)
+            else:
+                result, batch_references = result
+            failures.extend(result)
+            references.update(batch_references)
+
+    if failures:
+        raise PageGenerationError(sorted(failures))
+    return references if outputs is not None else None
+
+
+class RenderedPage(NamedTuple):
+    """Html of a page rendered in a worker, with its (assets, links) and stage timings when collected."""
+    key: str
+    html: str
+    references: tuple[list[str], list[str]] | None = None
+    records: dict[str, dict[str, float]] | None = None
+
+
+def render_page_batch(
+    batch: list[tuple[str, str]],
+    template_path,
+    cache = None,
+    profile = False,
+    mmap_threshold = None,
+    titles = None,
+    references = False,
+    stream_threshold = None,
+    base_path = None
+    ):
+    """Render a batch of (from_path, key) jobs to RenderedPages, returning (rendered, failures).
+
+    titles maps from_path to a known title. With references set the
+    references of each page are collected while it renders. With profile
+    set the stage timings are returned as well, as (rendered, failures, records).
+    """
+
+    titles = titles or {}
+    template = load_template(template_path, base_path)
+    rendered = []
+    failures = []
+    profiler = BuildProfiler()
+    with profiling(profiler) if profile else nullcontext():
+        for from_path, key in batch:
+            try:
+                with profile_page(from_path):
+                    collector = PageReferences(key) if references else None
+                    html = render_page(
+                        from_path, template, cache, mmap_threshold, titles.get(from_path), collector, stream_threshold
+                    )[1]
+                    rendered.append(RenderedPage(key, html, collector.result() if collector is not None else None))
+            except Exception as e:
+                failures.append((from_path, f'{type(e).__name__}: {e}'))
+
+    if profile:
+        return rendered, failures, profiler.records
+    return rendered, failures
+
+
+def stage_page(
+    from_path,
+    key: str,
+    template,
+    writer,
+    cache = None,
+    mmap_threshold = None,
+    title = None,
+    references = None,
+    stream_threshold = None
+    ) -> None:
+    """Render from_path into the compiled template at key of an OutputWriter.
+
+    Streamed sources are written block by block through writer.write_stream,
+    never held whole. A PageReferences given as references collects the
+    references of the page.
+    """
+
+    title, content = page_content(from_path, cache, mmap_threshold, title, references, stream_threshold)
+    if isinstance(content, str):
+        writer.write(key, fill_template(template, title, content))
+        return
+    with stage('write'):
+        writer.write_stream(key, lambda sink: template.write(sink, Title=title, Content=content))
+
+
+def _stage_each(
+    jobs,
+    template_path,
+    writer,
+    cache,
+    mmap_threshold,
+    titles,
+    references,
+    stream_threshold,
+    base_path
+    ) -> list[tuple[str, str]]:
+    """Stage (from_path, key) jobs in this process, returning the failures."""
+
+    template = load_template(template_path, base_path)
+    failures = []
+    for from_path, key in jobs:
+        try:
+            with profile_page(from_path):
+                collector = PageReferences(key) if references is not None else None
+                stage_page(
+                    from_path, key, template, writer, cache, mmap_threshold, titles.get(from_path), collector, stream_threshold
+                )
+                if collector is not None:
+                    references[key] = collector.result()
+        except Exception as e:
+            failures.append((from_path, f'{type(e).__name__}: {e}'))
+    return failures
+
+
+def list_pages(content_dir) -> list[tuple[str, str]]:
+    """Return the (source path, output key) of every page under content_dir."""
+
+    content_path = Path(content_dir)
+    return [
+        (str(item), item.relative_to(content_path).with_suffix('.html').as_posix())
+        for item in content_path.rglob("*.md")
+    ]
+
+
+def stage_pages(
+    content_dir,
+    template_path,
+    writer,
+    workers = 1,
+    cache = None,
+    mmap_threshold = None,
+    index = None,
+    shard = None,
+    references = None,
+    stream_threshold = None,
+    base_path = None
+    ) -> None:
+    """Render every page under content_dir into an OutputWriter, across a process pool when workers > 1.
+
+    With a refreshed ContentIndex the pages and their titles come from it.
+    With a Shard only the pages of that shard are rendered. A dict given as
+    references is filled with the (assets, links) of every page rendered,
+    by output key, collected while it renders. Raises PageGenerationError
+    once every page was tried if any failed.
+    """
+
+    jobs = shard_jobs(index.jobs() if index is not None else list_pages(content_dir), shard)
+    titles = index.titles() if index is not None else {}
+    profiler = get_profiler()
+    failures = []
+    if workers <= 1 or len(jobs) <= 1:
+        # Each page is handed to the writer threads while the next one renders.
+        failures.extend(
+            _stage_each(
+                jobs, template_path, writer, cache, mmap_threshold, titles, references, stream_threshold, base_path
+            )
+        )
+    else:
+        # A worker would hand back the whole html of a streamed page, those are written from here.
+        streamed = []
+        pooled = []
+        for job in jobs:
+            try:
+                (streamed if is_streamed(job[0], mmap_threshold, stream_threshold) else pooled).append(job)
+            except OSError:
+                pooled.append(job)
+        batch_size = max(1, math.ceil(len(pooled) / (workers * 4)))
+        batches = [pooled[i:i + batch_size] for i in range(0, len(pooled), batch_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    render_page_batch,
+                    batch,
+                    template_path,
+                    cache,
+                    profiler is not None,
+                    mmap_threshold,
+                    {from_path: titles[from_path] for from_path, _ in batch if from_path in titles},
+                    references is not None,
+                    stream_threshold,
+                    base_path,
+                ): batch
+                for batch in batches
+            }
+            if streamed:
+                failures.extend(
+                    _stage_each(
+                        streamed, template_path, writer, cache, mmap_threshold, titles, references, stream_threshold,
+                        base_path
+                    )
+                )
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures.extend(
+                        (from_path, f'{type(e).__name__}: {e}') for from_path, _ in futures[future]
+                    )
+                    continue
+
+                if profiler is not None:
+                    *result, records = result
+                    profiler.merge(records)
+                rendered, batch_failures = result
+                failures.extend(batch_failures)
+                for page in rendered:
+                    writer.write(page.key, page.html)
+                    if references is not None:
+                        references[page.key] = page.references
+
+    logger.info(f'Rendered {len(jobs) - len(failures)} page(s).')
+    if failures:
+        raise PageGenerationError(sorted(failures))
+
+
+class BuildSummary(NamedTuple):
+    """Outcome of an incremental build, with the (assets, links) of the rendered pages keyed by output path."""
+    rendered: list[str]
+    unchanged: list[str]
+    removed: list[str]
+    references: dict
+
+
+def generate_pages_incremental(
+    content_dir,
+    template_path,
+    public_dir,
+    manifest,
+    workers = 1,
+    cache = None,
+    mmap_threshold = None,
+    index = None,
+    stream_threshold = None,
+    base_path = None
+    ) -> BuildSummary:
+    """Generate only the pages whose inputs changed since the manifest was recorded.
+
+    With a refreshed ContentIndex the pages are found from it instead of a walk.
+    A base_path other than the recorded one renders every page, like a
+    template change.
+    """
+
+    content_path = Path(content_dir)
+    public_path = Path(public_dir)
+
+    current_template = template_digest(template_path, base_path)
+    full_rebuild = manifest.template_digest != current_template
+    if full_rebuild and manifest.pages:
+        logger.info('Template changed, rendering every page.')
+
+    previous_pages = manifest.pages
+    pages = {}
+    jobs = []
+    outputs = {}
+    written = []
+    summary = BuildSummary([], [], [], {})
+
+    sources = (Path(from_path) for from_path, _ in index.jobs()) if index is not None else content_path.rglob("*.md")
+    for item in sources:
+        rel_path = item.relative_to(content_path)
+        key = rel_path.as_posix()
+
+        dest_rel = rel_path.with_suffix(".html").as_posix()
+        dest_path = public_path / dest_rel
+        digest = file_digest(item)
+
+        pages[key] = {'digest': digest, 'dest': dest_rel}
+
+        entry = previous_pages.get(key)
+        if (
+            not full_rebuild and
+            entry == pages[key] and
+            dest_path.exists()
+        ):
+            summary.unchanged.append(key)
+            continue
+
+        jobs.append((str(item), str(dest_path)))
+        outputs[str(dest_path)] = dest_rel
+        written.append(dest_rel)
+        summary.rendered.append(key)
+
+    try:
+        summary.references.update(render_pages(
+            jobs, template_path, workers, cache=cache, mmap_threshold=mmap_threshold, stream_threshold=stream_threshold,
+            base_path=base_path, outputs=outputs
+        ))
+
+        for key, entry in previous_pages.items():
+            if key not in pages:
+                remove_output(public_path / entry['dest'], public_path)
+                written.append(entry['dest'])
+                summary.removed.append(key)
+    finally:
+        update_output_manifest(public_path, written)
+
+    manifest.template_digest = current_template
+    manifest.pages = pages
+
+    logger.info(
+        f'Incremental build: {len(summary.rendered)} rendered, '
+        f'{len(summary.unchanged)} unchanged, {len(summary.removed)} removed.'
+    )
+    return summary
@@ -0,0 +1,362 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+import logging
+from pathlib import Path
+import time
+from typing import NamedTuple
+
+from utilities.manifest_utilities import update_output_manifest
+from utilities.graph_utilities import PageReferences
+from utilities.page_utilities import (
+    PageGenerationError,
+    RenderedPage,
+    is_streamed,
+    render_document,
+    render_page,
+    stage_page,
+    write_page
+)
+from utilities.profile_utilities import BuildProfiler, get_profiler, profiling
+from utilities.profile_utilities import page as profile_page
+from utilities.template_utilities import load_template
+
+
+DEFAULT_READERS = 4
+DEFAULT_WRITERS = 4
+DEFAULT_QUEUE_SIZE = 16
+
+# Pipeline stages in order, used to order the report.
+PIPELINE_STAGES = ('read', 'render', 'write')
+
+# Tells a stage task there is no more work.
+_DONE = None
+
+logger = logging.getLogger(__name__)
+
+
+class StageReport(NamedTuple):
+    """Seconds the tasks of a stage spent working and waiting, summed over its tasks."""
+    pages: int
+    busy: float
+    wait_input: float
+    wait_output: float
+
+
+class PipelineReport(NamedTuple):
+    """Outcome of a pipelined build."""
+    pages: int
+    seconds: float
+    stages: dict[str, StageReport]
+
+    def format_table(self) -> str:
+        """Return the report as a plain text table, times in ms."""
+
+        lines = [f'Pipeline built {self.pages} page(s) in {self.seconds * 1000:.2f} ms']
+        lines.append(f'{"stage":<10}{"pages":>8}{"busy":>12}{"wait in":>12}{"wait out":>12}')
+        for name, report in self.stages.items():
+            lines.append(
+                f'{name:<10}{report.pages:>8}{report.busy * 1000:>12.2f}'
+                f'{report.wait_input * 1000:>12.2f}{report.wait_output * 1000:>12.2f}'
+            )
+        return '\n'.join(lines)
+
+
+class _StageTimer():
+    """Mutable counters behind a StageReport."""
+
+    def __init__(self):
+        """_StageTimer constructor."""
+        self.pages = 0
+        self.busy = 0.0
+        self.wait_input = 0.0
+        self.wait_output = 0.0
+
+    def report(self) -> StageReport:
+        """Return the counters as a StageReport."""
+        return StageReport(self.pages, self.busy, self.wait_input, self.wait_output)
+
+
+def read_source(from_path, mmap_threshold = None, stream_threshold = None) -> str | None:
+    """Return the markdown of from_path, None for sources rendered straight from the file."""
+
+    if is_streamed(from_path, mmap_threshold, stream_threshold):
+        return None
+    with Path(from_path).open('r') as f:
+        return f.read()
+
+
+def render_source(
+    from_path,
+    key: str,
+    markdown: str | None,
+    template_path,
+    base_path = None,
+    cache = None,
+    mmap_threshold = None,
+    title = None,
+    references = False,
+    profile = False,
+    stream_threshold = None
+    ) -> RenderedPage:
+    """Return the RenderedPage of key, from its markdown or, when None, from its file.
+
+    With references set the references of the page are collected while it
+    renders. With profile set its stage timings are returned with it, to be
+    merged by the caller.
+    """
+
+    profiler = BuildProfiler()
+    collector = PageReferences(key) if references else None
+    with profiling(profiler) if profile else nullcontext(), profile_page(from_path):
+        template = load_template(template_path, base_path)
+        if markdown is None:
+            html = render_page(from_path, template, cache, mmap_threshold, title, collector, stream_threshold)[1]
+        else:
+            html = render_document(markdown, template, cache, title, collector)[1]
+    return RenderedPage(
+        key,
+        html,
+        collector.result() if collector is not None else None,
+        profiler.records if profile else None,
+    )
+
+
+def stream_source(
+    from_path,
+    key: str,
+    template_path,
+    public_dir = None,
+    writer = None,
+    base_path = None,
+    cache = None,
+    mmap_threshold = None,
+    title = None,
+    references = False,
+    profile = False,
+    stream_threshold = None
+    ) -> RenderedPage:
+    """Write the page of a source rendered straight from its file at key, block by block.
+
+    The page is written into writer when given, else under public_dir, and
+    returned without its html. references and profile are as for
+    render_source.
+    """
+
+    profiler = BuildProfiler()
+    collector = PageReferences(key) if references else None
+    with profiling(profiler) if profile else nullcontext(), profile_page(from_path):
+        template = load_template(template_path, base_path)
+        if writer is not None:
+            stage_page(from_path, key, template, writer, cache, mmap_threshold, title, collector, stream_threshold)
+        else:
+            dest_path = Path(public_dir) / key
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            write_page(from_path, template, dest_path, cache, mmap_threshold, stream_threshold, title, collector)
+    return RenderedPage(
+        key,
+        None,
+        collector.result() if collector is not None else None,
+        profiler.records if profile else None,
+    )
+
+
+def write_output(dest_path: Path, html: str) -> None:
+    """Write html at dest_path through a sibling file, so a failure never leaves a partial page."""
+
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest_path.with_name(dest_path.name + '.tmp')
+    try:
+        tmp_path.write_text(html)
+        tmp_path.replace(dest_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+async def build_pages_async(
+    jobs: list[tuple[str, str]],
+    template_path,
+    public_dir = None,
+    writer = None,
+    workers = 1,
+    readers = DEFAULT_READERS,
+    writers = DEFAULT_WRITERS,
+    queue_size = DEFAULT_QUEUE_SIZE,
+    base_path = None,
+    cache = None,
+    mmap_threshold = None,
+    titles = None,
+    references = None,
+    stream_threshold = None
+    ) -> PipelineReport:
+    """Build (from_path, key) jobs with reading, rendering and writing overlapped.
+
+    Reader tasks read sources in threads, render tasks render them in an
+    executor, processes when workers > 1, and writer tasks write them, either
+    under public_dir or into an OutputWriter. Sources of at least
+    mmap_threshold or stream_threshold bytes are never read whole, they are
+    rendered and written block by block from a thread of this process, so
+    their html is never held nor sent between processes. Bounded queues between the
+    stages hold back the readers when rendering falls behind, and rendering
+    when writing does. titles maps from_path to a known title. A dict given
+    as references is filled with the (assets, links) of every page written,
+    by output key. When profiling, the renders and the reads and writes of
+    each page are timed onto the active profiler. Raises PageGenerationError
+    once every page was tried if any failed.
+    """
+
+    if writer is None and public_dir is None:
+        raise ValueError('Either a public dir or a writer is needed.')
+
+    start = time.perf_counter()
+    timers = {name: _StageTimer() for name in PIPELINE_STAGES}
+    rendered: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    read: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    failures = []
+    pending = iter(jobs)
+    titles = titles or {}
+    profiler = get_profiler()
+
+    loop = asyncio.get_running_loop()
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        # A single render thread, the profiler is not safe across threads.
+        executor = ThreadPoolExecutor(max_workers=1)
+    # Streamed pages write into the writer, they cannot be sent to a worker process.
+    streamer = ThreadPoolExecutor(max_workers=1) if workers > 1 else executor
+    render_tasks = max(1, workers)
+
+    async def put(queue: asyncio.Queue, item, timer: _StageTimer) -> None:
+        waited = time.perf_counter()
+        await queue.put(item)
+        timer.wait_output += time.perf_counter() - waited
+
+    async def get(queue: asyncio.Queue, timer: _StageTimer):
+        waited = time.perf_counter()
+        item = await queue.get()
+        timer.wait_input += time.perf_counter() - waited
+        return item
+
+    async def read_stage() -> None:
+        timer = timers['read']
+        for from_path, key in pending:
+            began = time.perf_counter()
+            try:
+                markdown = await asyncio.to_thread(read_source, from_path, mmap_threshold, stream_threshold)
+            except Exception as e:
+                failures.append((from_path, f'{type(e).__name__}: {e}'))
+                continue
+            finally:
+                timer.busy += time.perf_counter() - began
+            timer.pages += 1
+            if profiler is not None:
+                profiler.merge({str(from_path): {'read': time.perf_counter() - began}})
+            await put(read, (from_path, key, markdown), timer)
+
+    async def render_stage() -> None:
+        timer = timers['render']
+        while (item := await get(read, timer)) is not _DONE:
+            from_path, key, markdown = item
+            began = time.perf_counter()
+            try:
+                if markdown is None:
+                    page = await loop.run_in_executor(
+                        streamer,
+                        stream_source,
+                        from_path,
+                        key,
+                        template_path,
+                        public_dir,
+                        writer,
+                        base_path,
+                        cache,
+                        mmap_threshold,
+                        titles.get(from_path),
+                        references is not None,
+                        profiler is not None,
+                        stream_threshold,
+                    )
+                else:
+                    page = await loop.run_in_executor(
+                        executor,
+                        render_source,
+                        from_path,
+                        key,
+                        markdown,
+                        template_path,
+                        base_path,
+                        cache,
+                        mmap_threshold,
+                        titles.get(from_path),
+                        references is not None,
+                        profiler is not None,
+                        stream_threshold,
+                    )
+            except Exception as e:
+                failures.append((from_path, f'{type(e).__name__}: {e}'))
+                continue
+            finally:
+                timer.busy += time.perf_counter() - began
+            timer.pages += 1
+            if profiler is not None:
+                profiler.merge(page.records)
+            await put(rendered, (from_path, page), timer)
+
+    async def write_stage() -> None:
+        timer = timers['write']
+        while (item := await get(rendered, timer)) is not _DONE:
+            from_path, page = item
+            began = time.perf_counter()
+            try:
+                if page.html is None:
+                    # Streamed, already written while it rendered.
+                    pass
+                elif writer is not None:
+                    # Blocks while the writer's queue is full, which must not stall the loop.
+                    await asyncio.to_thread(writer.write, page.key, page.html)
+                else:
+                    await asyncio.to_thread(write_output, Path(public_dir) / page.key, page.html)
+            except Exception as e:
+                failures.append((from_path, f'{type(e).__name__}: {e}'))
+                continue
+            finally:
+                timer.busy += time.perf_counter() - began
+            timer.pages += 1
+            if profiler is not None:
+                profiler.merge({str(from_path): {'write': time.perf_counter() - began}})
+            if references is not None:
+                references[page.key] = page.references
+
+    async def run_stage(stage, tasks: int, queue: asyncio.Queue | None) -> None:
+        await asyncio.gather(*(stage() for _ in range(tasks)))
+        if queue is not None:
+            for _ in range(render_tasks if queue is read else writers):
+                await queue.put(_DONE)
+
+    try:
+        await asyncio.gather(
+            run_stage(read_stage, readers, read),
+            run_stage(render_stage, render_tasks, rendered),
+            run_stage(write_stage, writers, None),
+        )
+    finally:
+        executor.shutdown()
+        streamer.shutdown()
+        if writer is None:
+            update_output_manifest(public_dir, [key for _, key in jobs])
+
+    report = PipelineReport(
+        timers['write'].pages,
+        time.perf_counter() - start,
+        {name: timer.report() for name, timer in timers.items()},
+    )
+    logger.info(f'Pipeline built {report.pages} page(s) in {report.seconds:.2f}s.')
+    if failures:
+        raise PageGenerationError(sorted(failures))
+    return report
+
+
+def build_pages_pipelined(jobs: list[tuple[str, str]], template_path, **options) -> PipelineReport:
+    """Run build_pages_async to completion, see it for the options."""
+    return asyncio.run(build_pages_async(jobs, template_path, **options))
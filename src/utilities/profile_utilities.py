@@ -0,0 +1,171 @@
+from contextlib import contextmanager, nullcontext
+import json
+import time
+
+
+# Stages in pipeline order, used to order the report.
+STAGES = (
+    'read',
+    'extract_title',
+    'references',
+    'cache',
+    'markdown_to_blocks',
+    'classify',
+    'inline',
+    'to_html',
+    'template',
+    'write',
+    'static_copy',
+)
+
+BUILD_RECORD = '<build>'
+
+_NULL_STAGE = nullcontext()
+_active_profiler: 'BuildProfiler | None' = None
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of sorted values."""
+
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class BuildProfiler():
+    """Collects per page, per stage timings of a build."""
+
+    def __init__(self):
+        """BuildProfiler constructor."""
+        self.records: dict[str, dict[str, float]] = {}
+        self._current = BUILD_RECORD
+
+    @contextmanager
+    def page(self, name: str):
+        """Attribute the stages timed inside the block to page name."""
+
+        previous = self._current
+        self._current = str(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add('total', time.perf_counter() - start)
+            self._current = previous
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the current page."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - start)
+
+    def _add(self, stage: str, seconds: float) -> None:
+        record = self.records.setdefault(self._current, {})
+        record[stage] = record.get(stage, 0.0) + seconds
+
+    def merge(self, records: dict[str, dict[str, float]]) -> None:
+        """Add records collected by another profiler, e.g. in a worker process."""
+
+        for page, stages in records.items():
+            record = self.records.setdefault(page, {})
+            for stage, seconds in stages.items():
+                record[stage] = record.get(stage, 0.0) + seconds
+
+    def summary(self, slowest: int = 10) -> dict:
+        """Aggregate the records into per stage percentiles and the slowest pages."""
+
+        per_stage: dict[str, list[float]] = {}
+        for stages in self.records.values():
+            for stage, seconds in stages.items():
+                per_stage.setdefault(stage, []).append(seconds)
+
+        order = {stage: i for i, stage in enumerate(STAGES + ('total',))}
+        stages = {}
+        for stage in sorted(per_stage, key=lambda s: order.get(s, len(order))):
+            values = sorted(per_stage[stage])
+            stages[stage] = {
+                'count': len(values),
+                'total': sum(values),
+                'p50': percentile(values, 0.50),
+                'p90': percentile(values, 0.90),
+                'p99': percentile(values, 0.99),
+                'max': values[-1],
+            }
+
+        pages = [
+            (page, stages_['total']) for page, stages_ in self.records.items()
+            if 'total' in stages_
+        ]
+        pages.sort(key=lambda item: item[1], reverse=True)
+
+        return {
+            'pages': len(pages),
+            'stages': stages,
+            'slowest_pages': [
+                {'page': page, 'total': total, 'stages': self.records[page]}
+                for page, total in pages[:slowest]
+            ],
+        }
+
+    def to_json(self, slowest: int = 10) -> str:
+        """Return the summary as json."""
+        return json.dumps(self.summary(slowest), indent=2)
+
+    def format_table(self, slowest: int = 10) -> str:
+        """Return the summary as a plain text table, times in milliseconds."""
+
+        summary = self.summary(slowest)
+        lines = [f'Build profile of {summary["pages"]} page(s), times in ms']
+        lines.append(f'{"stage":<20}{"count":>8}{"total":>12}{"p50":>10}{"p90":>10}{"p99":>10}{"max":>10}')
+        for stage, stats in summary['stages'].items():
+            lines.append(
+                f'{stage:<20}{stats["count"]:>8}{stats["total"] * 1000:>12.2f}'
+                f'{stats["p50"] * 1000:>10.3f}{stats["p90"] * 1000:>10.3f}'
+                f'{stats["p99"] * 1000:>10.3f}{stats["max"] * 1000:>10.3f}'
+            )
+
+        if summary['slowest_pages']:
+            lines.append('')
+            lines.append('Slowest pages')
+            for entry in summary['slowest_pages']:
+                lines.append(f'{entry["total"] * 1000:>12.2f}  {entry["page"]}')
+        return '\n'.join(lines)
+
+
+def get_profiler() -> BuildProfiler | None:
+    """Return the active profiler, if any."""
+    return _active_profiler
+
+
+@contextmanager
+def profiling(profiler: BuildProfiler):
+    """Activate profiler for the stages timed inside the block."""
+
+    global _active_profiler
+    previous = _active_profiler
+    _active_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _active_profiler = previous
+
+
+def stage(name: str):
+    """Time a stage on the active profiler, doing nothing when profiling is off."""
+
+    if _active_profiler is None:
+        return _NULL_STAGE
+    return _active_profiler.stage(name)
+
+
+def page(name: str):
+    """Attribute stages to a page on the active profiler, doing nothing when profiling is off."""
+
+    if _active_profiler is None:
+        return _NULL_STAGE
+    return _active_profiler.page(name)
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+import mmap
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def open_mapped(path):
+    """Map the file at path read only, yielding b'' for an empty file which cannot be mapped."""
+
+    with Path(path).open('rb') as f:
+        if f.seek(0, 2) == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def iter_mapped_lines(mapped) -> Iterator[str]:
+    """Yield the decoded lines of a mapped file one at a time, line endings normalized to '\\n'."""
+
+    if not mapped:
+        return
+    mapped.seek(0)
+    for line in iter(mapped.readline, b''):
+        if line.endswith(b'\r\n'):
+            line = line[:-2] + b'\n'
+        yield line.decode()
@@ -0,0 +1,201 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+from utilities.manifest_utilities import file_digest, template_digest
+from utilities.output_utilities import DEFAULT_WRITE_WORKERS, OUTPUT_MANIFEST, OUTPUT_MANIFEST_VERSION, OutputWriter
+
+
+logger = logging.getLogger(__name__)
+
+
+class Shard(NamedTuple):
+    """Shard index of count, index counting from 1."""
+    index: int
+    count: int
+
+    def __str__(self) -> str:
+        """Str method."""
+        return f'{self.index}/{self.count}'
+
+
+class MergeSummary(NamedTuple):
+    """Outcome of merging shard outputs."""
+    shards: int
+    files: int
+    written: list[str]
+    unchanged: list[str]
+    # (assets, links) of every page, by output key, from the shard manifests.
+    references: dict[str, list]
+
+
+class ShardMergeError(Exception):
+    """Raised when shard outputs cannot be merged into one public dir."""
+
+    def __init__(self, problems: list[str]):
+        """ShardMergeError constructor."""
+        self.problems = problems
+        details = '\n'.join(f'  {problem}' for problem in problems)
+        super().__init__(f'{len(problems)} problem(s) merging shards:\n{details}')
+
+
+def parse_shard(text: str) -> Shard:
+    """Parse an 'i/N' shard spec, 1 <= i <= N."""
+
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard {text!r}, expected i/N such as 1/4.")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {text!r}, i must be between 1 and N.")
+    return Shard(index, count)
+
+
+def path_hash(key: str) -> int:
+    """Return a hash of key that is the same on every machine and interpreter run."""
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'big')
+
+
+def partition(sizes: dict[str, int], count: int) -> list[list[str]]:
+    """Split keys into count lists of about the same total size.
+
+    Keys go largest first to the lightest shard so far, keys of the same size
+    in the order of their path hash, ties between shards to the lowest index.
+    The result only depends on the keys and sizes, every machine building
+    from the same checkout computes the same partition.
+    """
+
+    shards = [[] for _ in range(count)]
+    loads = [(0, i) for i in range(count)]
+    for key in sorted(sizes, key=lambda key: (-sizes[key], path_hash(key), key)):
+        load, i = heapq.heappop(loads)
+        shards[i].append(key)
+        # Empty files still count, so they spread across shards too.
+        heapq.heappush(loads, (load + max(1, sizes[key]), i))
+    return [sorted(keys) for keys in shards]
+
+
+def shard_jobs(jobs: list[tuple[str, str]], shard: Shard | None) -> list[tuple[str, str]]:
+    """Return the (source path, output key) jobs that belong to shard, every job when None."""
+
+    if shard is None or shard.count == 1:
+        return jobs
+    sizes = {key: os.stat(from_path).st_size for from_path, key in jobs}
+    selected = set(partition(sizes, shard.count)[shard.index - 1])
+    return [(from_path, key) for from_path, key in jobs if key in selected]
+
+
+def content_digest(jobs: list[tuple[str, str]], template_path, base_path: str | None = None) -> str:
+    """Return the digest of the (source path, output key) jobs of a build and of its template.
+
+    Every shard records it in its manifest, merge refuses shards of different digests.
+    """
+
+    digest = hashlib.sha256(template_digest(template_path, base_path).encode())
+    for from_path, key in sorted(jobs, key=lambda job: job[1]):
+        digest.update(f'\0{key}\0{file_digest(from_path)}'.encode())
+    return digest.hexdigest()
+
+
+def shard_manifest_fields(shard: Shard, digest: str, references: dict) -> dict:
+    """Return the fields a shard build adds to its output manifest for merge."""
+    return {'shard': list(shard), 'content_digest': digest, 'references': references}
+
+
+def load_shard_manifest(shard_dir) -> dict:
+    """Return the output manifest a shard build wrote into shard_dir."""
+
+    manifest_path = Path(shard_dir) / OUTPUT_MANIFEST
+    try:
+        data = json.loads(manifest_path.read_text())
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Shard output has no {OUTPUT_MANIFEST}: {shard_dir}")
+    if data.get('version') != OUTPUT_MANIFEST_VERSION or 'shard' not in data:
+        raise ValueError(f"Not a shard manifest: {manifest_path}")
+    return data
+
+
+def check_shards(shard_dirs: list) -> dict[str, Path]:
+    """Return the shard file behind every merged output key, raising ShardMergeError on any problem.
+
+    The shards must be 1 to N of the same N, built from the same content,
+    each given once, every file of their manifests must be present with its
+    recorded size and no two shards may write the same path.
+    """
+
+    problems = []
+    sources: dict[str, Path] = {}
+    owners: dict[str, Shard] = {}
+    shards: dict[Shard, Path] = {}
+    digests: dict[str, list[Shard]] = {}
+
+    for shard_dir in shard_dirs:
+        shard_dir = Path(shard_dir)
+        data = load_shard_manifest(shard_dir)
+        shard = Shard(*data['shard'])
+        if shard in shards:
+            problems.append(f'shard {shard} is given twice: {shards[shard]} and {shard_dir}')
+            continue
+        shards[shard] = shard_dir
+        digest = data.get('content_digest')
+        if digest is None:
+            problems.append(f'shard {shard} records no content digest: {shard_dir}')
+        else:
+            digests.setdefault(digest, []).append(shard)
+
+        for key, entry in sorted(data['files'].items()):
+            path = shard_dir / key
+            try:
+                size = path.stat().st_size
+            except (FileNotFoundError, NotADirectoryError):
+                problems.append(f'{key} of shard {shard} is missing from {shard_dir}')
+                continue
+            if size != entry['size']:
+                problems.append(f'{key} of shard {shard} is {size} bytes, its manifest says {entry["size"]}')
+            if key in owners:
+                problems.append(f'{key} is written by both shard {owners[key]} and shard {shard}')
+                continue
+            owners[key] = shard
+            sources[key] = path
+
+    if len(digests) > 1:
+        groups = sorted(', '.join(sorted(map(str, group))) for group in digests.values())
+        problems.append(f'shards built from different content: {" / ".join(groups)}')
+
+    counts = {shard.count for shard in shards}
+    if len(counts) > 1:
+        problems.append(f'shards of different shard counts: {", ".join(sorted(map(str, shards)))}')
+    elif counts:
+        count = counts.pop()
+        missing = sorted(set(range(1, count + 1)) - {shard.index for shard in shards})
+        if missing:
+            problems.append(f'missing shard(s) {", ".join(f"{i}/{count}" for i in missing)}')
+    else:
+        problems.append('no shards to merge')
+
+    if problems:
+        raise ShardMergeError(problems)
+    return sources
+
+
+def merge_shards(shard_dirs: list, public_dir, workers = DEFAULT_WRITE_WORKERS, link = True) -> MergeSummary:
+    """Combine the outputs of shard builds into public_dir, replacing it in one swap.
+
+    Every shard is checked with check_shards before anything is written. The
+    merged public dir gets a .deploy-manifest.json of its own, listing every file.
+    """
+
+    sources = check_shards(shard_dirs)
+    references = {}
+    for shard_dir in shard_dirs:
+        references.update(load_shard_manifest(shard_dir).get('references', {}))
+    with OutputWriter(public_dir, workers, digests=True) as writer:
+        for key, path in sorted(sources.items()):
+            writer.copy(key, path, 'hash', link)
+
+    logger.info(f'Merged {len(shard_dirs)} shard(s), {len(sources)} file(s) into {public_dir}.')
+    return MergeSummary(len(shard_dirs), len(sources), writer.summary.written, writer.summary.unchanged, references)
@@ -0,0 +1,161 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+from pathlib import Path
+import shutil
+from typing import Iterable, NamedTuple
+
+from utilities.manifest_utilities import (
+    file_digest,
+    remove_output,
+    remove_output_manifest,
+    static_fingerprint,
+    update_output_manifest,
+)
+
+
+# Linux ioctl cloning a file's extents (reflink) on btrfs, xfs and friends.
+FICLONE = 0x40049409
+
+DEFAULT_COPY_WORKERS = 8
+
+logger = logging.getLogger(__name__)
+
+
+class SyncSummary(NamedTuple):
+    """Outcome of a static directory sync."""
+    copied: list[str]
+    unchanged: list[str]
+    removed: list[str]
+
+
+def list_files(root) -> list[str]:
+    """Return the posix paths of every file under root, relative to root."""
+
+    root = str(root)
+    files = []
+    for dir_path, _, file_names in os.walk(root):
+        rel_dir = os.path.relpath(dir_path, root)
+        for name in file_names:
+            rel_path = name if rel_dir == '.' else os.path.join(rel_dir, name)
+            files.append(Path(rel_path).as_posix())
+    return files
+
+
+def is_current(from_path: Path, to_path: Path, compare: str = 'mtime') -> bool:
+    """Return True when to_path already holds the content of from_path."""
+
+    try:
+        to_stat = to_path.stat()
+    except FileNotFoundError:
+        return False
+    from_stat = from_path.stat()
+
+    if from_stat.st_size != to_stat.st_size:
+        return False
+    if compare == 'hash':
+        return file_digest(from_path) == file_digest(to_path)
+    return from_stat.st_mtime_ns == to_stat.st_mtime_ns
+
+
+def clone_file(from_path: Path, to_path: Path, link: bool = False) -> None:
+    """Put from_path at to_path as a reflink or, failing that, a copy.
+
+    With link a hardlink is tried first. Both paths are then the same file,
+    so a change made through either one shows in the other.
+    """
+
+    to_path.parent.mkdir(parents=True, exist_ok=True)
+    to_path.unlink(missing_ok=True)
+
+    if link:
+        try:
+            os.link(from_path, to_path)
+            return
+        except OSError:
+            pass
+
+    try:
+        import fcntl
+
+        with from_path.open('rb') as src, to_path.open('wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(from_path, to_path)
+        return
+    except (ImportError, OSError):
+        to_path.unlink(missing_ok=True)
+
+    shutil.copy2(from_path, to_path)
+
+
+def sync_static_dir(
+    source_path,
+    dest_path,
+    previous: Iterable[str] = (),
+    compare: str = 'mtime',
+    link: bool = False,
+    workers: int = DEFAULT_COPY_WORKERS
+    ) -> SyncSummary:
+    """Sync static files into dest, skipping current files and removing stale ones.
+
+    previous lists the files synced by the last run, so files that were
+    removed from source can be removed from dest without touching the
+    pages generated next to them.
+    """
+
+    if compare not in ('mtime', 'hash'):
+        raise ValueError(f'Unknown compare mode: {compare}')
+
+    source_path = Path(source_path)
+    if not source_path.exists():
+        raise FileNotFoundError(f"Source path does not exist: {source_path}")
+
+    dest_path = Path(dest_path)
+    dest_path.mkdir(parents=True, exist_ok=True)
+
+    files = list_files(source_path)
+    summary = SyncSummary([], [], [])
+
+    def sync_file(key: str) -> bool:
+        from_path = source_path / key
+        to_path = dest_path / key
+        if is_current(from_path, to_path, compare):
+            return False
+        clone_file(from_path, to_path, link)
+        return True
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for key, copied in zip(files, executor.map(sync_file, files)):
+                (summary.copied if copied else summary.unchanged).append(key)
+    except BaseException:
+        # Files may have been copied by other threads, the deploy manifest cannot tell which.
+        remove_output_manifest(dest_path)
+        raise
+
+    current = set(files)
+    for key in previous:
+        if key not in current:
+            remove_output(dest_path / key, dest_path)
+            summary.removed.append(key)
+    if summary.copied or summary.removed:
+        update_output_manifest(dest_path, summary.copied + summary.removed)
+
+    logger.info(
+        f'Static sync: {len(summary.copied)} copied, '
+        f'{len(summary.unchanged)} unchanged, {len(summary.removed)} removed.'
+    )
+    return summary
+
+
+def update_public_dir(source_path, dest_path, manifest, **sync_options) -> SyncSummary:
+    """Sync only the static files that changed, removing the ones deleted since the manifest."""
+
+    summary = sync_static_dir(source_path, dest_path, previous=manifest.static, **sync_options)
+
+    source_path = Path(source_path)
+    manifest.static = {
+        key: static_fingerprint(source_path / key)
+        for key in summary.copied + summary.unchanged
+    }
+    return summary
@@ -0,0 +1,93 @@
+import os
+from pathlib import Path
+import re
+
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{ (\w+) \}\}')
+
+
+def rebase_links(html: str, base_path: str) -> str:
+    """Prefix root relative href and src attributes with base_path."""
+    return html.replace('href="/', f'href="{base_path}').replace('src="/', f'src="{base_path}')
+
+
+class CompiledTemplate():
+    """Template parsed into static segments and placeholder slots."""
+
+    def __init__(self, segments: list[str], slots: list[str]):
+        """CompiledTemplate constructor, segments interleave with slots."""
+        if len(segments) != len(slots) + 1:
+            raise ValueError('A template needs one more segment than slots.')
+        self.segments = segments
+        self.slots = slots
+
+    @classmethod
+    def compile(cls, text: str, base_path: str | None = None) -> 'CompiledTemplate':
+        """Split template text on its {{ Name }} placeholders."""
+
+        segments = []
+        slots = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            segments.append(text[position:match.start()])
+            slots.append(match.group(1))
+            position = match.end()
+        segments.append(text[position:])
+
+        if base_path:
+            segments = [rebase_links(segment, base_path) for segment in segments]
+
+        return cls(segments, slots)
+
+    def render(self, **values: str) -> str:
+        """Render the template, leaving unknown placeholders untouched."""
+
+        parts = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            parts.append(values[slot] if slot in values else f'{{{{ {slot} }}}}')
+            parts.append(segment)
+        return ''.join(parts)
+
+    def write(self, sink, **values) -> None:
+        """Write the template to a sink, streaming values that have a write_html method."""
+
+        sink.write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values.get(slot)
+            if value is None:
+                sink.write(f'{{{{ {slot} }}}}')
+            elif isinstance(value, str):
+                sink.write(value)
+            else:
+                value.write_html(sink)
+            sink.write(segment)
+
+    def __eq__(self, other: 'CompiledTemplate') -> bool:
+        """Equal method."""
+        return self.segments == other.segments and self.slots == other.slots
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f"CompiledTemplate({self.segments}, {self.slots})"
+
+
+_template_cache: dict[tuple[str, str | None], tuple[tuple[int, int], CompiledTemplate]] = {}
+
+
+def load_template(template_path, base_path: str | None = None) -> CompiledTemplate:
+    """Return the compiled template, compiling it again only when the file changed."""
+
+    resolved = str(Path(template_path).resolve())
+    stat = os.stat(resolved)
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+    key = (resolved, base_path)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    with Path(resolved).open('r') as t:
+        template = CompiledTemplate.compile(t.read(), base_path)
+
+    _template_cache[key] = (fingerprint, template)
+    return template
@@ -0,0 +1,287 @@
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import NamedTuple
+
+from utilities.graph_utilities import PageReferences
+from utilities.index_utilities import is_racy, posix_join
+from utilities.manifest_utilities import file_digest, remove_output, template_digest, update_output_manifest
+from utilities.page_utilities import generate_page
+from utilities.static_utilities import sync_static_dir, update_public_dir
+
+
+logger = logging.getLogger(__name__)
+
+
+class TreeSnapshot():
+    """The (mtime_ns, size) of every file under root, keyed by relative posix path.
+
+    Like ContentIndex, the listing of every directory is kept with its
+    mtime and a refresh only lists the directories whose mtime changed.
+    Known files are still stat'ed, saving a file in place leaves its
+    directory untouched.
+    """
+
+    def __init__(self, root, suffix: str | None = None):
+        """TreeSnapshot constructor."""
+        self.root = Path(root)
+        self.suffix = suffix
+        self.dirs: dict[str, dict] = {}
+        self.scanned: list[str] = []
+
+    def refresh(self) -> dict[str, tuple[int, int]]:
+        """Return the fingerprint of every file, listing only the directories that may have changed."""
+
+        files = {}
+        seen_dirs = set()
+        self.scanned = []
+        stack = ['']
+
+        while stack:
+            rel_dir = stack.pop()
+            dir_path = self.root / rel_dir
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            seen_dirs.add(rel_dir)
+
+            listing = self.dirs.get(rel_dir)
+            # Entries added within the mtime granularity of the listing may leave the mtime as it was.
+            if listing is None or listing['mtime_ns'] != mtime_ns or is_racy(mtime_ns, listing['listed_ns']):
+                listing = self._list_dir(dir_path, mtime_ns)
+                self.dirs[rel_dir] = listing
+                self.scanned.append(rel_dir)
+
+            stack.extend(posix_join(rel_dir, name) for name in reversed(listing['dirs']))
+            for name in listing['files']:
+                try:
+                    stat = os.stat(dir_path / name)
+                except FileNotFoundError:
+                    continue
+                files[posix_join(rel_dir, name)] = (stat.st_mtime_ns, stat.st_size)
+
+        for rel_dir in set(self.dirs) - seen_dirs:
+            del self.dirs[rel_dir]
+        return files
+
+    def _list_dir(self, dir_path: Path, mtime_ns: int) -> dict:
+        listed_ns = time.time_ns()
+        files = []
+        dirs = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                elif not entry.is_dir() and (not self.suffix or entry.name.endswith(self.suffix)):
+                    files.append(entry.name)
+        return {'mtime_ns': mtime_ns, 'listed_ns': listed_ns, 'files': sorted(files), 'dirs': sorted(dirs)}
+
+
+def diff_snapshots(old: dict, new: dict) -> tuple[list[str], list[str]]:
+    """Return the (changed or added, removed) keys between two snapshots."""
+
+    changed = [key for key, fingerprint in new.items() if old.get(key) != fingerprint]
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+class Rebuild(NamedTuple):
+    """What one poll rebuilt and how long after the save the html was written."""
+    pages: list[str]
+    removed: list[str]
+    static: list[str]
+    latency: float
+
+
+class SiteWatcher():
+    """Polls content, static and the template, re-rendering only what changed."""
+
+    def __init__(
+        self,
+        content_dir,
+        static_dir,
+        template_path,
+        public_dir,
+        base_path: str | None = None,
+        cache = None,
+        sync_options: dict | None = None,
+        graph = None,
+        manifest = None,
+        manifest_path = None,
+        render_options: dict | None = None
+        ):
+        """SiteWatcher constructor, the public dir is expected to be built already.
+
+        render_options are passed to generate_page, e.g. the mmap_threshold
+        and stream_threshold of the build, so a rebuilt page is the one a
+        build writes.
+
+        With a BuildManifest, the one the public dir was built from, every
+        rebuild is recorded in it and it is saved to manifest_path, the next
+        incremental build then starts from what the watcher wrote.
+        """
+        self.content_dir = Path(content_dir)
+        self.static_dir = Path(static_dir)
+        self.template_path = Path(template_path)
+        self.public_dir = Path(public_dir)
+        self.base_path = base_path
+        self.cache = cache
+        self.sync_options = sync_options or {}
+        self.render_options = render_options or {}
+        self.graph = graph
+        self.manifest = manifest
+        self.manifest_path = manifest_path
+        self.latencies: list[float] = []
+
+        self.content_snapshot = TreeSnapshot(self.content_dir, '.md')
+        self.static_snapshot = TreeSnapshot(self.static_dir)
+        self.pages = self.content_snapshot.refresh()
+        self.static = self.static_snapshot.refresh()
+        self.template = self._template_fingerprint()
+
+    def _template_fingerprint(self) -> tuple[int, int] | None:
+        try:
+            stat = self.template_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _dest_path(self, key: str) -> Path:
+        return self.public_dir / Path(key).with_suffix('.html')
+
+    def poll(self) -> Rebuild | None:
+        """Rebuild what changed since the last poll, returning None when nothing did."""
+
+        pages = self.content_snapshot.refresh()
+        static = self.static_snapshot.refresh()
+        template = self._template_fingerprint()
+
+        changed_pages, removed_pages = diff_snapshots(self.pages, pages)
+        changed_static, removed_static = diff_snapshots(self.static, static)
+
+        # The oldest unhandled save is what the author has been waiting on.
+        saved_ns = [pages[key][0] for key in changed_pages]
+        saved_ns += [static[key][0] for key in changed_static]
+
+        if template != self.template:
+            logger.info('Template changed, rendering every page.')
+            changed_pages = list(pages)
+            if template is not None:
+                saved_ns.append(template[0])
+
+        if not (changed_pages or removed_pages or changed_static or removed_static):
+            return None
+
+        # Pages missing from the manifest are rendered again by the next incremental build.
+        recorded = self.manifest.pages if self.manifest is not None else {}
+        rebuilt = []
+        references = {}
+        for key in changed_pages:
+            recorded.pop(key, None)
+            output = Path(key).with_suffix('.html').as_posix()
+            collector = PageReferences(output) if self.graph is not None else None
+            try:
+                digest = file_digest(self.content_dir / key)
+                generate_page(
+                    str(self.content_dir / key),
+                    self.template_path,
+                    str(self._dest_path(key)),
+                    self.base_path,
+                    self.cache,
+                    references=collector,
+                    **self.render_options,
+                )
+                rebuilt.append(key)
+                recorded[key] = {'digest': digest, 'dest': output}
+                if collector is not None:
+                    references[output] = collector.result()
+            except Exception as e:
+                logger.error(f'Failed to generate {key}: {type(e).__name__}: {e}')
+
+        for key in removed_pages:
+            remove_output(self._dest_path(key), self.public_dir)
+            recorded.pop(key, None)
+        update_output_manifest(
+            self.public_dir,
+            [Path(key).with_suffix('.html').as_posix() for key in changed_pages + removed_pages],
+        )
+
+        if changed_static or removed_static:
+            if self.manifest is not None:
+                update_public_dir(self.static_dir, self.public_dir, self.manifest, **self.sync_options)
+            else:
+                sync_static_dir(self.static_dir, self.public_dir, previous=self.static, **self.sync_options)
+
+        if self.manifest is not None:
+            if template != self.template:
+                self.manifest.template_digest = (
+                    template_digest(self.template_path, self.base_path) if template is not None else None
+                )
+            if self.manifest_path is not None:
+                self.manifest.save(self.manifest_path)
+
+        if self.graph is not None:
+            self._check_references(references, changed_pages, removed_pages, removed_static)
+
+        self.pages = pages
+        self.static = static
+        self.template = template
+
+        latency = (time.time_ns() - min(saved_ns)) / 1e9 if saved_ns else 0.0
+        self.latencies.append(latency)
+        logger.info(
+            f'Rebuilt {len(rebuilt)} page(s), removed {len(removed_pages)}, '
+            f'synced {len(changed_static) + len(removed_static)} static file(s) '
+            f'{latency * 1000:.0f} ms after save.'
+        )
+        return Rebuild(rebuilt, removed_pages, changed_static + removed_static, latency)
+
+    def _check_references(
+        self,
+        references: dict,
+        changed_pages: list[str],
+        removed_pages: list[str],
+        removed_static: list[str]
+        ) -> None:
+        """Record the references collected while rebuilding and report the broken ones.
+
+        Reported are those of the edited pages and of the pages pointing at
+        removed files.
+        """
+
+        removed = [Path(key).with_suffix('.html').as_posix() for key in removed_pages] + removed_static
+        self.graph.record(references, self.template_path)
+        for key in removed_pages:
+            self.graph.remove(key)
+        affected = set(changed_pages) | set(self.graph.affected_by(removed))
+        self.graph.report(self.public_dir, affected)
+
+    def watch(self, interval: float = 0.5, stop: threading.Event | None = None) -> None:
+        """Poll every interval seconds until stop is set."""
+
+        stop = stop or threading.Event()
+        while not stop.wait(interval):
+            self.poll()
+
+
+class PublicDirHandler(SimpleHTTPRequestHandler):
+    """Request handler logging through the module logger instead of stderr."""
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_server(public_dir, host: str = 'localhost', port: int = 8888) -> ThreadingHTTPServer:
+    """Serve public_dir from a background thread."""
+
+    handler = partial(PublicDirHandler, directory=str(public_dir))
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    logger.info(f'Serving {public_dir} at http://{host}:{server.server_address[1]}/')
+    return server